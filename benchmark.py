@@ -0,0 +1,254 @@
+#*********************************************************************************
+#benchmark.py
+#This program measures the throughput of the hot paths of the project: the game
+#simulation, the open space features, the neural network, the decoding of
+#chromosomes and the genetic algorithm.
+#For more detailed information about the project, check out:
+#https://craighaber.github.io/AI-for-Snake-Game/
+#*********************************************************************************
+#Instructions:
+#Run the module to print the throughput of every benchmark. Every benchmark uses
+#fixed seeds, so two runs do the same work.
+#Run with --save-baseline benchmark_baseline.json to store the results, and later
+#with --baseline benchmark_baseline.json to compare against them: any benchmark that
+#got slower than the baseline by more than --tolerance is flagged as a regression,
+#and the program exits with status 1.
+#Run with --help to see every option, such as the grid and population sizes.
+#*********************************************************************************
+#Dependecies:
+#
+#pygame is not needed, since every game is played headless.
+#
+#Also, a Python version of 3.7 or higher is required.
+#*********************************************************************************
+
+import sys
+import json
+import time
+import random
+import platform
+import argparse
+from helpers.generationEvaluator import SnakeGameGAEpisode
+from helpers.snakeGameGATrain import new_ga_rng, gen_population, create_next_generation
+from helpers.trainedAgents import TRAINED_AGENTS
+from helpers.snake import DIRECTION_OFFSETS
+from helpers import neuralNetwork as nn
+from helpers import geneticAlgorithm as ga
+
+#The shape of the neural network of the trained agents
+BITS_PER_WEIGHT = 8
+NUM_INPUTS = 9
+NUM_HIDDEN_LAYER_NODES = 10
+NUM_OUTPUTS = 4
+NUM_BITS = ((NUM_INPUTS+1)*NUM_HIDDEN_LAYER_NODES + NUM_HIDDEN_LAYER_NODES*(NUM_HIDDEN_LAYER_NODES+1) + NUM_OUTPUTS*(NUM_HIDDEN_LAYER_NODES + 1))*BITS_PER_WEIGHT
+
+
+def play_episodes(grid_size, num_steps, on_step=None):
+	"""Function to play the trained agents one game after another for a number of steps.
+
+	The agents and the seeds of the games are taken in turn, so the games are always the same.
+
+	Arguments:
+		grid_size: The number of rows and columns in the grid.
+		num_steps: The number of steps to play.
+		on_step: A function called with the game before every step, or None.
+
+	Returns:
+		The number of seconds spent in the steps themselves.
+	"""
+
+	seconds = 0.0
+	steps = 0
+	game_num = 0
+	while steps < num_steps:
+		episode = SnakeGameGAEpisode(TRAINED_AGENTS[game_num%len(TRAINED_AGENTS)], BITS_PER_WEIGHT, NUM_INPUTS, NUM_HIDDEN_LAYER_NODES, NUM_OUTPUTS, seed=game_num, grid_size=grid_size)
+		game_num += 1
+		while episode.fitness is None and steps < num_steps:
+			if on_step is not None:
+				on_step(episode)
+			start = time.perf_counter()
+			episode.step()
+			seconds += time.perf_counter() - start
+			if not episode.restart:
+				episode.frames_alive += 1
+			steps += 1
+
+	return seconds
+
+def bench_steps(grid_size, num_steps):
+	"""Function to measure the steps per second of the simulation, where a step is
+	move_snake(), check_collisions() and the starvation check of SnakeGameGATest."""
+
+	return num_steps/play_episodes(grid_size, num_steps)
+
+def bench_open_spaces(grid_size, num_steps):
+	"""Function to measure the calls per second of calc_open_spaces() and calc_all_open_spaces()
+	on the positions reached by the trained agents.
+
+	Returns:
+		bfs_rate: The calls per second of calc_open_spaces(), with 4 calls per position.
+		all_rate: The calls per second of calc_all_open_spaces(), with 1 call per position.
+	"""
+
+	seconds = {"bfs": 0.0, "all": 0.0}
+
+	def time_open_spaces(game):
+		head = game.snake.body[0]
+		start = time.perf_counter()
+		for offset in DIRECTION_OFFSETS:
+			game.calc_open_spaces((head[0] + offset[0], head[1] + offset[1]))
+		middle = time.perf_counter()
+		game.calc_all_open_spaces(head)
+		end = time.perf_counter()
+		seconds["bfs"] += middle - start
+		seconds["all"] += end - middle
+
+	play_episodes(grid_size, num_steps, time_open_spaces)
+
+	return 4*num_steps/seconds["bfs"], num_steps/seconds["all"]
+
+def bench_forward_passes(num_calls):
+	"""Function to measure the forward passes per second of nn.testNetwork()."""
+
+	weights = nn.compileChromosome(TRAINED_AGENTS[0], BITS_PER_WEIGHT, NUM_INPUTS, NUM_HIDDEN_LAYER_NODES, NUM_OUTPUTS)
+	rng = random.Random(0)
+	inputs = [[rng.uniform(0, 20) for _ in range(NUM_INPUTS)] for _ in range(100)]
+
+	start = time.perf_counter()
+	for i in range(num_calls):
+		nn.testNetwork(inputs[i%len(inputs)], weights, NUM_HIDDEN_LAYER_NODES, NUM_OUTPUTS)
+
+	return num_calls/(time.perf_counter() - start)
+
+def bench_decodes(num_calls):
+	"""Function to measure the decodes per second of nn.mapChrom2Weights(), without the weight cache."""
+
+	population = ga.genPopulation(100, NUM_BITS, random.Random(0))
+
+	start = time.perf_counter()
+	for i in range(num_calls):
+		nn.mapChrom2Weights(population[i%len(population)], BITS_PER_WEIGHT, NUM_INPUTS, NUM_HIDDEN_LAYER_NODES, NUM_OUTPUTS)
+
+	return num_calls/(time.perf_counter() - start)
+
+def bench_generations(population_size, num_generations):
+	"""Function to measure the generations per second of the genetic algorithm used in training, with random fitness scores.
+
+	This is the packed genetic algorithm of packedChromosomes.py if numpy is installed (see create_next_generation()
+	in snakeGameGATrain.py), and geneticAlgorithm.createNextGeneration() otherwise.
+	"""
+
+	rng = random.Random(0)
+	ga_rng = new_ga_rng(0)
+	population = gen_population(population_size, NUM_BITS, ga_rng)
+	fitness_scores = [rng.expovariate(1/1000) for _ in range(population_size)]
+
+	seconds = 0.0
+	for _ in range(num_generations):
+		start = time.perf_counter()
+		population, _, _, _ = create_next_generation(population, fitness_scores, ga_rng)
+		seconds += time.perf_counter() - start
+
+	return num_generations/seconds
+
+def run_benchmarks(grid_sizes, population_sizes, scale, repeats):
+	"""Function to run every benchmark.
+
+	Arguments:
+		grid_sizes: A list of the grid sizes for the simulation benchmarks.
+		population_sizes: A list of the population sizes for the genetic algorithm benchmark.
+		scale: A factor for the amount of work in every benchmark.
+		repeats: The number of times each benchmark is run, of which the fastest is kept.
+
+	Returns:
+		results: A dictionary that maps the name of each benchmark to its rate, where higher is faster.
+	"""
+
+	benchmarks = []
+	for grid_size in grid_sizes:
+		benchmarks.append(("steps_per_sec/grid_" + str(grid_size), lambda grid_size=grid_size: bench_steps(grid_size, int(20000*scale))))
+		benchmarks.append(("open_spaces/grid_" + str(grid_size), lambda grid_size=grid_size: bench_open_spaces(grid_size, int(5000*scale))))
+	benchmarks.append(("forward_passes_per_sec", lambda: bench_forward_passes(int(50000*scale))))
+	benchmarks.append(("decodes_per_sec", lambda: bench_decodes(int(2000*scale))))
+	for population_size in population_sizes:
+		benchmarks.append(("generations_per_sec/population_" + str(population_size), lambda population_size=population_size: bench_generations(population_size, max(1, int(2000*scale/population_size)))))
+
+	results = {}
+	for name, benchmark in benchmarks:
+		best = None
+		for _ in range(repeats):
+			rates = benchmark()
+			best = rates if best is None else max(best, rates)
+		if name.startswith("open_spaces/"):
+			#One run gives a rate for both functions
+			grid = name.split("/")[1]
+			results["calc_open_spaces_calls_per_sec/" + grid] = best[0]
+			results["calc_all_open_spaces_calls_per_sec/" + grid] = best[1]
+		else:
+			results[name] = best
+		print("done", name, file=sys.stderr)
+
+	return results
+
+def compare(results, baseline, tolerance):
+	"""Function to compare results to a baseline.
+
+	Arguments:
+		results: A dictionary of rates from run_benchmarks().
+		baseline: A dictionary of rates from an earlier run.
+		tolerance: The share a rate can drop below its baseline before it is a regression.
+
+	Returns:
+		rows: A list of (name, rate, baseline rate or None, ratio or None, is regression) tuples.
+	"""
+
+	rows = []
+	for name, rate in results.items():
+		if name in baseline:
+			ratio = rate/baseline[name]
+			rows.append((name, rate, baseline[name], ratio, ratio < 1 - tolerance))
+		else:
+			rows.append((name, rate, None, None, False))
+
+	return rows
+
+def main(argv=None):
+	"""Function to run the benchmarks and report the results."""
+
+	parser = argparse.ArgumentParser(description="Measure the throughput of the simulation, inference and genetic algorithm hot paths.")
+	parser.add_argument("--grid-sizes", type=int, nargs="+", default=[10, 20, 40], help="the grid sizes of the simulation benchmarks")
+	parser.add_argument("--population-sizes", type=int, nargs="+", default=[200, 1000, 5000], help="the population sizes of the genetic algorithm benchmark")
+	parser.add_argument("--scale", type=float, default=1.0, help="a factor for the amount of work in every benchmark")
+	parser.add_argument("--repeats", type=int, default=3, help="the number of runs of each benchmark, of which the fastest is kept")
+	parser.add_argument("--baseline", default=None, help="a JSON file of results to compare against")
+	parser.add_argument("--tolerance", type=float, default=.1, help="how much slower than the baseline a benchmark can be before it is flagged")
+	parser.add_argument("--save-baseline", default=None, help="a JSON file to save the results to")
+	args = parser.parse_args(argv)
+
+	results = run_benchmarks(args.grid_sizes, args.population_sizes, args.scale, args.repeats)
+
+	baseline = {}
+	if args.baseline is not None:
+		with open(args.baseline) as file:
+			baseline = json.load(file)["results"]
+
+	regressions = 0
+	print("%-50s %14s %14s %8s" % ("benchmark", "rate", "baseline", "ratio"))
+	for name, rate, baseline_rate, ratio, is_regression in compare(results, baseline, args.tolerance):
+		if baseline_rate is None:
+			print("%-50s %14.1f %14s %8s" % (name, rate, "-", "-"))
+		else:
+			print("%-50s %14.1f %14.1f %8.2f%s" % (name, rate, baseline_rate, ratio, "  REGRESSION" if is_regression else ""))
+		regressions += is_regression
+
+	if args.save_baseline is not None:
+		with open(args.save_baseline, "w") as file:
+			json.dump({"python": platform.python_version(), "machine": platform.machine(), "time": time.time(), "results": results}, file, indent=1)
+
+	if regressions > 0:
+		print(str(regressions) + " benchmark(s) slower than the baseline")
+		return 1
+	return 0
+
+if __name__ == "__main__":
+	sys.exit(main())
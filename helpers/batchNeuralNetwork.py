@@ -0,0 +1,82 @@
+#*********************************************************************************
+#batchNeuralNetwork.py
+#This module contains a matrix-based version of the neural network in
+#neuralNetwork.py, which evaluates the networks of a whole population at once.
+#The weights of every chromosome are stacked into 3-D arrays, so one batched call
+#gives the outputs of every agent for one observation each.
+#It requires the module numpy.
+#*********************************************************************************
+
+import numpy as np
+from helpers import neuralNetwork as nn
+
+def stackWeights(weightLists):
+	"""Function to stack the weights of many networks into 3-D arrays.
+
+	Arguments:
+		weightLists: A list of weight lists, each in the format returned by nn.mapChrom2Weights() or nn.compileChromosome().
+
+	Returns:
+		stackedWeights: A tuple with one array per layer of the network. The arrays have the shapes
+		(numNetworks, numHiddenLayerNodes, numInputs + 1), (numNetworks, numHiddenLayerNodes, numHiddenLayerNodes + 1)
+		and (numNetworks, numOutputs, numHiddenLayerNodes + 1), where the last column of each holds the thresholds.
+	"""
+
+	return tuple(np.array([weightList[layer] for weightList in weightLists], dtype=np.float64) for layer in range(3))
+
+def mapChroms2StackedWeights(chroms, bitsPerWeight, numInputs, numHiddenLayerNodes, numOutputs):
+	"""Function to translate a list of chromosome bit strings into stacked weight arrays.
+
+	Arguments:
+		chroms: A list of strings of bits, each representing all of the weights for one neural network.
+		bitsPerWeight: the number of bits that are dedicated to a single weight in each chromosome
+		numInputs: the number of inputs in the neural network
+		numHiddenLayerNodes: the number of nodes in each of the 2 hidden layers in the neural network
+		numOutputs: the number of outputs in the neural network
+
+	Returns:
+		stackedWeights: The weights of every chromosome in the format returned by stackWeights().
+	"""
+
+	weightLists = [nn.compileChromosome(chrom, bitsPerWeight, numInputs, numHiddenLayerNodes, numOutputs) for chrom in chroms]
+	return stackWeights(weightLists)
+
+def testNetworkBatch(inputs, stackedWeights):
+	"""Function to calculate the final outputs of many networks, each with its own inputs.
+
+	This gives the same results as calling nn.testNetwork() once per network, up to floating point error.
+
+	Arguments:
+		inputs: An array of shape (numNetworks, numInputs), with one row of inputs per network.
+		stackedWeights: The weights of every network in the format returned by stackWeights().
+
+	Returns:
+		outputs: An array of shape (numNetworks, numOutputs) with all the outputs of every network.
+	"""
+
+	layerOutputs = np.asarray(inputs, dtype=np.float64)
+
+	for layerWeights in stackedWeights:
+		#Add -1 to be the threshold for the layer
+		layerInputs = np.empty((layerOutputs.shape[0], layerOutputs.shape[1] + 1))
+		layerInputs[:, :-1] = layerOutputs
+		layerInputs[:, -1] = -1
+		#Compute the weighted sum of inputs of every node in every network
+		weightedSums = np.matmul(layerWeights, layerInputs[:, :, np.newaxis])[:, :, 0]
+		layerOutputs = sigmoid(weightedSums)
+
+	return layerOutputs
+
+def sigmoid(s):
+	"""A simple sigmoid function applied to every element of an array.
+
+	Arguments:
+		s: the array of inputs into the sigmoid functon.
+
+	Returns:
+		An array with the output from inputting each element of s into the sigmoid function.
+	"""
+
+	#Very negative inputs overflow np.exp, which correctly gives an output of 0
+	with np.errstate(over="ignore"):
+		return 1 / (1 + np.exp(-s))
@@ -0,0 +1,133 @@
+#*********************************************************************************
+#bitboard.py
+#This module contains the Bitboard class, which represents sets of cells in the
+#grid of the Snake Game as the bits of a single Python integer.
+#Each row has one extra guard bit at the end, so shifting a board left or right
+#never wraps a cell around onto the next row. Python integers grow as needed,
+#so the same code works for any grid size, with as many machine words as it takes.
+#It is used by the Snake class when the game is created with bitboard=True.
+#*********************************************************************************
+
+import functools
+
+class Bitboard():
+	"""Class with the geometry of a grid and the operations on boards of that grid.
+
+	A board is an int where the bit row*width + column is set for each cell in the set.
+
+	Attributes:
+		self.rows: The number of rows in the grid.
+		self.cols: The number of columns in the grid.
+		self.width: The number of bits per row, including the guard bit.
+		self.board_mask: A board with every cell of the grid set.
+	"""
+
+	def __init__(self, rows, cols):
+		"""Initializes the Bitboard class."""
+
+		self.rows = rows
+		self.cols = cols
+		self.width = cols + 1
+
+		row_mask = (1 << cols) - 1
+		self.board_mask = 0
+		for row in range(rows):
+			self.board_mask |= row_mask << (row*self.width)
+
+	def bit(self, pos):
+		"""Function to get the board with only one cell set.
+
+		Arguments:
+			pos: A tuple in (row,column) format.
+
+		Returns:
+			A board with pos set, or 0 if pos is out of bounds.
+		"""
+
+		row = pos[0]
+		col = pos[1]
+		if row < 0 or row >= self.rows or col < 0 or col >= self.cols:
+			return 0
+		return 1 << (row*self.width + col)
+
+	def contains(self, board, pos):
+		"""Function to check if a cell is set in a board.
+
+		Arguments:
+			board: The board to check.
+			pos: A tuple in (row,column) format.
+
+		Returns:
+			True if pos is in bounds and set in board.
+		"""
+
+		return board & self.bit(pos) != 0
+
+	def neighbors(self, board):
+		"""Function to get every cell next to a cell of a board.
+
+		Arguments:
+			board: A board of cells.
+
+		Returns:
+			A board with every in-bounds cell to the left, above, to the right or below a cell of board.
+		"""
+
+		return ((board << 1) | (board >> 1) | (board << self.width) | (board >> self.width)) & self.board_mask
+
+	def flood_fill(self, start, free):
+		"""Function to get every free cell connected to a start cell.
+
+		Arguments:
+			start: A board with the start cell set, which must be in free.
+			free: A board of the cells that can be moved through.
+
+		Returns:
+			A board of the connected component of free that contains start.
+		"""
+
+		region = start
+		while True:
+			grown = (region | self.neighbors(region)) & free
+			if grown == region:
+				return region
+			region = grown
+
+	def free_cells(self, occupied):
+		"""Function to get the board of cells that are in bounds and not occupied.
+
+		Arguments:
+			occupied: A board of occupied cells.
+
+		Returns:
+			A board of every other cell of the grid.
+		"""
+
+		return self.board_mask & ~occupied
+
+
+def popcount(board):
+	"""Function to count the cells set in a board.
+
+	Arguments:
+		board: A board of cells.
+
+	Returns:
+		The number of set bits.
+	"""
+
+	return bin(board).count("1")
+
+@functools.lru_cache(maxsize=None)
+def get_bitboard(rows, cols):
+	"""Function to get the Bitboard of a grid size, which is shared by every game of that size.
+
+	Arguments:
+		rows: The number of rows in the grid.
+		cols: The number of columns in the grid.
+
+	Returns:
+		A Bitboard for the grid.
+	"""
+
+	return Bitboard(rows, cols)
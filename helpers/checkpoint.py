@@ -0,0 +1,406 @@
+#*********************************************************************************
+#checkpoint.py
+#This module contains a versioned binary format for saving a population of
+#chromosomes during training, with the classes to write and read it.
+#A checkpoint file is laid out as:
+#	8 bytes: the magic bytes MAGIC
+#	2 bytes: the format version, a little endian unsigned integer
+#	4 bytes: the length of the header, a little endian unsigned integer
+#	the header: a UTF-8 JSON object with the network shape, the generation,
+#	the high score, the state of the random number generator of the genetic
+#	algorithm and the offsets of the arrays below
+#	padding up to a multiple of 8 bytes
+#	the fitness scores: one little endian float64 per chromosome
+#	the game scores: one little endian int32 per chromosome
+#	the chromosomes: numBytes(numBits) packed bytes per chromosome, with the first
+#	bit of a chromosome as the most significant bit of its first byte, the same
+#	layout as packedChromosomes.py
+#Files are written atomically in a background thread by CheckpointWriter, and
+#read through a memory map by Checkpoint, so one agent can be pulled out of a
+#large checkpoint without reading the rest of it.
+#The same format is used for the chromosomes that migrate between the islands of
+#islandModel.py, which Checkpoint reads straight from the bytes received.
+#Run this module with python -m helpers.checkpoint to check that a population
+#round-trips through the format.
+#*********************************************************************************
+
+import os
+import json
+import mmap
+import array
+import struct
+import sys
+import concurrent.futures
+
+MAGIC = b"SNAKEGA\0"
+VERSION = 1
+#The magic bytes, the version and the length of the header
+PREAMBLE = struct.Struct("<8sHI")
+
+def numBytes(numBits):
+	"""Function to get the number of bytes needed to pack a chromosome."""
+
+	return (numBits + 7)//8
+
+def packChromosome(chrom):
+	"""Function to pack a chromosome bit string into bytes.
+
+	Arguments:
+		chrom: A chromosome bit string.
+
+	Returns:
+		The packed bytes, with the last byte padded with 0 bits.
+	"""
+
+	padding = numBytes(len(chrom))*8 - len(chrom)
+	return (int(chrom, 2) << padding).to_bytes(numBytes(len(chrom)), "big")
+
+def unpackChromosome(packed, numBits):
+	"""Function to convert packed bytes back into a chromosome bit string.
+
+	Arguments:
+		packed: The packed bytes of a chromosome.
+		numBits: The number of bits in the chromosome.
+
+	Returns:
+		The chromosome bit string.
+	"""
+
+	bits = bin(int.from_bytes(packed, "big"))[2:].zfill(len(packed)*8)
+	return bits[:numBits]
+
+def encodeRngState(rngState):
+	"""Function to convert the state of a random number generator into JSON serializable values.
+
+	Arguments:
+		rngState: The tuple returned by getstate() of a random.Random object, or the dictionary
+		of bit_generator.state of a numpy random Generator.
+
+	Returns:
+		A list with the values of a tuple, the dictionary itself, or None if rngState is None.
+	"""
+
+	if rngState is None or isinstance(rngState, dict):
+		return rngState
+	version, internalState, gaussNext = rngState
+	return [version, list(internalState), gaussNext]
+
+def decodeRngState(encodedState):
+	"""Function to convert the values of encodeRngState() back into the state of a random number generator.
+
+	Arguments:
+		encodedState: The list or dictionary returned by encodeRngState(), or None.
+
+	Returns:
+		A tuple that can be passed to setstate(), the dictionary for bit_generator.state, or None.
+	"""
+
+	if encodedState is None or isinstance(encodedState, dict):
+		return encodedState
+	version, internalState, gaussNext = encodedState
+	return (version, tuple(internalState), gaussNext)
+
+def encodeCheckpoint(population, fitnessScores, gameScores, metadata):
+	"""Function to build the bytes of a checkpoint file.
+
+	Arguments:
+		population: A list of chromosome bit strings, all of the same length.
+		fitnessScores: A list of fitness scores that corresponds to each chromosome in population by index.
+		gameScores: A list of in-game scores that corresponds to each chromosome in population by index.
+		metadata: A dictionary of JSON serializable values to store in the header, such as the
+		network shape, the generation, the high score and the encoded state of the random number generator.
+
+	Returns:
+		The bytes of the checkpoint.
+	"""
+
+	numChromosomes = len(population)
+	numBits = len(population[0])
+
+	fitnessArray = array.array("d", fitnessScores)
+	scoreArray = array.array("i", gameScores)
+	if sys.byteorder != "little":
+		fitnessArray.byteswap()
+		scoreArray.byteswap()
+	packed = b"".join(packChromosome(chrom) for chrom in population)
+
+	#The offsets are relative to the start of the arrays, so the header does not depend on its own length
+	header = dict(metadata)
+	header["num_chromosomes"] = numChromosomes
+	header["num_bits"] = numBits
+	header["fitness_offset"] = 0
+	header["score_offset"] = 8*numChromosomes
+	header["population_offset"] = 12*numChromosomes
+	headerBytes = json.dumps(header).encode("utf-8")
+
+	#Pad the header so the float64 fitness scores are aligned
+	headerEnd = PREAMBLE.size + len(headerBytes)
+	headerBytes += b" "*(-headerEnd%8)
+
+	return b"".join([PREAMBLE.pack(MAGIC, VERSION, len(headerBytes)), headerBytes, fitnessArray.tobytes(), scoreArray.tobytes(), packed])
+
+def writeCheckpoint(path, data):
+	"""Function to write the bytes of a checkpoint atomically.
+
+	The bytes are written to a temporary file that replaces path once it is complete,
+	so path never holds a partly written checkpoint, even if training is stopped.
+
+	Arguments:
+		path: The path of the checkpoint file.
+		data: The bytes returned by encodeCheckpoint().
+	"""
+
+	tempPath = path + ".tmp"
+	with open(tempPath, "wb") as file:
+		file.write(data)
+		file.flush()
+		os.fsync(file.fileno())
+	os.replace(tempPath, path)
+
+
+class CheckpointWriter():
+	"""Class that saves checkpoints of a training run in a background thread.
+
+	The checkpoint is encoded in the training thread, which only takes a copy of the
+	population, and written to disk by a single background thread.
+
+	Attributes:
+		self.directory: The directory the checkpoints are saved in.
+		self.every: The number of generations between checkpoints.
+		self.executor: The ThreadPoolExecutor with the thread writing the files.
+		self.pending: The Future of the checkpoint being written, or None.
+	"""
+
+	def __init__(self, directory="populations", every=10):
+		"""Initializes the CheckpointWriter class."""
+
+		self.directory = directory
+		self.every = every
+		self.executor = concurrent.futures.ThreadPoolExecutor(max_workers=1)
+		self.pending = None
+
+	def path(self, generation):
+		"""Function to get the path of the checkpoint of a generation."""
+
+		return os.path.join(self.directory, "population_" + str(generation) + ".ckpt")
+
+	def is_due(self, generation):
+		"""Function to check if a checkpoint should be saved for a generation."""
+
+		return generation%self.every == 0
+
+	def save(self, generation, population, fitnessScores, gameScores, metadata):
+		"""Function to start saving a checkpoint of a generation.
+
+		Arguments:
+			generation: The number of the generation, which is also stored in the header.
+			population: A list of chromosome bit strings, all of the same length.
+			fitnessScores: A list of fitness scores that corresponds to each chromosome in population by index.
+			gameScores: A list of in-game scores that corresponds to each chromosome in population by index.
+			metadata: A dictionary of other JSON serializable values to store in the header.
+
+		Returns:
+			The path the checkpoint is saved to.
+		"""
+
+		metadata = dict(metadata)
+		metadata["generation"] = generation
+		data = encodeCheckpoint(population, fitnessScores, gameScores, metadata)
+		path = self.path(generation)
+
+		#Only one checkpoint is written at a time, and an error writing the last one is raised here
+		self.wait()
+		os.makedirs(self.directory, exist_ok=True)
+		self.pending = self.executor.submit(writeCheckpoint, path, data)
+
+		return path
+
+	def wait(self):
+		"""Function to wait until the last checkpoint is on disk."""
+
+		if self.pending is not None:
+			pending = self.pending
+			self.pending = None
+			pending.result()
+
+	def close(self):
+		"""Function to finish writing the last checkpoint and stop the background thread."""
+
+		self.wait()
+		self.executor.shutdown()
+
+
+class Checkpoint():
+	"""Class that reads a checkpoint file through a memory map.
+
+	Only the parts of the file that are accessed are read from disk.
+
+	Attributes:
+		self.path: The path of the checkpoint file, or None if it is read from bytes.
+		self.header: The dictionary from the JSON header of the file.
+		self.num_chromosomes: The number of chromosomes in the checkpoint.
+		self.num_bits: The number of bits per each chromosome.
+		self.file: The open checkpoint file, or None if it is read from bytes.
+		self.map: The mmap of the file, or the bytes of the checkpoint.
+		self.data_start: The offset of the arrays in the file.
+	"""
+
+	def __init__(self, path):
+		"""Initializes the Checkpoint class, reading only the header of the file.
+
+		Arguments:
+			path: The path of a checkpoint file, or the bytes of a checkpoint returned by encodeCheckpoint().
+		"""
+
+		if isinstance(path, (bytes, bytearray)):
+			self.path = None
+			self.file = None
+			self.map = path
+			path = "<bytes>"
+		else:
+			self.path = path
+			self.file = open(path, "rb")
+			self.map = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ)
+
+		magic, version, headerLength = PREAMBLE.unpack_from(self.map, 0)
+		if magic != MAGIC:
+			self.close()
+			raise ValueError(path + " is not a checkpoint file")
+		if version > VERSION:
+			self.close()
+			raise ValueError(path + " has checkpoint format version " + str(version) + ", only up to " + str(VERSION) + " is supported")
+
+		self.header = json.loads(self.map[PREAMBLE.size:PREAMBLE.size + headerLength].decode("utf-8"))
+		self.num_chromosomes = self.header["num_chromosomes"]
+		self.num_bits = self.header["num_bits"]
+		self.data_start = PREAMBLE.size + headerLength
+
+	def __len__(self):
+		"""Function to get the number of chromosomes in the checkpoint."""
+
+		return self.num_chromosomes
+
+	def __enter__(self):
+		return self
+
+	def __exit__(self, *exc):
+		self.close()
+
+	def fitness(self, i):
+		"""Function to get the fitness score of the chromosome at an index."""
+
+		return struct.unpack_from("<d", self.map, self.data_start + self.header["fitness_offset"] + 8*i)[0]
+
+	def game_score(self, i):
+		"""Function to get the in-game score of the chromosome at an index."""
+
+		return struct.unpack_from("<i", self.map, self.data_start + self.header["score_offset"] + 4*i)[0]
+
+	def fitness_scores(self):
+		"""Function to get a list of the fitness scores of every chromosome."""
+
+		start = self.data_start + self.header["fitness_offset"]
+		return list(struct.unpack_from("<" + str(self.num_chromosomes) + "d", self.map, start))
+
+	def game_scores(self):
+		"""Function to get a list of the in-game scores of every chromosome."""
+
+		start = self.data_start + self.header["score_offset"]
+		return list(struct.unpack_from("<" + str(self.num_chromosomes) + "i", self.map, start))
+
+	def packed_chromosome(self, i):
+		"""Function to get the packed bytes of the chromosome at an index."""
+
+		if i < 0 or i >= self.num_chromosomes:
+			raise IndexError("chromosome index out of range")
+		rowBytes = numBytes(self.num_bits)
+		start = self.data_start + self.header["population_offset"] + rowBytes*i
+		return self.map[start:start + rowBytes]
+
+	def chromosome(self, i):
+		"""Function to get the chromosome bit string at an index."""
+
+		return unpackChromosome(self.packed_chromosome(i), self.num_bits)
+
+	def population(self):
+		"""Function to get a list of every chromosome bit string in the checkpoint."""
+
+		return [self.chromosome(i) for i in range(self.num_chromosomes)]
+
+	def best_index(self):
+		"""Function to get the index of the chromosome with the highest fitness, the first one if several are equal."""
+
+		fitnessScores = self.fitness_scores()
+		return fitnessScores.index(max(fitnessScores))
+
+	def rng_state(self):
+		"""Function to get the state of the random number generator of the genetic algorithm (see decodeRngState()), or None."""
+
+		return decodeRngState(self.header.get("rng_state"))
+
+	def close(self):
+		"""Function to close the memory map and the file."""
+
+		if self.file is not None:
+			self.map.close()
+			self.file.close()
+
+
+def latestCheckpoint(directory="populations"):
+	"""Function to find the checkpoint of the latest generation in a directory.
+
+	Arguments:
+		directory: The directory the checkpoints were saved in by a CheckpointWriter.
+
+	Returns:
+		The path of the checkpoint with the highest generation number, or None if there are none.
+	"""
+
+	latest = None
+	latestGeneration = -1
+	for name in os.listdir(directory):
+		if name.startswith("population_") and name.endswith(".ckpt"):
+			generation = name[len("population_"):-len(".ckpt")]
+			if generation.isdigit() and int(generation) > latestGeneration:
+				latestGeneration = int(generation)
+				latest = os.path.join(directory, name)
+
+	return latest
+
+
+def checkRoundTrip():
+	"""Function to check that a population and its scores come back unchanged from the bytes of a checkpoint.
+
+	It covers chromosome lengths that are not a multiple of 8 bits, and the states of both kinds of
+	random number generator used by training.
+
+	Raises:
+		ValueError: If any value read back differs from the one encoded.
+	"""
+
+	import random
+
+	rng = random.Random(0)
+	rngStates = [rng.getstate(), {"bit_generator": "PCG64", "state": {"state": 2**127 + 12345, "inc": 2**64 + 1}, "has_uint32": 0, "uinteger": 0}]
+	for numBits in [1, 7, 8, 9, 15, 17, 1000, 1003]:
+		chrom = "".join(rng.choice("01") for _ in range(numBits))
+		if unpackChromosome(packChromosome(chrom), numBits) != chrom:
+			raise ValueError("a chromosome of " + str(numBits) + " bits changed when packed and unpacked")
+
+		for rngState in rngStates:
+			population = ["".join(rng.choice("01") for _ in range(numBits)) for _ in range(5)]
+			fitnessScores = [rng.uniform(0, 1e6) for _ in population]
+			gameScores = [rng.randint(-5, 100) for _ in population]
+			metadata = {"generation": 3, "rng_state": encodeRngState(rngState)}
+			with Checkpoint(encodeCheckpoint(population, fitnessScores, gameScores, metadata)) as checkpoint:
+				if checkpoint.population() != population or [checkpoint.chromosome(i) for i in range(len(population))] != population:
+					raise ValueError("the population of " + str(numBits) + " bit chromosomes changed in the checkpoint")
+				if checkpoint.fitness_scores() != fitnessScores or checkpoint.game_scores() != gameScores:
+					raise ValueError("the scores changed in the checkpoint")
+				if checkpoint.rng_state() != rngState:
+					raise ValueError("the state of the random number generator changed in the checkpoint")
+
+
+if __name__ == "__main__":
+	checkRoundTrip()
+	print("checkpoints round-trip")
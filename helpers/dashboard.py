@@ -0,0 +1,346 @@
+#*********************************************************************************
+#dashboard.py
+#This module contains the Dashboard class, which draws many games at once in one
+#pygame window as a grid of small boards, and the DashboardEvaluator class, which
+#plays a generation of training side by side on such a dashboard.
+#Every board is drawn by copying small pre-drawn sprites for its cells, and only
+#the cells that changed since the last frame are drawn again, so 64 or more boards
+#can be shown while the games are played as fast as the CPU allows.
+#They are used in trainGeneticAlgorithm.py and testTrainedAgents.py.
+#*********************************************************************************
+
+try:
+	import pygame
+except ImportError:
+	pygame = None
+from helpers.gameRenderer import get_font, BACKGROUND_COLOR, DATA_WINDOW_COLOR, GRID_COLOR, FRUIT_COLOR, SNAKE_COLOR, EYE_COLOR, TEXT_COLOR, MAX_CACHED_TEXTS
+from helpers.generationEvaluator import SnakeGameGAEpisode
+from helpers.renderPolicy import RenderPolicy
+from helpers.seeds import episodeSeed
+
+#The height of the segment above the boards, and of the label above each board
+HEADER_HEIGHT = 30
+LABEL_HEIGHT = 16
+#The space around each board
+TILE_MARGIN = 2
+#The indices of the cell sprites
+EMPTY = 0
+FRUIT = 1
+BODY = 2
+HEAD = 3
+
+
+class Dashboard():
+	"""Class that draws a grid of small game boards in one pygame window.
+
+	Attributes:
+		self.tile_rows: The number of rows of boards.
+		self.tile_cols: The number of columns of boards.
+		self.rows: The number of rows in the grid of each game.
+		self.cols: The number of columns in the grid of each game.
+		self.cell_size: The width and height of a cell of a board in pixels.
+		self.tile_width: The width of the space for one board and its label.
+		self.tile_height: The height of the space for one board and its label.
+		self.width: The width of the window.
+		self.height: The height of the window.
+		self.win: The pygame surface of the window.
+		self.clock: A pygame Clock object.
+		self.play: An attribute to determine if the dashboard is being shown.
+		self.sprites: A list of the surface of a cell for each of EMPTY, FRUIT, BODY and HEAD.
+		self.tile_background: A surface of an empty board with the background of its label.
+		self.font: The small font of the labels.
+		self.text_surfaces: A dictionary with the rendered surface of each text that was drawn.
+		self.drawn_header: The header text on the screen, or None.
+		self.drawn: A list with the state of each board on the screen, as a list of the game, the set of
+		body positions, the head, the fruit and the label, or None if the board was not drawn yet.
+	"""
+
+	def __init__(self, tile_rows, tile_cols, grid_size=10, max_width=1280, max_height=960):
+		"""Initializes the Dashboard class and opens its window.
+
+		The cells are made as large as possible for the boards to fit in max_width by max_height.
+
+		Arguments:
+			tile_rows: The number of rows of boards.
+			tile_cols: The number of columns of boards.
+			grid_size: The number of rows and columns in the grid of each game.
+			max_width: The most pixels the window can be wide.
+			max_height: The most pixels the window can be high.
+		"""
+
+		self.tile_rows = tile_rows
+		self.tile_cols = tile_cols
+		self.rows = grid_size
+		self.cols = grid_size
+		self.cell_size = max(2, min((max_width//tile_cols - 2*TILE_MARGIN)//self.cols, ((max_height - HEADER_HEIGHT)//tile_rows - LABEL_HEIGHT - 2*TILE_MARGIN)//self.rows))
+		self.tile_width = self.cell_size*self.cols + 2*TILE_MARGIN
+		self.tile_height = self.cell_size*self.rows + LABEL_HEIGHT + 2*TILE_MARGIN
+		self.width = max(self.tile_width*tile_cols, 300)
+		self.height = HEADER_HEIGHT + self.tile_height*tile_rows
+		self.win = pygame.display.set_mode((self.width, self.height))
+		self.clock = pygame.time.Clock()
+		self.play = True
+		self.sprites = self.make_sprites()
+		self.tile_background = self.make_tile_background()
+		self.font = get_font('calibri', 14)
+		self.text_surfaces = {}
+		self.drawn_header = None
+		self.drawn = [None]*(tile_rows*tile_cols)
+
+		self.win.fill(pygame.Color(*DATA_WINDOW_COLOR))
+		pygame.display.update()
+
+	def make_sprites(self):
+		"""Function to draw the sprite of each kind of cell once, in the style of the single game window.
+
+		Returns:
+			A list of the surfaces for EMPTY, FRUIT, BODY and HEAD.
+		"""
+
+		size = self.cell_size
+		sprites = []
+		for color in (None, FRUIT_COLOR, SNAKE_COLOR, SNAKE_COLOR):
+			sprite = pygame.Surface((size, size)).convert(self.win)
+			sprite.fill(pygame.Color(*BACKGROUND_COLOR))
+			#The grid lines along the top and left of every cell, when there is room for them
+			if size >= 5:
+				pygame.draw.line(sprite, pygame.Color(*GRID_COLOR), (0, 0), (size - 1, 0))
+				pygame.draw.line(sprite, pygame.Color(*GRID_COLOR), (0, 0), (0, size - 1))
+			if color is not None:
+				inset = 1 if size >= 5 else 0
+				pygame.draw.rect(sprite, pygame.Color(*color), (inset, inset, size - inset, size - inset))
+			sprites.append(sprite)
+
+		#The head has one eye in the middle, since the cells are too small to show its direction
+		eye = max(1, size//4)
+		pygame.draw.rect(sprites[HEAD], pygame.Color(*EYE_COLOR), ((size - eye + 1)//2, (size - eye + 1)//2, eye, eye))
+
+		return sprites
+
+	def make_tile_background(self):
+		"""Function to draw an empty board with the background of its label once.
+
+		Returns:
+			The surface of the whole tile.
+		"""
+
+		background = pygame.Surface((self.tile_width, self.tile_height)).convert(self.win)
+		background.fill(pygame.Color(*DATA_WINDOW_COLOR))
+		for row in range(self.rows):
+			for col in range(self.cols):
+				background.blit(self.sprites[EMPTY], self.cell_position(0, 0, (row, col)))
+
+		return background
+
+	def tile_position(self, tile):
+		"""Function to get the (x, y) position of the top left corner of a tile in the window."""
+
+		return ((tile%self.tile_cols)*self.tile_width, HEADER_HEIGHT + (tile//self.tile_cols)*self.tile_height)
+
+	def cell_position(self, tile_x, tile_y, pos):
+		"""Function to get the (x, y) position of a cell of the board of a tile at (tile_x, tile_y)."""
+
+		return (tile_x + TILE_MARGIN + self.cell_size*pos[1], tile_y + LABEL_HEIGHT + TILE_MARGIN + self.cell_size*pos[0])
+
+	def text_surface(self, text):
+		"""Function to get the rendered surface of a text, which is only rendered the first time it is needed."""
+
+		surface = self.text_surfaces.get(text)
+		if surface is None:
+			if len(self.text_surfaces) >= MAX_CACHED_TEXTS:
+				self.text_surfaces.clear()
+			surface = self.font.render(text, 1, TEXT_COLOR)
+			self.text_surfaces[text] = surface
+
+		return surface
+
+	def draw(self, games, labels, header=""):
+		"""Function to draw the boards that changed since the last frame and update them on the screen.
+
+		Arguments:
+			games: A list with the SnakeGame shown on each board, or None for an empty board.
+			There can be fewer games than boards.
+			labels: A list with the text above each board.
+			header: The text above all the boards.
+		"""
+
+		win = self.win
+		sprites = self.sprites
+		rects = []
+
+		if header != self.drawn_header:
+			pygame.draw.rect(win, pygame.Color(*DATA_WINDOW_COLOR), (0, 0, self.width, HEADER_HEIGHT))
+			win.blit(get_font().render(header, 1, TEXT_COLOR), (10, 5))
+			self.drawn_header = header
+			rects.append((0, 0, self.width, HEADER_HEIGHT))
+
+		for tile in range(len(self.drawn)):
+			game = games[tile] if tile < len(games) else None
+			label = labels[tile] if game is not None else ""
+			drawn = self.drawn[tile]
+			tile_x, tile_y = self.tile_position(tile)
+
+			if game is None:
+				#Clear a board whose game is over
+				if drawn is None or drawn[0] is not None:
+					win.blit(self.tile_background, (tile_x, tile_y))
+					self.drawn[tile] = [None, set(), None, None, ""]
+					rects.append((tile_x, tile_y, self.tile_width, self.tile_height))
+				continue
+
+			body = set(game.snake.body)
+			head = game.snake.body[0]
+			fruit = game.fruit_pos
+
+			if drawn is None or drawn[0] is not game:
+				#A new game starts on an empty board
+				win.blit(self.tile_background, (tile_x, tile_y))
+				changed = set(body)
+				changed.add(fruit)
+				drawn_label = None
+			else:
+				_, drawn_body, drawn_head, drawn_fruit, drawn_label = drawn
+				changed = body.symmetric_difference(drawn_body)
+				if head != drawn_head:
+					changed.add(head)
+					changed.add(drawn_head)
+				if fruit != drawn_fruit:
+					changed.add(fruit)
+					changed.add(drawn_fruit)
+
+			if len(changed) == 0 and label == drawn_label:
+				continue
+
+			if label != drawn_label:
+				win.blit(self.tile_background, (tile_x, tile_y), (0, 0, self.tile_width, LABEL_HEIGHT))
+				win.blit(self.text_surface(label), (tile_x + TILE_MARGIN, tile_y + 1))
+
+			for pos in changed:
+				#Cells outside the grid, such as a head that just hit a wall, are not drawn
+				if pos[0] < 0 or pos[0] >= self.rows or pos[1] < 0 or pos[1] >= self.cols:
+					continue
+				if pos == head:
+					sprite = sprites[HEAD]
+				elif pos in body:
+					sprite = sprites[BODY]
+				elif pos == fruit:
+					sprite = sprites[FRUIT]
+				else:
+					sprite = sprites[EMPTY]
+				win.blit(sprite, self.cell_position(tile_x, tile_y, pos))
+
+			self.drawn[tile] = [game, body, head, fruit, label]
+			rects.append((tile_x, tile_y, self.tile_width, self.tile_height))
+
+		if len(rects) > 0:
+			pygame.display.update(rects)
+
+	def event_handler(self):
+		"""Function for cleanly handling the event of the user quitting."""
+
+		for event in pygame.event.get():
+			#Check if user has quit the game
+			if event.type == pygame.QUIT:
+				self.play = False
+				pygame.quit()
+				quit()
+
+
+class DashboardEvaluator():
+	"""Class that measures the fitness of every chromosome in a generation while showing the games on a Dashboard.
+
+	It can be used in place of a GenerationEvaluator (see generationEvaluator.py). As many chromosomes
+	as there are boards are played side by side, one frame each at a time, and a board takes the next
+	chromosome as soon as its game is over. The games are the same as in a GenerationEvaluator, so
+	the fitness scores do not depend on the dashboard.
+
+	Attributes:
+		self.network_shape: A tuple of (bits_per_weight, num_inputs, num_hidden_layer_nodes, num_outputs).
+		self.dashboard: The Dashboard the games are drawn on.
+		self.grid_size: The number of rows and columns in the grid of each game.
+		self.run_seed: The seed of the training run, or None for unpredictable games.
+		self.render_policy: The RenderPolicy (see renderPolicy.py) that limits how often the dashboard is drawn.
+		self.generation: The number of the generation being evaluated, shown above the boards.
+		self.bitboard: Whether the games calculate the open spaces with bitboards (see SnakeGameGATest).
+		self.profiler: A PhaseProfiler (see profiler.py) to time and count the games with, or None.
+	"""
+
+	def __init__(self, bits_per_weight, num_inputs, num_hidden_layer_nodes, num_outputs, tile_rows=8, tile_cols=8, grid_size=10, run_seed=None, fps=30, bitboard=False, profiler=None):
+		"""Initializes the DashboardEvaluator class.
+
+		Arguments:
+			bits_per_weight: The number of bits per each weight in the nueral network.
+			num_inputs: The number of inputs in the neural network.
+			num_hidden_layer_nodes: The number of nodes per each of the 2 hidden layers in the neural network.
+			num_ouputs: The number of outputs in the neural network.
+			tile_rows: The number of rows of boards.
+			tile_cols: The number of columns of boards.
+			grid_size: The number of rows and columns in the grid of each game.
+			run_seed: The seed of the training run, or None for unpredictable games.
+			fps: The most times the dashboard is drawn per second, while the games are played as fast as possible.
+			bitboard: Whether the games calculate the open spaces with bitboards.
+			profiler: A PhaseProfiler to time and count the games with, or None.
+		"""
+
+		self.network_shape = (bits_per_weight, num_inputs, num_hidden_layer_nodes, num_outputs)
+		self.dashboard = Dashboard(tile_rows, tile_cols, grid_size)
+		self.grid_size = grid_size
+		self.run_seed = run_seed
+		self.render_policy = RenderPolicy(min_seconds=1/fps)
+		self.generation = 0
+		self.bitboard = bitboard
+		self.profiler = profiler
+
+	def evaluate(self, population):
+		"""Function that plays every chromosome in a population.
+
+		Arguments:
+			population: A list of chromosome bit strings.
+
+		Returns:
+			fitness_scores: A list of fitness scores, each index corresponding to a chromosome in population.
+			game_scores: A list of in-game scores, each index corresponding to a chromosome in population.
+		"""
+
+		fitness_scores = [None]*len(population)
+		game_scores = [None]*len(population)
+		num_tiles = len(self.dashboard.drawn)
+		#The index in population and the game of each board, or None
+		tiles = [None]*num_tiles
+		next_chrom = 0
+		num_done = 0
+
+		while num_done < len(population):
+			for tile in range(num_tiles):
+				if tiles[tile] is None and next_chrom < len(population):
+					chrom = population[next_chrom]
+					episode = SnakeGameGAEpisode(chrom, *self.network_shape, episodeSeed(self.run_seed, chrom), self.bitboard, self.grid_size, self.profiler)
+					tiles[tile] = (next_chrom, episode)
+					next_chrom += 1
+
+			for tile in range(num_tiles):
+				if tiles[tile] is None:
+					continue
+				index, episode = tiles[tile]
+				episode.advance()
+				if episode.fitness is not None:
+					fitness_scores[index] = episode.fitness
+					game_scores[index] = episode.final_score
+					tiles[tile] = None
+					num_done += 1
+
+			rendered = self.render_policy.should_render(0)
+			if rendered:
+				games = [entry[1] if entry is not None else None for entry in tiles]
+				labels = ["#" + str(entry[0] + 1) + "  Score: " + str(entry[1].score) if entry is not None else "" for entry in tiles]
+				header = "Generation: " + str(self.generation) + "   Played: " + str(num_done) + "/" + str(len(population))
+				self.dashboard.draw(games, labels, header)
+			if self.render_policy.should_handle_events(rendered):
+				self.dashboard.event_handler()
+
+		return fitness_scores, game_scores
+
+	def close(self):
+		"""Function to match GenerationEvaluator, the window is closed with pygame."""
+
+		pass
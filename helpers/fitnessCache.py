@@ -0,0 +1,116 @@
+#*********************************************************************************
+#fitnessCache.py
+#This module contains the FitnessCache class, which remembers the fitness of
+#chromosomes that were already played so that the best parents carried over to
+#the next generation and exact clones are not played again.
+#It is used by SnakeGameGATrain in snakeGameGATrain.py.
+#*********************************************************************************
+
+import collections
+from helpers.lruCache import LRUCache, chromosomeDigest
+from helpers.seeds import episodeSeed
+
+#The result of playing a chromosome, and the seed of the game it was played with (None if unseeded)
+CachedFitness = collections.namedtuple("CachedFitness", ["fitness", "game_score", "seed"])
+
+
+class FitnessCache(LRUCache):
+	"""Class that maps the digest of a chromosome to the result of playing it.
+
+	Inherits the LRUCache class, so the least recently used chromosomes are evicted once it is full.
+
+	Attributes:
+		self.duplicates: The number of chromosomes that were clones of another unplayed chromosome
+		in the same generation, and so were only played once.
+	"""
+
+	def __init__(self, maxsize=10000):
+		"""Initializes the FitnessCache class."""
+
+		super().__init__(maxsize)
+		self.duplicates = 0
+
+	def lookup(self, chrom):
+		"""Function to get the cached result of a chromosome.
+
+		Arguments:
+			chrom: A chromosome bit string.
+
+		Returns:
+			A CachedFitness, or None if the chromosome has not been played.
+		"""
+
+		return self.get(chromosomeDigest(chrom))
+
+	def store(self, chrom, fitness, game_score, seed=None):
+		"""Function to remember the result of playing a chromosome.
+
+		Arguments:
+			chrom: A chromosome bit string.
+			fitness: The fitness score of the chromosome.
+			game_score: The in-game score of the chromosome.
+			seed: The seed of the game the chromosome was played with, if any.
+		"""
+
+		self.put(chromosomeDigest(chrom), CachedFitness(fitness, game_score, seed))
+
+	def evaluate(self, population, evaluator):
+		"""Function that scores a population, only playing chromosomes that are not cached.
+
+		Each distinct unknown chromosome is played once, even if it appears several times.
+
+		Arguments:
+			population: A list of chromosome bit strings.
+			evaluator: A GenerationEvaluator (see generationEvaluator.py) or VectorGenerationEvaluator
+			(see vectorSnakeEnv.py) used to play the unknown chromosomes.
+
+		Returns:
+			fitness_scores: A list of fitness scores, each index corresponding to a chromosome in population.
+			game_scores: A list of in-game scores, each index corresponding to a chromosome in population.
+		"""
+
+		digests = [chromosomeDigest(chrom) for chrom in population]
+		results = {}
+		unknown = {}
+
+		for chrom, digest in zip(population, digests):
+			if digest in results:
+				#Another copy of a cached chromosome
+				self.hits += 1
+				continue
+			if digest in unknown:
+				self.duplicates += 1
+				continue
+			entry = self.get(digest)
+			if entry is not None:
+				results[digest] = entry
+			else:
+				unknown[digest] = chrom
+
+		if len(unknown) > 0:
+			fitness_scores, game_scores = evaluator.evaluate(list(unknown.values()))
+			for (digest, chrom), fitness, game_score in zip(unknown.items(), fitness_scores, game_scores):
+				entry = CachedFitness(fitness, game_score, episodeSeed(evaluator.run_seed, chrom))
+				self.put(digest, entry)
+				results[digest] = entry
+
+		fitness_scores = [results[digest].fitness for digest in digests]
+		game_scores = [results[digest].game_score for digest in digests]
+
+		return fitness_scores, game_scores
+
+	def hit_rate(self):
+		"""Function to get the share of lookups that found a cached chromosome since the stats were reset."""
+
+		lookups = self.hits + self.misses
+		if lookups == 0:
+			return 0.0
+		return self.hits/lookups
+
+	def reset_stats(self):
+		"""Function to set the hit, miss and duplicate counters back to 0.
+
+		This overrides the method in the LRUCache superclass."""
+
+		super().reset_stats()
+		self.duplicates = 0
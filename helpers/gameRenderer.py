@@ -0,0 +1,259 @@
+#*********************************************************************************
+#gameRenderer.py
+#This module contains the GameRenderer class, which draws a SnakeGame in the pygame
+#window. Everything that does not change during a game (the background, the grid
+#lines and the fonts) is drawn once, the text of the scores is only rendered again
+#when it changes, and every frame only the cells of the grid that changed since
+#the last frame are drawn again and updated on the screen.
+#The window looks exactly the same as when the whole window is drawn every frame.
+#It is used by SnakeGame.redraw_window() in snakeGame.py.
+#*********************************************************************************
+
+try:
+	import pygame
+except ImportError:
+	pygame = None
+
+BACKGROUND_COLOR = (10, 49, 245)
+DATA_WINDOW_COLOR = (20, 20, 20)
+GRID_COLOR = (100, 100, 100)
+FRUIT_COLOR = (250, 30, 30)
+SNAKE_COLOR = (31, 240, 12)
+EYE_COLOR = (100, 100, 100)
+TEXT_COLOR = (255, 255, 255)
+EYE_RADIUS = 2
+#The number of pixels the eyes of the head can reach past the edges of its cell
+EYE_REACH = EYE_RADIUS + 1
+#The most text surfaces kept before the cache is cleared
+MAX_CACHED_TEXTS = 256
+
+_fonts = {}
+
+def get_font(name='calibri', size=20):
+	"""Function to get a font, which is only created the first time it is needed.
+
+	Creating a font looks through the fonts of the system, which is much too slow to do every frame.
+	"""
+
+	if (name, size) not in _fonts:
+		_fonts[(name, size)] = pygame.font.SysFont(name, size)
+
+	return _fonts[(name, size)]
+
+
+class GameRenderer():
+	"""Class that draws a SnakeGame in a pygame window, only drawing what changed since the last frame.
+
+	Attributes:
+		self.win: The pygame surface of the window.
+		self.width: The width of the window.
+		self.height: The height of the window.
+		self.grid_start_y: The y position where the game grid begins.
+		self.rows: The number of rows in the grid the background was drawn for, or None before the first frame.
+		self.cols: The number of columns in the grid the background was drawn for, or None before the first frame.
+		self.space_col: The width of a column of the grid.
+		self.space_row: The height of a row of the grid.
+		self.background: A surface with the background, the segment for the scores and the grid lines, or None.
+		self.text_surfaces: A dictionary with the rendered surface of each text that was drawn.
+		self.drawn_texts: The list of (text, position) tuples that is on the screen.
+		self.drawn_body: A set of the positions of the snake's body that is on the screen.
+		self.drawn_head: The position of the head that is on the screen.
+		self.drawn_direction: The name of the direction of the head that is on the screen.
+		self.drawn_fruit: The position of the fruit that is on the screen.
+	"""
+
+	def __init__(self, win, width, height, grid_start_y):
+		"""Initializes the GameRenderer class."""
+
+		self.win = win
+		self.width = width
+		self.height = height
+		self.grid_start_y = grid_start_y
+		self.rows = None
+		self.cols = None
+		self.space_col = None
+		self.space_row = None
+		self.background = None
+		self.text_surfaces = {}
+		self.drawn_texts = None
+		self.drawn_body = set()
+		self.drawn_head = None
+		self.drawn_direction = None
+		self.drawn_fruit = None
+
+	def draw_background(self, rows, cols):
+		"""Function to draw the parts of the window that never change for a grid size.
+
+		Arguments:
+			rows: The number of rows in the grid.
+			cols: The number of columns in the grid.
+		"""
+
+		self.rows = rows
+		self.cols = cols
+		self.space_col = self.width//cols
+		self.space_row = (self.height - self.grid_start_y)//rows
+		space_col = self.space_col
+		space_row = self.space_row
+
+		background = pygame.Surface((self.width, self.height)).convert(self.win)
+		background.fill(pygame.Color(*BACKGROUND_COLOR))
+		pygame.draw.rect(background, pygame.Color(*DATA_WINDOW_COLOR), (0,0,self.width, self.grid_start_y))
+
+		for i in range(rows):
+			#draw horizontal line
+			pygame.draw.line(background, pygame.Color(*GRID_COLOR), (0, space_row*i + self.grid_start_y),  (self.width, space_row*i + self.grid_start_y))
+
+		for i in range(cols):
+			#draw vertical line
+			pygame.draw.line(background, pygame.Color(*GRID_COLOR), (space_col*i, self.grid_start_y), (space_col*i, self.height))
+
+		#draw last lines so they are not cut off
+		pygame.draw.line(background, pygame.Color(*GRID_COLOR), (space_col*rows-2, self.grid_start_y), (space_col*rows-2, self.height))
+		pygame.draw.line(background, pygame.Color(*GRID_COLOR), (0, self.height -2),  (self.width, self.height -2))
+
+		self.background = background
+
+	def text_surface(self, text):
+		"""Function to get the rendered surface of a text, which is only rendered the first time it is needed."""
+
+		surface = self.text_surfaces.get(text)
+		if surface is None:
+			if len(self.text_surfaces) >= MAX_CACHED_TEXTS:
+				self.text_surfaces.clear()
+			surface = get_font().render(text, 1, TEXT_COLOR)
+			self.text_surfaces[text] = surface
+
+		return surface
+
+	def cell_area(self, pos):
+		"""Function to get the area of the window that the drawing of a cell can reach, including the eyes of the head."""
+
+		area = pygame.Rect(self.space_col*pos[1] - EYE_REACH, self.grid_start_y + self.space_row*pos[0] - EYE_REACH, self.space_col + 2*EYE_REACH, self.space_row + 2*EYE_REACH)
+		return area.clip((0, 0, self.width, self.height))
+
+	def draw(self, game):
+		"""Function to draw a frame of a game and update the changed parts of the screen.
+
+		Arguments:
+			game: The SnakeGame to draw.
+		"""
+
+		body = set(game.snake.body)
+		head = game.snake.body[0]
+		head_dir = game.snake.head_direction_name()
+		fruit = game.fruit_pos
+		texts = game.data_texts()
+
+		areas = []
+		if self.background is None or game.rows != self.rows or game.cols != self.cols:
+			self.draw_background(game.rows, game.cols)
+			areas.append(pygame.Rect(0, 0, self.width, self.height))
+		else:
+			if texts != self.drawn_texts:
+				areas.append(pygame.Rect(0, 0, self.width, self.grid_start_y))
+			#The cells the snake entered or left, and the old and new head for its eyes
+			changed = body.symmetric_difference(self.drawn_body)
+			if head != self.drawn_head or head_dir != self.drawn_direction:
+				changed.add(head)
+				changed.add(self.drawn_head)
+			if fruit != self.drawn_fruit:
+				changed.add(fruit)
+				changed.add(self.drawn_fruit)
+			for pos in changed:
+				areas.append(self.cell_area(pos))
+
+		for area in areas:
+			self.draw_area(area, body, head, head_dir, fruit, texts)
+		self.win.set_clip(None)
+
+		self.drawn_texts = texts
+		self.drawn_body = body
+		self.drawn_head = head
+		self.drawn_direction = head_dir
+		self.drawn_fruit = fruit
+
+		if len(areas) > 0:
+			pygame.display.update(areas)
+
+	def draw_area(self, area, body, head, head_dir, fruit, texts):
+		"""Function to draw everything in an area of the window from scratch, in the same order as a whole frame.
+
+		The drawing is clipped to the area, so only the cells that reach into it are drawn.
+
+		Arguments:
+			area: The pygame.Rect to draw.
+			body: A set of the positions of the snake's body.
+			head: The position of the snake's head.
+			head_dir: The name of the direction the head is facing.
+			fruit: The position of the fruit.
+			texts: A list of (text, position) tuples for the segment with the scores.
+		"""
+
+		win = self.win
+		space_col = self.space_col
+		space_row = self.space_row
+		win.set_clip(area)
+		win.blit(self.background, area, area)
+
+		if area.top < self.grid_start_y:
+			for text, text_pos in texts:
+				win.blit(self.text_surface(text), text_pos)
+
+		#The rows and columns of the cells that can reach into the area
+		first_row = max(0, (area.top - self.grid_start_y - EYE_REACH)//space_row)
+		last_row = min(self.rows - 1, (area.bottom - self.grid_start_y + EYE_REACH)//space_row)
+		first_col = max(0, (area.left - EYE_REACH)//space_col)
+		last_col = min(self.cols - 1, (area.right + EYE_REACH)//space_col)
+
+		def in_area(pos):
+			return first_row <= pos[0] <= last_row and first_col <= pos[1] <= last_col
+
+		#Draw the fruit
+		if in_area(fruit):
+			pygame.draw.rect(win, pygame.Color(*FRUIT_COLOR), (space_col*fruit[1]+1, self.grid_start_y + space_row*fruit[0]+1, space_col-1, space_row-1))
+
+		#Draw the snake, looking up the cells of the area when the body is longer than the area is wide
+		if len(body) > (last_row - first_row + 1)*(last_col - first_col + 1):
+			cells = [(row, col) for row in range(first_row, last_row + 1) for col in range(first_col, last_col + 1) if (row, col) in body]
+		else:
+			cells = [pos for pos in body if in_area(pos)]
+		for pos in cells:
+			pygame.draw.rect(win, pygame.Color(*SNAKE_COLOR), (space_col*pos[1]+1, self.grid_start_y + space_row*pos[0]+1, space_col-1, space_row-1))
+
+		if in_area(head):
+			self.draw_eyes(head, head_dir)
+
+	def draw_eyes(self, head, head_dir):
+		"""Function to draw eyes on the head of the snake, facing the direction it is moving in."""
+
+		win = self.win
+		space_col = self.space_col
+		space_row = self.space_row
+		head_y = head[0]
+		head_x = head[1]
+
+		#if head facing left
+		if head_dir == "left":
+			#draw left eye
+			pygame.draw.circle(win, pygame.Color(*EYE_COLOR), (space_col*head_x+space_col//10, self.grid_start_y + space_row*head_y + (space_row*4)//5), EYE_RADIUS)
+			#draw right eye
+			pygame.draw.circle(win, pygame.Color(*EYE_COLOR), (space_col*head_x+space_col//10, self.grid_start_y + space_row*head_y + space_row//5), EYE_RADIUS)
+		#if head facing up
+		elif head_dir == "up":
+			#draw left eye
+			pygame.draw.circle(win, pygame.Color(*EYE_COLOR), (space_col*head_x+space_col//5, self.grid_start_y + space_row*head_y + space_row//10), EYE_RADIUS)
+			#draw right eye
+			pygame.draw.circle(win, pygame.Color(*EYE_COLOR), (space_col*head_x+(space_col*4)//5, self.grid_start_y + space_row*head_y + space_row//10), EYE_RADIUS)
+		#if head facing right
+		elif head_dir == "right":
+			#draw left eye
+			pygame.draw.circle(win, pygame.Color(*EYE_COLOR), (space_col*head_x+(space_col*9)//10, self.grid_start_y + space_row*head_y + space_row//5), EYE_RADIUS)
+			#draw right eye
+			pygame.draw.circle(win, pygame.Color(*EYE_COLOR), (space_col*head_x+(space_col*9)//10, self.grid_start_y + space_row*head_y + (space_row*4)//5), EYE_RADIUS)
+		#if head is facing down
+		else:
+			#draw left eye
+			pygame.draw.circle(win, pygame.Color(*EYE_COLOR), (space_col*head_x+space_col//5, self.grid_start_y + space_row*head_y + (space_row*9)//10), EYE_RADIUS)
+			#draw right eye
+			pygame.draw.circle(win, pygame.Color(*EYE_COLOR), (space_col*head_x+(space_col*4)//5, self.grid_start_y + space_row*head_y + (space_row*9)//10), EYE_RADIUS)
@@ -0,0 +1,255 @@
+#**************************************************************************************
+#generationEvaluator.py
+#Module with the GenerationEvaluator class, which plays every chromosome of a
+#generation in headless games spread over a pool of worker processes.
+#It is used by trainGeneticAlgorithm.py together with SnakeGameGATrain.evaluate_generation().
+#When a run is spectated, every worker process sends snapshots of its games to the
+#viewer (see spectator.py).
+#*************************************************************************************
+
+import os
+import concurrent.futures
+from helpers.snakeGameGATest import SnakeGameGATest
+from helpers.snakeGameGATrain import calc_fitness
+from helpers.seeds import episodeSeed
+from helpers.spectator import SpectatorPublisher
+from helpers.profiler import PhaseProfiler
+from helpers import neuralNetwork as nn
+
+
+class SnakeGameGAEpisode(SnakeGameGATest):
+	"""Class that plays a single headless game with one agent to measure its fitness.
+
+	Inherits the SnakeGameGATest class, and follows the same rules as SnakeGameGATrain.
+
+	Attributes:
+		self.frames_alive: The number of frames the agent has been alive.
+		self.fitness: The fitness score of the agent, or None until the game is over.
+		self.final_score: The in-game score of the agent, or None until the game is over.
+		self.chromosome: The chromosome bit string of the agent.
+		self.generation: The number of the generation the agent belongs to, sent with the spectator snapshots.
+		self.spectator: A SpectatorPublisher (see spectator.py) that sends snapshots of the game, or None.
+	"""
+
+	def __init__(self, chromosome, bits_per_weight, num_inputs, num_hidden_layer_nodes, num_outputs, seed=None, bitboard=False, grid_size=10, profiler=None):
+		"""Initializes the SnakeGameGAEpisode class.
+
+		Arguments:
+			chromosome: A string of bits representing all of the weights for the neural network.
+			bits_per_weight: The number of bits per each weight in the nueral network.
+			num_inputs: The number of inputs in the neural network.
+			num_hidden_layer_nodes: The number of nodes per each of the 2 hidden layers in the neural network.
+			num_ouputs: The number of outputs in the neural network.
+			seed: The seed for placing the fruit, or None for an unpredictable game.
+			bitboard: Whether to calculate the open spaces with bitboards (see SnakeGameGATest).
+			grid_size: The number of rows and columns in the grid (see SnakeGame).
+			profiler: A PhaseProfiler to time and count the game with, or None. It also counts whether
+			the chromosome had to be decoded or was found in the weight cache (see neuralNetwork.compileChromosome()).
+		"""
+
+		decodes = nn.weightCache.misses
+		super().__init__(0, chromosome, bits_per_weight, num_inputs, num_hidden_layer_nodes, num_outputs, headless=True, seed=seed, bitboard=bitboard, grid_size=grid_size)
+		self.profiler = profiler
+		if profiler is not None:
+			profiler.count("decodes" if nn.weightCache.misses > decodes else "weight_cache_hits")
+		self.frames_alive = 0
+		self.fitness = None
+		self.final_score = None
+		self.chromosome = chromosome
+		self.generation = 0
+		self.spectator = None
+
+	def run(self):
+		"""Function that plays the game until the agent dies.
+
+		Returns:
+			fitness: The fitness score of the agent.
+			score: The in-game score of the agent.
+		"""
+
+		while self.fitness is None:
+			self.advance()
+
+		return self.fitness, self.final_score
+
+	def advance(self):
+		"""Function that plays one frame of the game, so several games can be played side by side (see dashboard.py)."""
+
+		self.step()
+		if not self.restart:
+			self.frames_alive += 1
+			if self.spectator is not None:
+				self.spectator.publish(self, self.generation, self.chromosome)
+
+	def game_over(self):
+		"""Function that records the fitness of the agent upon game over.
+
+		This overrides the method in the SnakeGameGATest superclass."""
+
+		self.fitness = calc_fitness(self.score, self.frames_alive, self.frames_since_last_fruit)
+		self.final_score = self.score
+		super().game_over()
+
+
+def evaluate_chromosome(chromosome, bits_per_weight, num_inputs, num_hidden_layer_nodes, num_outputs, seed=None, profiler=None, spectator=None, generation=0, bitboard=False):
+	"""Function that plays one headless game with a chromosome.
+
+	With a seed, the result only depends on the chromosome and the seed.
+
+	Arguments:
+		chromosome: A string of bits representing all of the weights for the neural network.
+		bits_per_weight: The number of bits per each weight in the nueral network.
+		num_inputs: The number of inputs in the neural network.
+		num_hidden_layer_nodes: The number of nodes per each of the 2 hidden layers in the neural network.
+		num_ouputs: The number of outputs in the neural network.
+		seed: The seed for placing the fruit, or None for an unpredictable game.
+		profiler: A PhaseProfiler to time the game with, or None.
+		spectator: A SpectatorPublisher to send snapshots of the game to, or None.
+		generation: The number of the generation the chromosome belongs to, sent with the snapshots.
+		bitboard: Whether to calculate the open spaces with bitboards (see SnakeGameGATest).
+
+	Returns:
+		fitness: The fitness score of the chromosome.
+		score: The in-game score of the chromosome.
+	"""
+
+	episode = SnakeGameGAEpisode(chromosome, bits_per_weight, num_inputs, num_hidden_layer_nodes, num_outputs, seed, bitboard, profiler=profiler)
+	episode.spectator = spectator
+	episode.generation = generation
+	return episode.run()
+
+
+#The network shape used by a worker process, set once by _init_worker() so it is not sent with every chromosome
+_worker_network_shape = None
+#The SpectatorPublisher of a worker process, or None when the run is not spectated
+_worker_spectator = None
+#Whether a worker process calculates the open spaces with bitboards
+_worker_bitboard = False
+#Whether a worker process counts the steps, open space cells searched, forward passes and decodes of its games
+_worker_profile = False
+
+def _init_worker(network_shape, spectator_port=None, spectator_fps=30, weight_cache_size=None, bitboard=False, profile=False):
+	"""Function that stores the network shape and game settings in a freshly started worker process, sizes
+	its cache of compiled chromosomes, and opens its own SpectatorPublisher if the run is spectated."""
+
+	global _worker_network_shape, _worker_spectator, _worker_bitboard, _worker_profile
+	_worker_network_shape = network_shape
+	_worker_bitboard = bitboard
+	_worker_profile = profile
+	if weight_cache_size is not None:
+		nn.setWeightCacheSize(weight_cache_size)
+	if spectator_port is not None:
+		_worker_spectator = SpectatorPublisher(spectator_port, spectator_fps)
+
+def _evaluate_in_worker(chromosome, seed, generation):
+	"""Function that plays one chromosome inside a worker process.
+
+	Returns:
+		fitness: The fitness score of the chromosome.
+		score: The in-game score of the chromosome.
+		counters: A dictionary with the profiler counters of the game, or None when the run is not profiled.
+	"""
+
+	profiler = PhaseProfiler() if _worker_profile else None
+	fitness, score = evaluate_chromosome(chromosome, *_worker_network_shape, seed, profiler, _worker_spectator, generation, _worker_bitboard)
+	return fitness, score, dict(profiler.counters) if profiler is not None else None
+
+
+class GenerationEvaluator():
+	"""Class that measures the fitness of every chromosome in a generation.
+
+	The chromosomes are independent, so they are played in parallel by a pool of
+	worker processes that is started once and reused for every generation.
+
+	Attributes:
+		self.network_shape: A tuple of (bits_per_weight, num_inputs, num_hidden_layer_nodes, num_outputs).
+		self.workers: The number of worker processes. With 1 worker, games are played in this process.
+		self.chunksize: The number of chromosomes sent to a worker at a time, or None to pick one
+		from the population size.
+		self.executor: The ProcessPoolExecutor running the workers, or None when there is only 1 worker.
+		self.run_seed: The seed of the training run, or None for unpredictable games.
+		With a run seed, each chromosome is played in a game seeded from the chromosome itself, so the
+		results do not depend on the number of workers.
+		self.profiler: A PhaseProfiler (see profiler.py) for the games, or None. The games played in this
+		process are timed and counted, while the worker processes only send back the counters of their games,
+		which are added to it.
+		self.spectator: The SpectatorPublisher for the games played in this process, or None.
+		Every worker process opens its own, so it is only used with 1 worker.
+		self.generation: The number of the generation being evaluated, sent with the spectator snapshots.
+		self.bitboard: Whether the games calculate the open spaces with bitboards (see SnakeGameGATest).
+	"""
+
+	def __init__(self, bits_per_weight, num_inputs, num_hidden_layer_nodes, num_outputs, workers=None, chunksize=None, run_seed=None, profiler=None, spectator_port=None, spectator_fps=30, weight_cache_size=None, bitboard=False):
+		"""Initializes the GenerationEvaluator class.
+
+		Arguments:
+			bits_per_weight: The number of bits per each weight in the nueral network.
+			num_inputs: The number of inputs in the neural network.
+			num_hidden_layer_nodes: The number of nodes per each of the 2 hidden layers in the neural network.
+			num_ouputs: The number of outputs in the neural network.
+			workers: The number of worker processes, or None to use one per CPU core.
+			chunksize: The number of chromosomes sent to a worker at a time, or None to pick one automatically.
+			run_seed: The seed of the training run, or None for unpredictable games.
+			profiler: A PhaseProfiler for the timers and counters of the games, or None.
+			spectator_port: The port of the viewer to send snapshots of the games to, or None to not send any.
+			spectator_fps: The most snapshots sent per second by each process.
+			weight_cache_size: The number of compiled chromosomes each worker process keeps (see
+			neuralNetwork.setWeightCacheSize()), or None for the default.
+			bitboard: Whether the games calculate the open spaces with bitboards.
+		"""
+
+		self.network_shape = (bits_per_weight, num_inputs, num_hidden_layer_nodes, num_outputs)
+		self.workers = workers if workers is not None else os.cpu_count() or 1
+		self.chunksize = chunksize
+		self.executor = None
+		self.run_seed = run_seed
+		self.profiler = profiler
+		self.spectator = None
+		self.generation = 0
+		self.bitboard = bitboard
+		if self.workers > 1:
+			self.executor = concurrent.futures.ProcessPoolExecutor(max_workers=self.workers, initializer=_init_worker, initargs=(self.network_shape, spectator_port, spectator_fps, weight_cache_size, bitboard, profiler is not None))
+		elif spectator_port is not None:
+			self.spectator = SpectatorPublisher(spectator_port, spectator_fps)
+
+	def evaluate(self, population):
+		"""Function that plays every chromosome in a population.
+
+		Arguments:
+			population: A list of chromosome bit strings.
+
+		Returns:
+			fitness_scores: A list of fitness scores, each index corresponding to a chromosome in population.
+			game_scores: A list of in-game scores, each index corresponding to a chromosome in population.
+		"""
+
+		seeds = [episodeSeed(self.run_seed, chrom) for chrom in population]
+
+		if self.executor is None:
+			results = [evaluate_chromosome(chrom, *self.network_shape, seed, self.profiler, self.spectator, self.generation, self.bitboard) for chrom, seed in zip(population, seeds)]
+		else:
+			chunksize = self.chunksize
+			if chunksize is None:
+				#A few chunks per worker balances the load without too much messaging
+				chunksize = max(1, len(population)//(self.workers*4))
+			generations = [self.generation]*len(population)
+			results = list(self.executor.map(_evaluate_in_worker, population, seeds, generations, chunksize=chunksize))
+			if self.profiler is not None:
+				for _, _, counters in results:
+					for name, amount in counters.items():
+						self.profiler.count(name, amount)
+
+		fitness_scores = [result[0] for result in results]
+		game_scores = [result[1] for result in results]
+
+		return fitness_scores, game_scores
+
+	def close(self):
+		"""Function that shuts down the worker processes."""
+
+		if self.executor is not None:
+			self.executor.shutdown()
+			self.executor = None
+		if self.spectator is not None:
+			self.spectator.close()
+			self.spectator = None
@@ -10,15 +10,28 @@
 #*********************************************************************************
 
 import random
+import bisect
 import itertools
 import statistics
+import collections
 
-def genPopulation(popSize, numBits):
+#The ways parents can be selected, see selectPairs()
+SELECTION_METHODS = ("roulette", "alias", "rank", "tournament")
+#The ways the best parents are kept for the next generation, see extractBestParents()
+ELITE_MODES = ("above_median", "top_half")
+#The quantiles of the fitness scores reported by fitnessStats()
+QUANTILES = (.25, .5, .75)
+
+#Statistics about the fitness scores of a population, see fitnessStats()
+FitnessStats = collections.namedtuple("FitnessStats", ["bestIndex", "bestFitness", "totalFitness", "averageFitness", "bestScoresCutoff", "quantiles"])
+
+def genPopulation(popSize, numBits, rng=random):
 	"""Function that randomly generates a population of chromosomes
 
 	Arguments:
 		popSize: The number of indivduals/chromosomes in the population.
 		numBits: The number of bits per each chromosome.
+		rng: The random number generator to use, such as a random.Random object. Defaults to the random module.
 
 	Returns:
 		chromosomes: A list of all the chromosome bit strings in the population.
@@ -32,19 +45,55 @@ def genPopulation(popSize, numBits):
 
 		for _ in range(numBits):
 
-			bit = random.randrange(2)
+			bit = rng.randrange(2)
 			chromosome += str(bit)
 
 		chromosomes.append(chromosome)
 
 	return chromosomes
 
-def createNextGeneration(parentPop, fitnessScores):
+def warmStartPopulation(seedChromosomes, popSize, numBits, mutatedFraction=.25, rng=random):
+	"""Function that generates a population seeded from chosen chromosomes, such as previously trained agents.
+
+	The population holds every seed chromosome once, then mutated copies of the seed chromosomes
+	in turn until mutatedFraction of the population is seeded, and random chromosomes for the rest.
+
+	Arguments:
+		seedChromosomes: A list of chromosome bit strings to seed the population with.
+		popSize: The number of indivduals/chromosomes in the population.
+		numBits: The number of bits per each chromosome.
+		mutatedFraction: The share of the population to fill with the seed chromosomes and their mutated copies.
+		rng: The random number generator to use, such as a random.Random object. Defaults to the random module.
+
+	Returns:
+		chromosomes: A list of all the chromosome bit strings in the population.
+	"""
+
+	for chrom in seedChromosomes:
+		if len(chrom) != numBits:
+			raise ValueError("A seed chromosome has " + str(len(chrom)) + " bits, but the population has " + str(numBits) + " bits per chromosome")
+
+	chromosomes = list(seedChromosomes[:popSize])
+
+	numSeeded = 0
+	if len(seedChromosomes) > 0:
+		numSeeded = max(len(chromosomes), int(popSize*mutatedFraction))
+	while len(chromosomes) < numSeeded:
+		chromosomes.append(mutation(seedChromosomes[len(chromosomes)%len(seedChromosomes)], rng))
+
+	return chromosomes + genPopulation(popSize - len(chromosomes), numBits, rng)
+
+def createNextGeneration(parentPop, fitnessScores, rng=random, selectionMethod="roulette", tournamentSize=3, eliteMode="above_median", stats=None):
 	"""Function that moves onto the next generation by employing selection, crossover, and mutation on a population
 
 	Arguments:
 		parentPop: A list of chromosome bit strings representing the parent population.
 		fitnessScores: A list of fitness scores that corresponds to each chromosome in parentPop by index.
+		rng: The random number generator to use, such as a random.Random object. Defaults to the random module.
+		selectionMethod: One of SELECTION_METHODS, see selectPairs(). Defaults to fitness proportional roulette wheel selection.
+		tournamentSize: The number of chromosomes competing in each tournament for tournament selection.
+		eliteMode: One of ELITE_MODES, see extractBestParents().
+		stats: The FitnessStats of fitnessScores if they were already calculated, or None.
 
 	Returns:
 		childPop: The new population of chromosome bit strings.
@@ -53,30 +102,128 @@ def createNextGeneration(parentPop, fitnessScores):
 		averageFitness: The average fitness score of the parent population.
 	"""
 
-	#Assign fitness scores
-	fitnessRouletteCutoffs, bestIndividual, bestFitness, averageFitness = assignFitnessRatios(parentPop, fitnessScores)
+	#Get data about the fitness scores
+	if stats is None:
+		stats = fitnessStats(fitnessScores)
 
 	childPop = []
 
 	#Save the best individuals from the previous generation
-	bestParents  = extractBestParents(parentPop, fitnessScores)
+	bestParents  = extractBestParents(parentPop, fitnessScores, eliteMode, stats.bestScoresCutoff)
+
+	#Selection of the parents of every child at once
+	selectedPairs = selectPairs(parentPop, fitnessScores, len(parentPop) - len(bestParents), rng, selectionMethod, tournamentSize)
 
 	#Create a child population the same size as the parent population
-	for _ in range(len(parentPop) - len(bestParents)):
+	for selectedPair in selectedPairs:
 
-		#Selection
-		selectedPair = selection(parentPop, fitnessRouletteCutoffs)
 		#Crossover
-		child = crossOver(selectedPair)
+		child = crossOver(selectedPair, rng)
 		#Mutation
-		child = mutation(child)
+		child = mutation(child, rng)
 
 		childPop.append(child)
 
 	#Combine the best parents from the old generation with the new generation
 	childPop = childPop + bestParents
 
-	return childPop, bestIndividual, bestFitness, averageFitness
+	return childPop, parentPop[stats.bestIndex], stats.bestFitness, stats.averageFitness
+
+def fitnessStats(fitnessScores, quantiles=QUANTILES):
+	"""Function that calculates the statistics of the fitness scores of a population.
+
+	The best and total fitness are found in a single pass, and the median cutoff and the quantiles
+	with partial selection instead of sorting the scores.
+
+	Arguments:
+		fitnessScores: A list of fitness scores of a population.
+		quantiles: The quantiles to report, as values between 0 and 1.
+
+	Returns:
+		A FitnessStats with:
+		bestIndex: The index of the highest fitness, the first one if several are equal.
+		bestFitness: The highest fitness.
+		totalFitness: The sum of the fitness scores.
+		averageFitness: The average fitness score.
+		bestScoresCutoff: The fitness score that the (n+n) method compares against, see extractBestParents().
+		quantiles: A tuple with the fitness score at each requested quantile, the lower one when
+		it falls between two scores.
+	"""
+
+	bestIndex = 0
+	bestFitness = fitnessScores[0]
+	totalFitness = 0
+	for i, score in enumerate(fitnessScores):
+		totalFitness += score
+		if score > bestFitness:
+			bestIndex = i
+			bestFitness = score
+
+	maxIndex = len(fitnessScores) - 1
+	cutoffIndex = int(maxIndex*(1/2))
+	quantileIndices = [int(maxIndex*quantile) for quantile in quantiles]
+
+	#Partially order a copy of the scores, one order statistic after another
+	#Each selection leaves the scores after it no smaller, so the next one only searches those
+	scores = list(fitnessScores)
+	selected = {}
+	lo = 0
+	for k in sorted(set(quantileIndices + [cutoffIndex])):
+		selected[k] = selectKth(scores, k, lo)
+		lo = k
+
+	return FitnessStats(bestIndex, bestFitness, totalFitness, totalFitness/len(fitnessScores), selected[cutoffIndex], tuple(selected[k] for k in quantileIndices))
+
+def selectKth(values, k, lo=0, hi=None):
+	"""Function to find the value that would be at index k if values[lo:hi] were sorted, without sorting it.
+
+	This is a quickselect with a three way partition, so it takes linear time on average even
+	when many values are equal. The pivots do not use random numbers, so the result is always the same.
+
+	Arguments:
+		values: A list of values, which is reordered in place so that values[k] is the selected value,
+		with no larger value before it and no smaller value after it within values[lo:hi].
+		k: The index to select, with lo <= k < hi.
+		lo: The start of the range of values to select from.
+		hi: The end of the range of values to select from, or None for the end of values.
+
+	Returns:
+		The selected value.
+	"""
+
+	if hi is None:
+		hi = len(values)
+
+	while hi - lo > 1:
+		#The median of the first, middle and last values is the pivot
+		pivot = sorted((values[lo], values[(lo + hi)//2], values[hi - 1]))[1]
+
+		#Split the range into values less than, equal to and greater than the pivot
+		less = lo
+		i = lo
+		greater = hi
+		while i < greater:
+			value = values[i]
+			if value < pivot:
+				values[i] = values[less]
+				values[less] = value
+				less += 1
+				i += 1
+			elif value > pivot:
+				greater -= 1
+				values[i] = values[greater]
+				values[greater] = value
+			else:
+				i += 1
+
+		if k < less:
+			hi = less
+		elif k >= greater:
+			lo = greater
+		else:
+			return pivot
+
+	return values[k]
 
 
 def assignFitnessRatios(parentPop, fitnessScores):
@@ -96,52 +243,61 @@ def assignFitnessRatios(parentPop, fitnessScores):
 	"""
 
 	#Get data about the fitness scores
-	bestFitness = max(fitnessScores)
-	bestIndividual = parentPop[fitnessScores.index(bestFitness)]
-	totalScore = sum(fitnessScores)
-	averageFitness = totalScore/len(fitnessScores)
-	
+	stats = fitnessStats(fitnessScores, ())
+	bestIndividual = parentPop[stats.bestIndex]
 
 	#Calculate the fitness ratios
 	#Each score in the list of fitness ratios corresponds to
 	#the chromosome in the parentPop list at the same index
 	fitnessRatios = []
 
-	totalScore = sum(fitnessScores)
 	#Calculate the fitness ratios
 	for score in fitnessScores:
-		ratio = score/totalScore
+		ratio = score/stats.totalFitness
 		fitnessRatios.append(ratio)
 
 	#Get the cutoffs for roulette wheel selection
 	#each cutoff corresponds to the chromosome in the parentPop list at the same index
 	fitnessRouletteCutoffs = list(itertools.accumulate(fitnessRatios))
 
-	return fitnessRouletteCutoffs, bestIndividual, bestFitness, averageFitness
+	return fitnessRouletteCutoffs, bestIndividual, stats.bestFitness, stats.averageFitness
 
 
-def extractBestParents(parentPop, fitnessScores):
+def extractBestParents(parentPop, fitnessScores, eliteMode="above_median", bestScoresCutoff=None):
 	"""Function that extracts the parent chromosomes with a fitness in the top 1/2 of scores.
 	
 	This is known as the (n+n) method, and is used to save parent chromosomes in case they are valuable.
+	The elite modes are:
+		"above_median": Keep every chromosome with a fitness strictly above the median cutoff, so
+		fewer than half are kept when several scores equal the cutoff.
+		"top_half": Keep as many chromosomes as "above_median" keeps when all the scores are different,
+		filling the places left by equal scores with the chromosomes at the cutoff that come first.
 
 	Arguments:
 		parentPop: A list of chromosome bit strings representing the parent population.
 		fitnessScores: A list of fitness scores that corresponds to each chromosome in parentPop by index.
+		eliteMode: One of ELITE_MODES.
+		bestScoresCutoff: The median cutoff from fitnessStats(), or None to calculate it.
 	Returns:
-		bestParents: A list of the chromsome bit strings with the top 1/2 of fitness scores.
+		bestParents: A list of the chromsome bit strings with the top 1/2 of fitness scores, in population order.
 
 	"""
 
-	fitnessScoresCopy = fitnessScores.copy()
-	fitnessScoresCopy.sort()
-
 	maxIndex = len(fitnessScores) - 1
 
 	bestScoresCutoffIndex = int(maxIndex*(1/2))
 
 	#Get a cutoff value for the median fitness score
-	bestScoresCutoff = fitnessScoresCopy[bestScoresCutoffIndex]
+	if bestScoresCutoff is None:
+		bestScoresCutoff = selectKth(list(fitnessScores), bestScoresCutoffIndex)
+
+	if eliteMode == "above_median":
+		numAtCutoff = 0
+	elif eliteMode == "top_half":
+		numAbove = sum(1 for score in fitnessScores if score > bestScoresCutoff)
+		numAtCutoff = maxIndex - bestScoresCutoffIndex - numAbove
+	else:
+		raise ValueError("Unknown elite mode " + repr(eliteMode) + ", expected one of " + str(ELITE_MODES))
 
 	bestParents = []
 
@@ -150,19 +306,23 @@ def extractBestParents(parentPop, fitnessScores):
 
 		if fitnessScores[i] > bestScoresCutoff:
 			bestParents.append(parentPop[i])
+		elif numAtCutoff > 0 and fitnessScores[i] == bestScoresCutoff:
+			bestParents.append(parentPop[i])
+			numAtCutoff -= 1
 
 	return bestParents
 
 
 
 
-def selection(parentPop, fitnessRouletteCutoffs):
+def selection(parentPop, fitnessRouletteCutoffs, rng=random):
 	"""Function to do selection for the genetic algorithm to get one pair of parent chromosome bit strings.
 
 	Arguments:
 		parentPop: A list of chromosome bit strings representing the parent population.
 		fitnessRouletteCutoffs: A list of increasing decimal values between 0 and 1 and ending at 1, which
 		are used to assign a proability of selection.
+		rng: The random number generator to use, such as a random.Random object. Defaults to the random module.
 	Returns:
 		pair: A list of the two selected parent chromsome bit strings.
 	"""
@@ -173,18 +333,159 @@ def selection(parentPop, fitnessRouletteCutoffs):
 	for _ in range(2):
 
 		#Get a random value between 0 and 1
-		randVal = random.random()
+		randVal = rng.random()
 
-		for i, cutoff in enumerate(fitnessRouletteCutoffs):
-			#If the random value is less than the cutoff, then select the 
-			#chromosome in the parent population with the corresponding index
-			if randVal < cutoff:
-				pair.append(parentPop[i])
-				break
+		pair.append(parentPop[rouletteIndex(fitnessRouletteCutoffs, randVal)])
 
 	return pair
 
-def crossOver(pair):
+def rouletteIndex(fitnessRouletteCutoffs, randVal):
+	"""Function to find the chromosome selected by a spin of the roulette wheel with a binary search.
+
+	Arguments:
+		fitnessRouletteCutoffs: A list of increasing decimal values between 0 and 1 and ending at 1.
+		randVal: A random value between 0 and 1.
+
+	Returns:
+		The index of the first cutoff that is greater than randVal.
+	"""
+
+	#Rounding can leave the last cutoff just below 1, in which case the last chromosome is selected
+	return min(bisect.bisect_right(fitnessRouletteCutoffs, randVal), len(fitnessRouletteCutoffs) - 1)
+
+def selectPairs(parentPop, fitnessScores, numPairs, rng=random, selectionMethod="roulette", tournamentSize=3):
+	"""Function to do selection for the genetic algorithm to get every pair of parents of a generation at once.
+
+	The table used for sampling is built once, so each parent costs O(log n) for "roulette" and "rank",
+	O(1) for "alias" and O(tournamentSize) for "tournament", instead of a scan over the whole population.
+	The selection methods are:
+		"roulette": Fitness proportional selection, with a binary search over the roulette cutoffs.
+		"alias": Fitness proportional selection, with Vose's alias method.
+		"rank": Selection proportional to the rank of the fitness score, from 1 for the lowest to n for the highest.
+		"tournament": The fittest of tournamentSize chromosomes drawn at random, the first one drawn on ties.
+
+	Arguments:
+		parentPop: A list of chromosome bit strings representing the parent population.
+		fitnessScores: A list of fitness scores that corresponds to each chromosome in parentPop by index.
+		numPairs: The number of pairs of parents to select.
+		rng: The random number generator to use, such as a random.Random object. Defaults to the random module.
+		selectionMethod: One of SELECTION_METHODS.
+		tournamentSize: The number of chromosomes competing in each tournament for tournament selection.
+
+	Returns:
+		pairs: A list of numPairs lists of two selected parent chromosome bit strings.
+	"""
+
+	#When every fitness score is 0, such as in an early generation where no snake ate a fruit,
+	#fitness proportional selection picks every chromosome with the same probability
+	if (selectionMethod == "roulette" or selectionMethod == "alias") and not any(fitnessScores):
+		fitnessScores = [1]*len(fitnessScores)
+
+	if selectionMethod == "roulette" or selectionMethod == "rank":
+		if selectionMethod == "roulette":
+			weights = fitnessScores
+		else:
+			weights = rankWeights(fitnessScores)
+		totalWeight = sum(weights)
+		fitnessRouletteCutoffs = list(itertools.accumulate(weight/totalWeight for weight in weights))
+
+		def selectIndex():
+			return rouletteIndex(fitnessRouletteCutoffs, rng.random())
+
+	elif selectionMethod == "alias":
+		aliasTable = buildAliasTable(fitnessScores)
+
+		def selectIndex():
+			return aliasIndex(aliasTable, rng)
+
+	elif selectionMethod == "tournament":
+		popSize = len(fitnessScores)
+
+		def selectIndex():
+			best = rng.randrange(popSize)
+			for _ in range(tournamentSize - 1):
+				contestant = rng.randrange(popSize)
+				if fitnessScores[contestant] > fitnessScores[best]:
+					best = contestant
+			return best
+
+	else:
+		raise ValueError("Unknown selection method " + repr(selectionMethod) + ", expected one of " + str(SELECTION_METHODS))
+
+	return [[parentPop[selectIndex()], parentPop[selectIndex()]] for _ in range(numPairs)]
+
+def rankWeights(fitnessScores):
+	"""Function to get the rank of each fitness score, for rank selection.
+
+	Equal scores are ranked by their index, so the ranks do not depend on how the sort handles ties.
+
+	Arguments:
+		fitnessScores: A list of fitness scores.
+
+	Returns:
+		ranks: A list with the rank of each fitness score, from 1 for the lowest to len(fitnessScores) for the highest.
+	"""
+
+	ranks = [0]*len(fitnessScores)
+	for rank, i in enumerate(sorted(range(len(fitnessScores)), key=lambda i: (fitnessScores[i], i)), 1):
+		ranks[i] = rank
+
+	return ranks
+
+def buildAliasTable(weights):
+	"""Function to build the table of Vose's alias method for sampling indices proportionally to weights.
+
+	Arguments:
+		weights: A list of non negative weights, with a positive sum.
+
+	Returns:
+		probabilities: A list with the probability of keeping each index once it is drawn.
+		aliases: A list with the index to select instead of each index when it is not kept.
+	"""
+
+	numWeights = len(weights)
+	totalWeight = sum(weights)
+	scaled = [weight*numWeights/totalWeight for weight in weights]
+
+	probabilities = [1.0]*numWeights
+	aliases = list(range(numWeights))
+	small = [i for i, weight in enumerate(scaled) if weight < 1]
+	large = [i for i, weight in enumerate(scaled) if weight >= 1]
+
+	#Fill up each index with less than the average weight with the weight of an index with more
+	while len(small) > 0 and len(large) > 0:
+		less = small.pop()
+		more = large.pop()
+		probabilities[less] = scaled[less]
+		aliases[less] = more
+		scaled[more] = scaled[more] + scaled[less] - 1
+		if scaled[more] < 1:
+			small.append(more)
+		else:
+			large.append(more)
+
+	#Whatever is left over only differs from the average weight by rounding, so it is always kept
+
+	return probabilities, aliases
+
+def aliasIndex(aliasTable, rng=random):
+	"""Function to sample an index from the table of buildAliasTable().
+
+	Arguments:
+		aliasTable: The tuple of probabilities and aliases returned by buildAliasTable().
+		rng: The random number generator to use, such as a random.Random object. Defaults to the random module.
+
+	Returns:
+		The selected index.
+	"""
+
+	probabilities, aliases = aliasTable
+	i = rng.randrange(len(probabilities))
+	if rng.random() < probabilities[i]:
+		return i
+	return aliases[i]
+
+def crossOver(pair, rng=random):
 	"""Function to do Single-point crossover for a pair of parent chromosomes.
 	
 	Crossover creates one child chromsosome from two parent chromsomes by
@@ -192,6 +493,7 @@ def crossOver(pair):
 
 	Attributes:
 		pair: A pair of parent chromsome bit strings.
+		rng: The random number generator to use, such as a random.Random object. Defaults to the random module.
 	Returns:
 		child: The child chromosome bit string created from the pair of parent chromosomes.
 	"""
@@ -200,7 +502,7 @@ def crossOver(pair):
 	#Randomly determine which chromosome that is crossed over at the first
 	#half and which is cross over at the second half
 
-	randVal = random.randrange(2)
+	randVal = rng.randrange(2)
 	startWithFirst = True
 	if randVal == 0:
 		startWithFirst = False
@@ -208,7 +510,7 @@ def crossOver(pair):
 	#Randomly determine the crossover point
 	#Start by getting the number of bits in an individual chromosome
 	numBits = len(pair[0])
-	crossOverPoint = random.randrange(numBits)
+	crossOverPoint = rng.randrange(numBits)
 
 	#Create child offpsring with crossover
 	child = ""
@@ -227,13 +529,14 @@ def crossOver(pair):
 
 	return child
 
-def mutation(chrom):
+def mutation(chrom, rng=random):
 	"""Function for mutation on a single chromosome
 
 	The mutation rate is .008.
 
 	Attributes:
 		chrom: The chromosome bit string to be potentially mutated
+		rng: The random number generator to use, such as a random.Random object. Defaults to the random module.
 	Returns:
 		newString: The potentially mutated chromosome bit string
 	"""
@@ -244,7 +547,7 @@ def mutation(chrom):
 	bitList = list(chrom)
 	for i,bit in enumerate(bitList):
 
-		randVal = random.random()
+		randVal = rng.random()
 
 		#If the random chance of mutation occured
 		if randVal < MUTATION_RATE:
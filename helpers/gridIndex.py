@@ -0,0 +1,84 @@
+#*********************************************************************************
+#gridIndex.py
+#This module contains the GridIndex class, which precomputes the adjacency of
+#every cell in a grid of the Snake Game as flat lookup tables.
+#There is one GridIndex per grid size, built the first time it is needed and
+#shared by every game in the process, so the hot loop of a game never has to
+#build lists of moves or check bounds.
+#*********************************************************************************
+
+import functools
+from helpers.snake import DIRECTION_OFFSETS
+
+#The value in GridIndex.neighbor_cells for a direction that leads into a wall
+WALL = -1
+
+class GridIndex():
+	"""Class with precomputed adjacency tables for a grid.
+
+	Cells are flat indices, where the cell (row, column) is at index row*cols + column.
+
+	Attributes:
+		self.rows: The number of rows in the grid.
+		self.cols: The number of columns in the grid.
+		self.positions: A list of the (row,column) tuple of each cell.
+		self.neighbor_cells: A list with a tuple per cell of the cell to the left, above, to the right
+		and below it, indexed by direction code, where a wall is WALL.
+		self.neighbors: A list with a tuple per cell of only the in-bounds neighboring cells.
+		self.neighbor_positions: The same as self.neighbors, with (row,column) tuples instead of cells.
+	"""
+
+	def __init__(self, rows, cols):
+		"""Initializes the GridIndex class."""
+
+		self.rows = rows
+		self.cols = cols
+		self.positions = [(cell//cols, cell%cols) for cell in range(rows*cols)]
+		self.neighbor_cells = []
+		self.neighbors = []
+		self.neighbor_positions = []
+
+		for row, col in self.positions:
+			cells = []
+			for offset in DIRECTION_OFFSETS:
+				next_row = row + offset[0]
+				next_col = col + offset[1]
+				if next_row < 0 or next_row >= rows or next_col < 0 or next_col >= cols:
+					cells.append(WALL)
+				else:
+					cells.append(next_row*cols + next_col)
+			self.neighbor_cells.append(tuple(cells))
+			self.neighbors.append(tuple(cell for cell in cells if cell != WALL))
+			self.neighbor_positions.append(tuple(self.positions[cell] for cell in cells if cell != WALL))
+
+	def distances_from(self, pos):
+		"""Function to build a table of the manhattan distance from a position to every cell.
+
+		It is rebuilt only when the fruit moves, so the distances of the head's neighbors are lookups.
+
+		Arguments:
+			pos: A tuple in (row,column) format, such as the position of the fruit.
+
+		Returns:
+			A list with the manhattan distance from pos to each cell.
+		"""
+
+		row_dists = [abs(pos[0] - row) for row in range(self.rows)]
+		col_dists = [abs(pos[1] - col) for col in range(self.cols)]
+
+		return [row_dist + col_dist for row_dist in row_dists for col_dist in col_dists]
+
+
+@functools.lru_cache(maxsize=None)
+def get_grid_index(rows, cols):
+	"""Function to get the GridIndex of a grid size, which is shared by every game of that size.
+
+	Arguments:
+		rows: The number of rows in the grid.
+		cols: The number of columns in the grid.
+
+	Returns:
+		A GridIndex for the grid.
+	"""
+
+	return GridIndex(rows, cols)
@@ -0,0 +1,407 @@
+#*********************************************************************************
+#islandModel.py
+#This module trains the genetic algorithm as an island model: the population is
+#split into islands, and each island is evolved on its own worker process with
+#its own stream of random numbers (see seeds.py).
+#Every few generations the best chromosomes of each island migrate to the islands
+#it is connected to, in a ring or with every other island. The migrants are sent
+#through pipes in the binary format of checkpoint.py. With a seed, each island
+#waits for the migrants of the islands that send to it, which keeps the run
+#reproducible without a barrier across all islands; without a seed, islands never
+#wait and take in whichever migrants have already arrived.
+#The record of every generation of every island is sent to the main process,
+#which writes it to the telemetry with the island number, and once every island
+#has finished a generation, also writes a record that combines them all.
+#It is used in trainGeneticAlgorithm.py with --islands.
+#*********************************************************************************
+
+import time
+import queue
+import traceback
+import multiprocessing
+from helpers import geneticAlgorithm as ga
+from helpers import neuralNetwork as nn
+from helpers.generationEvaluator import GenerationEvaluator
+from helpers.fitnessCache import FitnessCache
+from helpers.snakeGameGATrain import new_ga_rng, gen_population, create_next_generation
+from helpers.seeds import deriveSeed, episodeSeed
+from helpers.checkpoint import encodeCheckpoint, packChromosome, unpackChromosome, Checkpoint
+
+TOPOLOGIES = ("ring", "full")
+#The number of seconds IslandModel.run() waits for a record before checking that the islands are still running
+RECORD_TIMEOUT = 1.0
+
+def migrationTargets(numIslands, topology="ring"):
+	"""Function to get the islands each island sends its migrants to.
+
+	Arguments:
+		numIslands: The number of islands.
+		topology: "ring" to send to the next island only, or "full" to send to every other island.
+
+	Returns:
+		A list with the list of target islands of each island.
+	"""
+
+	if topology == "ring":
+		return [[(island + 1)%numIslands] if numIslands > 1 else [] for island in range(numIslands)]
+	if topology == "full":
+		return [[target for target in range(numIslands) if target != island] for island in range(numIslands)]
+
+	raise ValueError("Unknown topology " + str(topology) + ", expected one of " + ", ".join(TOPOLOGIES))
+
+def selectMigrants(population, fitnessScores, numMigrants):
+	"""Function to get the best chromosomes of an island, which migrate to other islands.
+
+	Arguments:
+		population: A list of chromosome bit strings.
+		fitnessScores: A list of fitness scores that corresponds to each chromosome in population by index.
+		numMigrants: The number of chromosomes to select.
+
+	Returns:
+		A list of the indices of the migrants in population, from the best.
+	"""
+
+	order = sorted(range(len(population)), key=lambda i: fitnessScores[i], reverse=True)
+	return order[:numMigrants]
+
+def receiveMigrants(inbound, migrationRound, wait, stopEvent):
+	"""Function to read the migrants sent to an island.
+
+	Arguments:
+		inbound: A list of the receiving Connections of the pipes from the islands that send to this island.
+		migrationRound: The number of the migration.
+		wait: Whether to wait for the migrants of this round from every sending island, which keeps a run
+		with a seed reproducible. Otherwise only the migrants that already arrived are read.
+		stopEvent: The multiprocessing.Event that stops training, so an island never waits after it is set.
+
+	Returns:
+		A list of (chromosome, fitness, game score) tuples, or None if training was stopped or a sending island ended while waiting.
+	"""
+
+	migrants = []
+	for connection in inbound:
+		messages = []
+		if wait:
+			#Every island sends one message per round, in order, so the next message is the one of this round
+			while not connection.poll(.1):
+				if stopEvent.is_set():
+					return None
+			try:
+				messages.append(connection.recv_bytes())
+			except EOFError:
+				#The sending island ended before this round, so it failed
+				return None
+		else:
+			try:
+				while connection.poll():
+					messages.append(connection.recv_bytes())
+			except EOFError:
+				#The sending island already finished all of its generations
+				pass
+			#Only the newest migrants of each island are kept
+			messages = messages[-1:]
+
+		for message in messages:
+			with Checkpoint(message) as checkpoint:
+				if wait and checkpoint.header["round"] != migrationRound:
+					raise ValueError("Expected the migrants of round " + str(migrationRound) + ", not " + str(checkpoint.header["round"]))
+				for i in range(len(checkpoint)):
+					migrants.append((checkpoint.chromosome(i), checkpoint.fitness(i), checkpoint.game_score(i)))
+
+	return migrants
+
+def runIsland(island, settings, inbound, outbound, records, stopEvent):
+	"""Function that evolves one island, run in its own worker process.
+
+	Arguments:
+		island: The number of the island.
+		settings: A dictionary with the settings of the run, see IslandModel.
+		inbound: A list of the receiving Connections of the pipes from the islands that send to this island.
+		outbound: A list of the sending Connections of the pipes to the islands this island sends to.
+		records: The multiprocessing.Queue the record of every generation is put on.
+		stopEvent: The multiprocessing.Event that stops training.
+	"""
+
+	runSeed = settings["run_seed"]
+	shape = settings["network_shape"]
+	numBits = settings["num_bits"]
+	gaRng = new_ga_rng(deriveSeed(runSeed, "island", island, "ga") if runSeed is not None else None)
+	populationRng = new_ga_rng(deriveSeed(runSeed, "island", island, "population") if runSeed is not None else None)
+	population = gen_population(settings["island_size"], numBits, populationRng, settings["seed_chromosomes"], settings["warm_start_fraction"])
+	fitnessCache = FitnessCache(settings["cache_size"]) if settings["cache_size"] > 0 else None
+	#Keep the compiled weights of a whole generation of the island, so its best parents are not decoded again
+	nn.setWeightCacheSize(max(nn.WEIGHT_CACHE_SIZE, settings["island_size"]))
+	evaluator = GenerationEvaluator(*shape, workers=1, run_seed=runSeed, spectator_port=settings["spectator_port"], spectator_fps=settings["spectator_fps"], bitboard=settings["bitboard"])
+	highScore = 0
+	generation = 0
+	error = None
+
+	try:
+		while not stopEvent.is_set() and (settings["max_generations"] is None or generation < settings["max_generations"]):
+			generation += 1
+			playStart = time.perf_counter()
+			evaluator.generation = generation
+			if fitnessCache is None:
+				fitnessScores, gameScores = evaluator.evaluate(population)
+			else:
+				fitnessScores, gameScores = fitnessCache.evaluate(population, evaluator)
+			highScore = max(highScore, max(gameScores))
+			migrationStart = time.perf_counter()
+
+			#The best chromosomes leave for the next islands, and the migrants that arrive replace the worst
+			numArrived = 0
+			if generation%settings["migration_interval"] == 0 and len(outbound) + len(inbound) > 0:
+				migrationRound = generation//settings["migration_interval"]
+				migrantIndices = selectMigrants(population, fitnessScores, settings["num_migrants"])
+				message = encodeCheckpoint([population[i] for i in migrantIndices], [fitnessScores[i] for i in migrantIndices],
+					[gameScores[i] for i in migrantIndices], {"island": island, "round": migrationRound, "generation": generation})
+				for connection in outbound:
+					try:
+						connection.send_bytes(message)
+					except OSError:
+						#Without a seed, the island at the other end may already have finished
+						pass
+
+				migrants = receiveMigrants(inbound, migrationRound, settings["wait_for_migrants"], stopEvent)
+				if migrants is None:
+					break
+				worst = sorted(range(len(population)), key=lambda i: fitnessScores[i])[:len(migrants)]
+				for i, (chrom, fitness, gameScore) in zip(worst, migrants):
+					population[i] = chrom
+					fitnessScores[i] = fitness
+					gameScores[i] = gameScore
+					#A migrant that survives to the next generation is not played again
+					if fitnessCache is not None:
+						fitnessCache.store(chrom, fitness, gameScore, episodeSeed(runSeed, chrom))
+				numArrived = len(migrants)
+			gaStart = time.perf_counter()
+
+			stats = ga.fitnessStats(fitnessScores)
+			bestIndividual = population[stats.bestIndex]
+			nextPopulation, _, _, _ = create_next_generation(population, fitnessScores, gaRng, settings["selection_method"], settings["elite_mode"], stats)
+			gaEnd = time.perf_counter()
+
+			records.put({
+				"island": island,
+				"generation": generation,
+				"time": time.time(),
+				"play_seconds": migrationStart - playStart,
+				"migration_seconds": gaStart - migrationStart,
+				"ga_seconds": gaEnd - gaStart,
+				"best_fitness": stats.bestFitness,
+				"average_fitness": stats.averageFitness,
+				"fitness_quartiles": list(stats.quantiles),
+				"average_score": sum(gameScores)/len(gameScores),
+				"max_score": max(gameScores),
+				"high_score": highScore,
+				"migrants_in": numArrived,
+				#The best chromosome is sent packed, the main process writes it to the telemetry
+				"best_chromosome": packChromosome(bestIndividual),
+			})
+			population = nextPopulation
+	except Exception:
+		error = traceback.format_exc()
+	finally:
+		evaluator.close()
+		records.put({"island": island, "done": True, "error": error})
+
+
+class IslandModel():
+	"""Class that trains the genetic algorithm as islands on worker processes and merges their records.
+
+	Attributes:
+		self.num_islands: The number of islands.
+		self.settings: A dictionary with the settings passed to every island (see runIsland()).
+		self.telemetry: A TelemetryWriter (see telemetry.py) that records every generation, or None.
+		self.verbose: Whether to print a line of stats for every generation of the whole model.
+		self.records: The multiprocessing.Queue the islands put their records on.
+		self.stop_event: The multiprocessing.Event that stops the islands.
+		self.processes: The list of multiprocessing.Process objects of the islands.
+		self.connections: The list of both ends of every pipe between the islands, which this process closes once the islands start.
+		self.pending: A dictionary that maps a generation to the records of the islands that finished it.
+		self.high_score: The highest score achieved on any island.
+		self.num_generations: The number of generations every island has finished.
+	"""
+
+	def __init__(self, num_islands, island_size, bits_per_weight, num_inputs, num_hidden_layer_nodes, num_outputs, run_seed=None,
+		selection_method="roulette", elite_mode="above_median", cache_size=10000, migration_interval=10, num_migrants=2, topology="ring",
+		max_generations=None, seed_chromosomes=None, warm_start_fraction=.25, telemetry=None, verbose=True, spectator_port=None, spectator_fps=30, bitboard=False):
+		"""Initializes the IslandModel class.
+
+		Arguments:
+			num_islands: The number of islands, each evolved on its own process.
+			island_size: The number of chromosomes on each island.
+			bits_per_weight: The number of bits per each weight in the nueral network.
+			num_inputs: The number of inputs in the neural network.
+			num_hidden_layer_nodes: The number of nodes per each of the 2 hidden layers in the neural network.
+			num_ouputs: The number of outputs in the neural network.
+			run_seed: The seed of the training run, or None for an unpredictable run. With a seed, each island
+			waits for its migrants, so the run can be reproduced exactly.
+			selection_method: How the genetic algorithm selects parents (see geneticAlgorithm.selectPairs()).
+			elite_mode: How the genetic algorithm keeps the best parents (see geneticAlgorithm.extractBestParents()).
+			cache_size: The number of played chromosomes each island remembers (0 to disable).
+			migration_interval: The number of generations between migrations.
+			num_migrants: The number of the best chromosomes each island sends to each of its targets.
+			topology: Which islands each island sends migrants to, one of TOPOLOGIES (see migrationTargets()).
+			max_generations: The number of generations each island stops at, or None to never stop.
+			seed_chromosomes: A list of chromosomes to seed the first population of every island with, or None.
+			warm_start_fraction: The share of each first population filled with seed_chromosomes and their mutated copies.
+			telemetry: A TelemetryWriter that records every generation, or None.
+			verbose: Whether to print a line of stats for every generation of the whole model.
+			spectator_port: The port of spectateTraining.py to send snapshots of the games to, or None to not send any.
+			spectator_fps: The most snapshots sent per second by each island.
+			bitboard: Whether the games calculate the open spaces with bitboards (see SnakeGameGATest).
+		"""
+
+		targets = migrationTargets(num_islands, topology)
+		most_inbound = max(sum(island in island_targets for island_targets in targets) for island in range(num_islands))
+		if num_migrants*most_inbound >= island_size:
+			raise ValueError("The migrants arriving on an island must be fewer than the island size")
+
+		total_bits = ((num_inputs+1)*num_hidden_layer_nodes + num_hidden_layer_nodes*(num_hidden_layer_nodes+1) + num_outputs*(num_hidden_layer_nodes + 1))*bits_per_weight
+		self.num_islands = num_islands
+		self.settings = {
+			"network_shape": (bits_per_weight, num_inputs, num_hidden_layer_nodes, num_outputs),
+			"num_bits": total_bits,
+			"island_size": island_size,
+			"run_seed": run_seed,
+			"selection_method": selection_method,
+			"elite_mode": elite_mode,
+			"cache_size": cache_size,
+			"migration_interval": migration_interval,
+			"num_migrants": num_migrants,
+			"wait_for_migrants": run_seed is not None,
+			"max_generations": max_generations,
+			"seed_chromosomes": seed_chromosomes,
+			"warm_start_fraction": warm_start_fraction,
+			"spectator_port": spectator_port,
+			"spectator_fps": spectator_fps,
+			"bitboard": bitboard,
+		}
+		self.telemetry = telemetry
+		self.verbose = verbose
+		self.records = multiprocessing.Queue()
+		self.stop_event = multiprocessing.Event()
+		self.pending = {}
+		self.high_score = 0
+		self.num_generations = 0
+
+		#One pipe for every island that sends to another
+		inbound = [[] for _ in range(num_islands)]
+		outbound = [[] for _ in range(num_islands)]
+		for island, island_targets in enumerate(targets):
+			for target in island_targets:
+				receiver, sender = multiprocessing.Pipe(duplex=False)
+				inbound[target].append(receiver)
+				outbound[island].append(sender)
+		self.connections = [connection for connections in inbound + outbound for connection in connections]
+
+		self.processes = [multiprocessing.Process(target=runIsland, args=(island, self.settings, inbound[island], outbound[island], self.records, self.stop_event), daemon=True)
+			for island in range(num_islands)]
+
+	def run(self):
+		"""Function that starts the islands and writes their records until they are all done.
+
+		If training is interrupted, or an island fails or its process ends without finishing, the islands
+		are stopped before returning.
+		"""
+
+		for process in self.processes:
+			process.start()
+		#The islands have their own copies of the pipes, so the copies of this process are not needed
+		for connection in self.connections:
+			connection.close()
+
+		done = set()
+		errors = []
+		try:
+			while len(done) < self.num_islands:
+				#The records of an island are all on the queue before its process ends, so an island that had already
+				#ended before the wait and did not send its last record never will
+				ended = [island for island, process in enumerate(self.processes) if island not in done and not process.is_alive()]
+				try:
+					record = self.records.get(timeout=RECORD_TIMEOUT)
+				except queue.Empty:
+					for island in ended:
+						done.add(island)
+						errors.append("Island " + str(island) + " ended with exit code " + str(self.processes[island].exitcode) + " before it finished")
+						#The other islands could be waiting for migrants from this one
+						self.stop_event.set()
+					continue
+				if record.get("done"):
+					done.add(record["island"])
+					if record["error"] is not None:
+						errors.append("Island " + str(record["island"]) + " failed:\n" + record["error"])
+						self.stop_event.set()
+				else:
+					self.add_record(record)
+		finally:
+			self.stop()
+
+		if len(errors) > 0:
+			raise RuntimeError("\n".join(errors))
+
+	def add_record(self, record):
+		"""Function that writes the record of a generation of an island, and the combined record of the
+		generation once every island has finished it.
+
+		Arguments:
+			record: The dictionary sent by runIsland().
+		"""
+
+		best_chromosome = unpackChromosome(record["best_chromosome"], self.settings["num_bits"])
+		if self.telemetry is not None:
+			record["best_chromosome"] = self.telemetry.chromosome_ref(best_chromosome)
+			self.telemetry.write(record)
+		record["best_chromosome"] = best_chromosome
+
+		generation = record["generation"]
+		self.pending.setdefault(generation, []).append(record)
+		if len(self.pending[generation]) == self.num_islands:
+			self.merge_generation(self.pending.pop(generation))
+
+	def merge_generation(self, island_records):
+		"""Function that writes the combined record of a generation every island has finished.
+
+		Arguments:
+			island_records: The list of the records of the generation, one per island.
+		"""
+
+		#The records arrive in any order, so ties are broken by the number of the island
+		island_records = sorted(island_records, key=lambda record: record["island"])
+		self.num_generations = island_records[0]["generation"]
+		best = max(island_records, key=lambda record: record["best_fitness"])
+		average_fitness = sum(record["average_fitness"] for record in island_records)/len(island_records)
+		average_score = sum(record["average_score"] for record in island_records)/len(island_records)
+		max_score = max(record["max_score"] for record in island_records)
+		self.high_score = max(self.high_score, max(record["high_score"] for record in island_records))
+
+		if self.verbose:
+			print(self.num_generations, self.high_score, average_score, max_score, average_fitness)
+
+		if self.telemetry is not None:
+			self.telemetry.write({
+				"generation": self.num_generations,
+				"time": time.time(),
+				"islands": self.num_islands,
+				"best_fitness": best["best_fitness"],
+				"best_island": best["island"],
+				"average_fitness": average_fitness,
+				"island_best_fitness": [record["best_fitness"] for record in island_records],
+				"average_score": average_score,
+				"max_score": max_score,
+				"high_score": self.high_score,
+				"best_chromosome": self.telemetry.chromosome_ref(best["best_chromosome"]),
+			})
+
+	def stop(self):
+		"""Function that stops the islands and waits for their processes to end."""
+
+		self.stop_event.set()
+		for process in self.processes:
+			#A process that was never started has no pid
+			if process.pid is None:
+				continue
+			process.join(5)
+			if process.is_alive():
+				process.terminate()
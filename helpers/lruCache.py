@@ -0,0 +1,95 @@
+#*********************************************************************************
+#lruCache.py
+#This module contains a small bounded least recently used cache, and a function
+#to get a short digest of a chromosome that is used as a cache key.
+#It is used to avoid decoding and replaying chromosomes that were already seen,
+#such as the best parents carried over to the next generation.
+#*********************************************************************************
+
+import collections
+import hashlib
+
+def chromosomeDigest(chrom):
+	"""Function to get a short digest that identifies the contents of a chromosome.
+
+	Arguments:
+		chrom: A chromosome bit string, or the packed bytes of a chromosome.
+
+	Returns:
+		A 16 byte digest of the chromosome.
+	"""
+
+	if isinstance(chrom, str):
+		chrom = chrom.encode("ascii")
+
+	return hashlib.blake2b(bytes(chrom), digest_size=16).digest()
+
+
+class LRUCache():
+	"""Class for a dictionary with a maximum size that evicts the least recently used entry.
+
+	Attributes:
+		self.maxsize: The maximum number of entries in the cache.
+		self.entries: An OrderedDict of the entries, from least to most recently used.
+		self.hits: The number of lookups that found an entry.
+		self.misses: The number of lookups that did not find an entry.
+	"""
+
+	def __init__(self, maxsize):
+		"""Initializes the LRUCache class."""
+
+		self.maxsize = maxsize
+		self.entries = collections.OrderedDict()
+		self.hits = 0
+		self.misses = 0
+
+	def get(self, key, default=None):
+		"""Function to look up an entry and mark it as recently used.
+
+		Arguments:
+			key: The key of the entry.
+			default: The value to return if there is no entry for key.
+
+		Returns:
+			The value of the entry, or default.
+		"""
+
+		if key in self.entries:
+			self.entries.move_to_end(key)
+			self.hits += 1
+			return self.entries[key]
+
+		self.misses += 1
+		return default
+
+	def put(self, key, value):
+		"""Function to add or replace an entry, evicting the least recently used entry if the cache is full.
+
+		Arguments:
+			key: The key of the entry.
+			value: The value of the entry.
+		"""
+
+		self.entries[key] = value
+		self.entries.move_to_end(key)
+		if len(self.entries) > self.maxsize:
+			self.entries.popitem(last=False)
+
+	def reset_stats(self):
+		"""Function to set the hit and miss counters back to 0."""
+
+		self.hits = 0
+		self.misses = 0
+
+	def resize(self, maxsize):
+		"""Function to change the maximum size, evicting the least recently used entries that no longer fit."""
+
+		self.maxsize = maxsize
+		while len(self.entries) > self.maxsize:
+			self.entries.popitem(last=False)
+
+	def __contains__(self, key):
+		return key in self.entries
+
+	def __len__(self):
+		return len(self.entries)
@@ -11,17 +11,18 @@
 import random
 import itertools
 import math
+import functools
+from helpers.lruCache import LRUCache, chromosomeDigest
 
 def mapChrom2Weights(chrom, bitsPerWeight, numInputs, numHiddenLayerNodes, numOutputs):
-	"""Function to initialize the structure of the list of weights.
+	"""Function to translate a chromosome bit string into the list of weights for the neural network.
 	
-	Specifically, this function is called from mapChrom2Weights so that the 
-	chromsosome bit string can be translated into a list structure.
+	Each weight is looked up in a table of every possible bit string for bitsPerWeight,
+	and the weights are then sliced into the list structure.
 
 	Arguments:
 		chrom: A string of bits representing all of the weights for the neural network.
 		bitsPerWeight: the number of bits that are dedicated to a single weight in chrom
-		numOuputs: the number of outputs in the neural network
 		numInputs: the number of inputs in the neural network
 		numHiddenNodes: the number of nodes in each of the 2 hidden layers in the neural network
 		numOuputs: the number of outputs in the neural network
@@ -36,126 +37,70 @@ def mapChrom2Weights(chrom, bitsPerWeight, numInputs, numHiddenLayerNodes, numOu
 
 	"""
 
-	weightList = initializeWeightList(numInputs, numHiddenLayerNodes, numOutputs)
-
-	#Add an empty space at the beginning of the string for the sake of using 1-based indexing
-	chrom  =  " " + chrom
-	
-	#Calculate/store weights from input to hidden layer 1
-	#First, determine where the bits representing the weights for hidden layer 1 end (add 1 to numInputs to include threshold)
-	hiddenLayer1BitsEnd = bitsPerWeight*(numInputs+1)*numHiddenLayerNodes
-	index = 1
-	node_num = 0
-	numWeightsPerCurNode = 0
-
-	#While we are still looking at the bits representing wieghts going into hidden layer 1
-	while index < hiddenLayer1BitsEnd:
-		weightBitString = chrom[index:index+bitsPerWeight]
-		#weightList[0] accesses the data for weights going into hidden layer 1
-		weightList[0][node_num][numWeightsPerCurNode] = bin2Weight(weightBitString)
-		numWeightsPerCurNode +=1
-		#if we are at the end of the bits of weights per this node
-		if numWeightsPerCurNode == numInputs + 1:
-			node_num += 1
-			numWeightsPerCurNode = 0
-		index += bitsPerWeight
-
-
-	#Calculate/store weights from hidden layer 1 to hidden layer 2
-	#Add 1 to the calculation for the side of hidden layer 2 to include the threshold
-	hiddenLayer2BitsEnd = hiddenLayer1BitsEnd + numHiddenLayerNodes*(numHiddenLayerNodes + 1)*bitsPerWeight
-	node_num = 0
-	numWeightsPerCurNode = 0
-
-	#While we are still looking at the bits representing wieghts going into hidden layer 2
-	while index < hiddenLayer2BitsEnd:
-		weightBitString = chrom[index:index+bitsPerWeight]
-		#weightList[1] accesses the data for weights going into hidden layer 2
-		weightList[1][node_num][numWeightsPerCurNode] = bin2Weight(weightBitString)
-		numWeightsPerCurNode +=1
-		#if we are at the end of the bits of weights per this node
-		if numWeightsPerCurNode == numHiddenLayerNodes + 1:
-			node_num += 1
-			numWeightsPerCurNode = 0
-		index += bitsPerWeight
-
-	#Calculate/store weights from hidden layer 2 to the output node
-	outputBitsEnd = hiddenLayer2BitsEnd + numOutputs*(numHiddenLayerNodes + 1)*bitsPerWeight
-	node_num = 0
-	numWeightsPerCurNode = 0
-
-	#While we are still looking at the bits representing wieghts going into the output layer
-	while index < outputBitsEnd:
-		weightBitString = chrom[index:index+bitsPerWeight]
-		#weightList[2] accesses the data for weights to output node
-		weightList[2][node_num][numWeightsPerCurNode] = bin2Weight(weightBitString)
-		numWeightsPerCurNode +=1
-		if numWeightsPerCurNode == numHiddenLayerNodes + 1:
-			node_num += 1
-			numWeightsPerCurNode = 0
-
-		index += bitsPerWeight
+	#The number of weights going into each node of each layer (add 1 to include threshold)
+	layerSizes = [(numHiddenLayerNodes, numInputs + 1), (numHiddenLayerNodes, numHiddenLayerNodes + 1), (numOutputs, numHiddenLayerNodes + 1)]
+	numWeights = sum(numNodes*weightsPerNode for numNodes, weightsPerNode in layerSizes)
+
+	table = bin2WeightTable(bitsPerWeight)
+	if table is not None:
+		weights = [table[chrom[i:i+bitsPerWeight]] for i in range(0, numWeights*bitsPerWeight, bitsPerWeight)]
+	else:
+		weights = [bin2Weight(chrom[i:i+bitsPerWeight]) for i in range(0, numWeights*bitsPerWeight, bitsPerWeight)]
+
+	#Split the weights into the lists of weights going into each node of each layer
+	weightList = []
+	index = 0
+	for numNodes, weightsPerNode in layerSizes:
+		layerWeights = []
+		for _ in range(numNodes):
+			layerWeights.append(weights[index:index+weightsPerNode])
+			index += weightsPerNode
+		weightList.append(layerWeights)
 
 	return weightList
 
 
-def initializeWeightList(numInputs, numHiddenNodes, numOutputs):
-	"""Function to initialize the structure of the list of weights.
-	
-	Specifically, this function is called from mapChrom2Weights() so that the 
-	chromsosome bit string can be translated into a list structure.
+#The default number of compiled chromosomes kept, see setWeightCacheSize()
+WEIGHT_CACHE_SIZE = 1024
+#The compiled weights of recently used chromosomes, see compileChromosome()
+weightCache = LRUCache(maxsize=WEIGHT_CACHE_SIZE)
 
-	Arguments:
-		numInputs: the number of inputs in the neural network
-		numHiddenNodes: the number of nodes in each of the 2 hidden layers in the neural network
-		numOuputs: the number of outputs in the neural network
+def setWeightCacheSize(maxsize):
+	"""Function to set the number of compiled chromosomes kept by compileChromosome() in this process.
 
-	Returns:
-		weightStructure:  A list that serves as the structure for storing all the weights in the neural network.
-		It always contains 3 lists: the first for weights between the input layer and hidden layer 1,
-		the second for the weights between hdden layer 1 and hidden layer 2,
-		and the third for the weights between hidden layer 2 and the output layer.
-		Also, each of these 3 lists consists of lists representing all the weights going into a specific node in 
-		the network.
-		Note that all the weights are initialzied to 0 with this function, and are later set to
-		bit strings from the mapChrom2weights() function.
+	To reuse the weights of the best parents carried over to the next generation, the cache
+	must hold a whole generation, so training sets it from the population size.
 
+	Arguments:
+		maxsize: The maximum number of compiled chromosomes.
 	"""
 
-	inputToHidden1Ws = []
-	hidden1ToHidden2Ws = []
-	hidden2ToOutputWs = []
-
-	#Create structure for weights from input to hidden layer 1
-	for i in range(numHiddenNodes): 
-		#Initialize each weight connecting to hidden layer 1 node i as 0
-		curInputWs = []
-		for j in range(numInputs + 1): #+1 to include threshold
-			curInputWs.append(0)
-		inputToHidden1Ws.append(curInputWs)
+	weightCache.resize(maxsize)
 
+def compileChromosome(chrom, bitsPerWeight, numInputs, numHiddenLayerNodes, numOutputs):
+	"""Function to get the list of weights for a chromosome, reusing it if the chromosome was recently compiled.
 
-	#Create structure for weights from hidden layer 1 to hidden layer 2
-	for i in range(numHiddenNodes): 
-		#Initialize each weight connecting to hidden layer 2 node i as 0
-		curInputWs = []
-		for j in range(numHiddenNodes + 1): #+1 to include threshold
-			curInputWs.append(0)
-		hidden1ToHidden2Ws.append(curInputWs)
+	The weights are cached by the digest of the chromosome, so chromosomes that survive to the next
+	generation are not decoded again. The returned list is shared, and must not be modified.
 
-	#Create structure for weights from hidden layer 2 to the output layer
-	for i in range(numOutputs):
-		#Initialize each weight connecting to output node i as 0
-		curInputWs = []
-		for j in range(numHiddenNodes + 1): #+1 to include threshold
-			curInputWs.append(0)
-		hidden2ToOutputWs.append(curInputWs)
-
-	weightStructure = [inputToHidden1Ws] + [hidden1ToHidden2Ws] + [hidden2ToOutputWs]
+	Arguments:
+		chrom: A string of bits representing all of the weights for the neural network.
+		bitsPerWeight: the number of bits that are dedicated to a single weight in chrom
+		numInputs: the number of inputs in the neural network
+		numHiddenNodes: the number of nodes in each of the 2 hidden layers in the neural network
+		numOuputs: the number of outputs in the neural network
 
+	Returns:
+		weightList: The list of weights in the format returned by mapChrom2Weights().
+	"""
 
-	return weightStructure
+	key = (chromosomeDigest(chrom), bitsPerWeight, numInputs, numHiddenLayerNodes, numOutputs)
+	weightList = weightCache.get(key)
+	if weightList is None:
+		weightList = mapChrom2Weights(chrom, bitsPerWeight, numInputs, numHiddenLayerNodes, numOutputs)
+		weightCache.put(key, weightList)
 
+	return weightList
 
 
 def bin2Weight(binString):
@@ -184,6 +129,29 @@ def bin2Weight(binString):
 	return normalized_weight
 
 
+@functools.lru_cache(maxsize=None)
+def bin2WeightTable(bitsPerWeight):
+	"""Function to precompute the weight of every possible bit string of a given length.
+
+	Arguments:
+		bitsPerWeight: The number of bits per weight.
+
+	Returns:
+		table: A dictionary from each bit string to its weight from bin2Weight(), or None
+		if bitsPerWeight is too large for a table to be worthwhile.
+	"""
+
+	if bitsPerWeight > 16:
+		return None
+
+	table = {}
+	for integer in range(2**bitsPerWeight):
+		binString = format(integer, "0" + str(bitsPerWeight) + "b")
+		table[binString] = bin2Weight(binString)
+
+	return table
+
+
 def testNetwork(inputList, weightList, numHiddenLayerNodes, numOutputs):
 	"""Function to calculate the final outputs in the network from the original inputs.
 
@@ -286,7 +254,11 @@ def sigmoid(s):
 		The output from inputting s into the sigmoid function.
 	"""
 
-	return 1 / (1 + math.exp(-s))
+	try:
+		return 1 / (1 + math.exp(-s))
+	except OverflowError:
+		#Very negative inputs, which happen on large grids where the inputs are large
+		return 0.0
 	
 
 
@@ -0,0 +1,372 @@
+#*********************************************************************************
+#packedChromosomes.py
+#This module contains a packed version of the chromosomes in geneticAlgorithm.py,
+#where a population is a numpy uint8 array with 8 bits of a chromosome per byte
+#and one row per chromosome, along with vectorized genetic algorithm operators
+#and weight decoding that work on a whole generation at once.
+#The converters to and from bit strings keep the populations saved in the
+#populations folder and the chromosomes in testTrainedAgents.py usable.
+#It is used by snakeGameGATrain.py to run the genetic algorithm of training,
+#and by vectorSnakeEnv.py to decode a whole generation at once.
+#It requires the module numpy.
+#*********************************************************************************
+
+import ast
+import numpy as np
+from helpers import geneticAlgorithm as ga
+
+#Probability each bit is mutated, the same as in geneticAlgorithm.mutation()
+MUTATION_RATE = .008
+
+def packChromosomes(chromosomes):
+	"""Function to convert chromosome bit strings into a packed population.
+
+	Arguments:
+		chromosomes: A list of chromosome bit strings, all of the same length.
+
+	Returns:
+		packedPop: A uint8 array with one row of packed bits per chromosome. The last byte of
+		each row is padded with 0 bits if the number of bits is not a multiple of 8.
+	"""
+
+	bits = np.frombuffer("".join(chromosomes).encode("ascii"), dtype=np.uint8) - ord("0")
+	bits = bits.reshape(len(chromosomes), -1)
+
+	return np.packbits(bits, axis=1)
+
+def unpackChromosomes(packedPop, numBits):
+	"""Function to convert a packed population back into chromosome bit strings.
+
+	Arguments:
+		packedPop: A uint8 array with one row of packed bits per chromosome.
+		numBits: The number of bits per each chromosome.
+
+	Returns:
+		chromosomes: A list of all the chromosome bit strings in the population.
+	"""
+
+	bits = np.unpackbits(np.atleast_2d(packedPop), axis=1)[:, :numBits] + ord("0")
+
+	return [row.tobytes().decode("ascii") for row in bits]
+
+def loadPopulationFile(path):
+	"""Function to read a population saved as text in the populations folder.
+
+	Arguments:
+		path: The path of a populations/population_N.txt file.
+
+	Returns:
+		chromosomes: A list of all the chromosome bit strings in the population.
+	"""
+
+	with open(path) as file:
+		lines = [line for line in file.read().splitlines() if line.strip()]
+
+	#The file is opened in append mode when saved, so the last line is the latest population
+	return ast.literal_eval(lines[-1])
+
+def genPopulation(popSize, numBits, rng=None):
+	"""Function that randomly generates a packed population of chromosomes
+
+	Arguments:
+		popSize: The number of indivduals/chromosomes in the population.
+		numBits: The number of bits per each chromosome.
+		rng: The numpy random Generator to use, or None for a new unpredictable one.
+
+	Returns:
+		packedPop: A uint8 array with one row of packed bits per chromosome.
+	"""
+
+	rng = np.random.default_rng(rng)
+	packedPop = rng.integers(0, 256, size=(popSize, numBytes(numBits)), dtype=np.uint8)
+
+	return clearPadding(packedPop, numBits)
+
+def warmStartPopulation(seedChromosomes, popSize, numBits, mutatedFraction=.25, rng=None):
+	"""Function that generates a packed population seeded from chosen chromosomes, such as previously trained agents.
+
+	The population is built as in geneticAlgorithm.warmStartPopulation(): every seed chromosome once,
+	then mutated copies of the seed chromosomes in turn, and random chromosomes for the rest.
+
+	Arguments:
+		seedChromosomes: A list of chromosome bit strings to seed the population with.
+		popSize: The number of indivduals/chromosomes in the population.
+		numBits: The number of bits per each chromosome.
+		mutatedFraction: The share of the population to fill with the seed chromosomes and their mutated copies.
+		rng: The numpy random Generator to use, or None for a new unpredictable one.
+
+	Returns:
+		packedPop: A uint8 array with one row of packed bits per chromosome.
+	"""
+
+	rng = np.random.default_rng(rng)
+
+	for chrom in seedChromosomes:
+		if len(chrom) != numBits:
+			raise ValueError("A seed chromosome has " + str(len(chrom)) + " bits, but the population has " + str(numBits) + " bits per chromosome")
+
+	if len(seedChromosomes) == 0:
+		return genPopulation(popSize, numBits, rng)
+
+	packedSeeds = packChromosomes(seedChromosomes)
+	numKept = min(len(seedChromosomes), popSize)
+	numSeeded = max(numKept, int(popSize*mutatedFraction))
+	copies = np.arange(numKept, numSeeded)%len(seedChromosomes)
+
+	return np.concatenate((packedSeeds[:numKept], mutation(packedSeeds[copies], numBits, rng), genPopulation(popSize - numSeeded, numBits, rng)))
+
+def numBytes(numBits):
+	"""Function to get the number of bytes needed to pack a chromosome."""
+
+	return (numBits + 7)//8
+
+def clearPadding(packedPop, numBits):
+	"""Function to set the padding bits at the end of every packed chromosome to 0.
+
+	Arguments:
+		packedPop: A uint8 array with one row of packed bits per chromosome.
+		numBits: The number of bits per each chromosome.
+
+	Returns:
+		packedPop: The same array, modified in place.
+	"""
+
+	if numBits%8 != 0:
+		packedPop[:, -1] &= np.uint8((0xFF << (8 - numBits%8)) & 0xFF)
+
+	return packedPop
+
+def createNextGeneration(parentPop, fitnessScores, numBits, rng=None, selectionMethod="roulette", tournamentSize=3, eliteMode="above_median"):
+	"""Function that moves onto the next generation of a packed population.
+
+	It follows the same steps as geneticAlgorithm.createNextGeneration(), but selection, crossover
+	and mutation are done for every child at once.
+
+	Arguments:
+		parentPop: A uint8 array with one row of packed bits per parent chromosome.
+		fitnessScores: A list or array of fitness scores that corresponds to each chromosome in parentPop by index.
+		numBits: The number of bits per each chromosome.
+		rng: The numpy random Generator to use, or None for a new unpredictable one.
+		selectionMethod: One of geneticAlgorithm.SELECTION_METHODS, see selection().
+		tournamentSize: The number of chromosomes competing in each tournament for tournament selection.
+		eliteMode: One of geneticAlgorithm.ELITE_MODES, see geneticAlgorithm.extractBestParents().
+
+	Returns:
+		childPop: The new packed population.
+		bestIndividual: The packed chromsome with the highest fitness from the parent population.
+		bestFitness: The highest fitness from the parent population.
+		averageFitness: The average fitness score of the parent population.
+	"""
+
+	rng = np.random.default_rng(rng)
+	fitnessScores = np.asarray(fitnessScores, dtype=np.float64)
+
+	#Get data about the fitness scores
+	bestIndex = int(np.argmax(fitnessScores))
+	bestFitness = fitnessScores[bestIndex]
+	averageFitness = fitnessScores.mean()
+
+	#Save the best individuals from the previous generation, the ones strictly above the median
+	#The median cutoff only needs a partial sort
+	maxIndex = len(fitnessScores) - 1
+	bestScoresCutoffIndex = int(maxIndex*(1/2))
+	bestScoresCutoff = np.partition(fitnessScores, bestScoresCutoffIndex)[bestScoresCutoffIndex]
+	isBest = fitnessScores > bestScoresCutoff
+	if eliteMode == "top_half":
+		#Fill the places left by equal scores with the chromosomes at the cutoff that come first
+		atCutoff = np.flatnonzero(fitnessScores == bestScoresCutoff)
+		isBest[atCutoff[:maxIndex - bestScoresCutoffIndex - np.count_nonzero(isBest)]] = True
+	elif eliteMode != "above_median":
+		raise ValueError("Unknown elite mode " + repr(eliteMode) + ", expected one of " + str(ga.ELITE_MODES))
+	bestParents = parentPop[isBest]
+
+	numChildren = len(parentPop) - len(bestParents)
+	firstParents, secondParents = selection(fitnessScores, numChildren, rng, selectionMethod, tournamentSize)
+	children = crossOver(parentPop[firstParents], parentPop[secondParents], numBits, rng)
+	children = mutation(children, numBits, rng)
+
+	#Combine the best parents from the old generation with the new generation
+	childPop = np.concatenate((children, bestParents))
+
+	return childPop, parentPop[bestIndex], bestFitness, averageFitness
+
+def selection(fitnessScores, numPairs, rng, selectionMethod="roulette", tournamentSize=3):
+	"""Function to do selection of many pairs of parents at once.
+
+	The selection methods follow geneticAlgorithm.selectPairs().
+
+	Arguments:
+		fitnessScores: An array of fitness scores of the parent population.
+		numPairs: The number of pairs of parents to select.
+		rng: The numpy random Generator to use.
+		selectionMethod: One of geneticAlgorithm.SELECTION_METHODS.
+		tournamentSize: The number of chromosomes competing in each tournament for tournament selection.
+
+	Returns:
+		firstParents: An array of the indices of the first parent of each pair.
+		secondParents: An array of the indices of the second parent of each pair.
+	"""
+
+	popSize = len(fitnessScores)
+
+	#When every fitness score is 0, every chromosome is selected with the same probability
+	if (selectionMethod == "roulette" or selectionMethod == "alias") and not fitnessScores.any():
+		fitnessScores = np.ones(popSize)
+
+	if selectionMethod == "roulette" or selectionMethod == "rank":
+		if selectionMethod == "roulette":
+			weights = fitnessScores
+		else:
+			#Equal scores are ranked by their index
+			weights = np.empty(popSize)
+			weights[np.argsort(fitnessScores, kind="stable")] = np.arange(1, popSize + 1)
+		fitnessRouletteCutoffs = np.cumsum(weights/weights.sum())
+		#The first cutoff that is greater than the random value selects the chromosome
+		selected = np.searchsorted(fitnessRouletteCutoffs, rng.random((numPairs, 2)), side="right")
+		#Rounding can leave the last cutoff just below 1
+		selected = np.minimum(selected, popSize - 1)
+
+	elif selectionMethod == "alias":
+		probabilities, aliases = ga.buildAliasTable(fitnessScores.tolist())
+		drawn = rng.integers(0, popSize, size=(numPairs, 2))
+		kept = rng.random((numPairs, 2)) < np.asarray(probabilities)[drawn]
+		selected = np.where(kept, drawn, np.asarray(aliases)[drawn])
+
+	elif selectionMethod == "tournament":
+		contestants = rng.integers(0, popSize, size=(numPairs, 2, tournamentSize))
+		#argmax picks the first contestant drawn on ties
+		winners = np.argmax(fitnessScores[contestants], axis=2)
+		selected = np.take_along_axis(contestants, winners[:, :, np.newaxis], axis=2)[:, :, 0]
+
+	else:
+		raise ValueError("Unknown selection method " + repr(selectionMethod) + ", expected one of " + str(ga.SELECTION_METHODS))
+
+	return selected[:, 0], selected[:, 1]
+
+def crossOver(firstParents, secondParents, numBits, rng):
+	"""Function to do Single-point crossover for many pairs of packed parent chromosomes at once.
+
+	Each child follows geneticAlgorithm.crossOver() for its pair.
+
+	Arguments:
+		firstParents: A uint8 array with the packed first parent of each pair.
+		secondParents: A uint8 array with the packed second parent of each pair.
+		numBits: The number of bits per each chromosome.
+		rng: The numpy random Generator to use.
+
+	Returns:
+		children: A uint8 array with one packed child per pair.
+	"""
+
+	numPairs = len(firstParents)
+
+	#Randomly determine which chromosome is crossed over at the first half
+	startWithFirst = rng.integers(0, 2, size=numPairs).astype(bool)
+	startParents = np.where(startWithFirst[:, np.newaxis], firstParents, secondParents)
+	endParents = np.where(startWithFirst[:, np.newaxis], secondParents, firstParents)
+
+	#Randomly determine the crossover point. If it is at the final bit,
+	#the child is a copy of the other parent, so the point is moved to the start.
+	crossOverPoints = rng.integers(0, numBits, size=numPairs)
+	crossOverPoints[crossOverPoints == numBits - 1] = 0
+
+	#Build a mask of the bits that come from the parent at the start
+	byteIndices = np.arange(firstParents.shape[1])
+	fullBytes = crossOverPoints[:, np.newaxis]//8
+	partialMasks = ((0xFF << (8 - crossOverPoints%8)) & 0xFF)[:, np.newaxis]
+	masks = np.where(byteIndices < fullBytes, 0xFF, np.where(byteIndices == fullBytes, partialMasks, 0)).astype(np.uint8)
+
+	return (startParents & masks) | (endParents & ~masks)
+
+def mutation(packedPop, numBits, rng, mutationRate=MUTATION_RATE):
+	"""Function for mutation on every chromosome in a packed population at once
+
+	Every bit is flipped with probability mutationRate, as in geneticAlgorithm.mutation().
+	Instead of drawing a random value per bit, the gaps between flipped bits are drawn
+	from a geometric distribution, which gives the same probabilities.
+
+	Arguments:
+		packedPop: A uint8 array with one row of packed bits per chromosome.
+		numBits: The number of bits per each chromosome.
+		rng: The numpy random Generator to use.
+		mutationRate: The probability each bit is mutated.
+
+	Returns:
+		mutatedPop: A new uint8 array with the potentially mutated chromosomes.
+	"""
+
+	mutatedPop = packedPop.copy()
+	totalBits = len(packedPop)*numBits
+
+	#Draw the positions of the flipped bits over the whole population
+	expectedFlips = totalBits*mutationRate
+	positions = np.cumsum(rng.geometric(mutationRate, size=int(expectedFlips + 6*expectedFlips**0.5) + 16)) - 1
+	while positions[-1] < totalBits:
+		morePositions = positions[-1] + np.cumsum(rng.geometric(mutationRate, size=len(positions)))
+		positions = np.concatenate((positions, morePositions))
+	positions = positions[positions < totalBits]
+
+	rows = positions//numBits
+	bits = positions%numBits
+	#Flip the bits, the first bit of a chromosome is the most significant bit of its first byte
+	np.bitwise_xor.at(mutatedPop, (rows, bits//8), (128 >> (bits%8)).astype(np.uint8))
+
+	return mutatedPop
+
+def decodeWeights(packedPop, numBits, bitsPerWeight):
+	"""Function to convert every weight of every packed chromosome at once.
+
+	Each group of bitsPerWeight bits is converted to a value between -3 and 3, as in neuralNetwork.bin2Weight().
+
+	Arguments:
+		packedPop: A uint8 array with one row of packed bits per chromosome.
+		numBits: The number of bits per each chromosome.
+		bitsPerWeight: the number of bits that are dedicated to a single weight in a chromosome
+
+	Returns:
+		weights: An array of shape (numChromosomes, numBits//bitsPerWeight) with the weights in chromosome order.
+	"""
+
+	packedPop = np.atleast_2d(packedPop)
+	numWeights = numBits//bitsPerWeight
+
+	if bitsPerWeight == 8:
+		#Each byte already holds exactly one weight
+		integers = packedPop[:, :numWeights].astype(np.float64)
+	else:
+		bits = np.unpackbits(packedPop, axis=1)[:, :numWeights*bitsPerWeight]
+		bits = bits.reshape(len(packedPop), numWeights, bitsPerWeight)
+		powers = 2.0**np.arange(bitsPerWeight - 1, -1, -1)
+		integers = bits @ powers
+
+	#Convert integers to a value between -3 and 3
+	product = 3/(2**(bitsPerWeight-1))
+
+	return integers*product - 3
+
+def mapPacked2StackedWeights(packedPop, bitsPerWeight, numInputs, numHiddenLayerNodes, numOutputs):
+	"""Function to translate a packed population into the stacked weight arrays of batchNeuralNetwork.py.
+
+	Arguments:
+		packedPop: A uint8 array with one row of packed bits per chromosome.
+		bitsPerWeight: the number of bits that are dedicated to a single weight in a chromosome
+		numInputs: the number of inputs in the neural network
+		numHiddenLayerNodes: the number of nodes in each of the 2 hidden layers in the neural network
+		numOutputs: the number of outputs in the neural network
+
+	Returns:
+		stackedWeights: The weights of every chromosome in the format returned by batchNeuralNetwork.stackWeights().
+	"""
+
+	#The shapes of the weights going into each layer, including the thresholds
+	layerShapes = [(numHiddenLayerNodes, numInputs + 1), (numHiddenLayerNodes, numHiddenLayerNodes + 1), (numOutputs, numHiddenLayerNodes + 1)]
+	numWeights = sum(rows*cols for rows, cols in layerShapes)
+	weights = decodeWeights(packedPop, numWeights*bitsPerWeight, bitsPerWeight)
+
+	stackedWeights = []
+	start = 0
+	for rows, cols in layerShapes:
+		stackedWeights.append(weights[:, start:start + rows*cols].reshape(len(weights), rows, cols))
+		start += rows*cols
+
+	return tuple(stackedWeights)
@@ -0,0 +1,141 @@
+#*********************************************************************************
+#profiler.py
+#This module contains the PhaseProfiler class, which keeps named phase timers and
+#counters that are reported once per generation of training, and the
+#SamplingProfiler class, which periodically samples the call stack of the
+#training thread to find where the time of one generation goes.
+#Every place that uses a PhaseProfiler checks for None first, so profiling costs
+#nothing when it is disabled.
+#They are used by SnakeGameGATrain in snakeGameGATrain.py.
+#*********************************************************************************
+
+import sys
+import time
+import threading
+import collections
+
+class PhaseProfiler():
+	"""Class with named phase timers and counters that are aggregated per generation.
+
+	Phases can be nested, such as the features and inference phases inside a step,
+	but a phase cannot be started again before it is stopped.
+
+	Attributes:
+		self.phase_seconds: A dictionary with the seconds spent in each phase this generation.
+		self.phase_calls: A dictionary with the number of times each phase was timed this generation.
+		self.counters: A dictionary with the value of each counter this generation.
+		self.starts: A dictionary with the start time of each phase that is running.
+	"""
+
+	def __init__(self):
+		"""Initializes the PhaseProfiler class."""
+
+		self.phase_seconds = collections.defaultdict(float)
+		self.phase_calls = collections.defaultdict(int)
+		self.counters = collections.defaultdict(int)
+		self.starts = {}
+
+	def start(self, name):
+		"""Function to start timing a phase."""
+
+		self.starts[name] = time.perf_counter()
+
+	def stop(self, name):
+		"""Function to stop timing a phase and add the time to the phase."""
+
+		self.phase_seconds[name] += time.perf_counter() - self.starts.pop(name)
+		self.phase_calls[name] += 1
+
+	def count(self, name, amount=1):
+		"""Function to add to a counter."""
+
+		self.counters[name] += amount
+
+	def end_generation(self):
+		"""Function to get the timers and counters of the generation and start over for the next one.
+
+		Returns:
+			A dictionary with "phases", mapping each phase to its seconds and calls,
+			and "counters", mapping each counter to its value.
+		"""
+
+		report = {
+			"phases": {name: {"seconds": seconds, "calls": self.phase_calls[name]} for name, seconds in self.phase_seconds.items()},
+			"counters": dict(self.counters),
+		}
+		self.phase_seconds.clear()
+		self.phase_calls.clear()
+		self.counters.clear()
+
+		return report
+
+
+class SamplingProfiler():
+	"""Class that samples the call stack of a thread from a background thread.
+
+	Every sample is the stack of the thread at that moment, so the number of samples
+	of a stack is proportional to the time spent in it.
+	Only the given thread is sampled, so the games played by worker processes are not seen.
+
+	Attributes:
+		self.interval: The number of seconds between samples.
+		self.thread_id: The identifier of the thread that is sampled.
+		self.stacks: A Counter of the number of samples of each stack, as a tuple of frames from the outermost.
+		self.stop_event: The threading.Event that stops the sampling.
+		self.thread: The background threading.Thread taking the samples, or None when not started.
+	"""
+
+	def __init__(self, interval=.005, thread_id=None):
+		"""Initializes the SamplingProfiler class.
+
+		Arguments:
+			interval: The number of seconds between samples.
+			thread_id: The identifier of the thread to sample, or None for the thread that creates the profiler.
+		"""
+
+		self.interval = interval
+		self.thread_id = thread_id if thread_id is not None else threading.get_ident()
+		self.stacks = collections.Counter()
+		self.stop_event = threading.Event()
+		self.thread = None
+
+	def start(self):
+		"""Function to start sampling in a background thread."""
+
+		self.stop_event.clear()
+		self.thread = threading.Thread(target=self.sample, name="SamplingProfiler", daemon=True)
+		self.thread.start()
+
+	def sample(self):
+		"""Function that takes samples until the profiler is stopped, run in the background thread."""
+
+		while not self.stop_event.wait(self.interval):
+			frame = sys._current_frames().get(self.thread_id)
+			stack = []
+			while frame is not None:
+				code = frame.f_code
+				stack.append(code.co_name + " (" + code.co_filename + ":" + str(code.co_firstlineno) + ")")
+				frame = frame.f_back
+			if len(stack) > 0:
+				self.stacks[tuple(reversed(stack))] += 1
+
+	def stop(self):
+		"""Function to stop sampling."""
+
+		if self.thread is not None:
+			self.stop_event.set()
+			self.thread.join()
+			self.thread = None
+
+	def dump(self, path):
+		"""Function to write the samples to a file in the collapsed stack format used by flame graph tools.
+
+		Each line is the frames of a stack from the outermost, separated by semicolons, and the number of samples.
+
+		Arguments:
+			path: The path of the file to write.
+		"""
+
+		with open(path, "w") as file:
+			for stack, samples in self.stacks.most_common():
+				file.write(";".join(stack) + " " + str(samples) + "\n")
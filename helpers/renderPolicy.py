@@ -0,0 +1,96 @@
+#*********************************************************************************
+#renderPolicy.py
+#This module contains the RenderPolicy class, which decides which frames of a
+#training run are drawn in the pygame window and how often the window events
+#are handled.
+#Drawing a frame costs much more than simulating it, so a training run that is
+#watched can draw only every Nth frame, only one agent in K, or at most one frame
+#per interval of time, while the window stays responsive.
+#It is used in trainGeneticAlgorithm.py.
+#*********************************************************************************
+
+import time
+
+class RenderPolicy():
+	"""Class that decides which frames are drawn and when the window events are handled.
+
+	A frame is drawn only if every condition holds: it is an Nth frame, it is played by a shown agent,
+	and enough time has passed since the last drawn frame. With the default arguments every frame is drawn.
+
+	Attributes:
+		self.frame_interval: Draw every frame_interval-th frame.
+		self.agent_interval: Draw the agents whose index in the population is a multiple of agent_interval.
+		self.min_seconds: The least number of seconds between two drawn frames, or None for no limit.
+		self.event_seconds: The least number of seconds between two times the window events are handled.
+		self.frames: The number of frames seen so far.
+		self.last_render: The time the last frame was drawn, from time.monotonic(), or None.
+		self.last_events: The time the window events were last handled, from time.monotonic(), or None.
+	"""
+
+	def __init__(self, frame_interval=1, agent_interval=1, min_seconds=None, event_seconds=.05):
+		"""Initializes the RenderPolicy class.
+
+		Arguments:
+			frame_interval: Draw every frame_interval-th frame.
+			agent_interval: Draw one agent in agent_interval.
+			min_seconds: The least number of seconds between two drawn frames, or None for no limit.
+			event_seconds: The least number of seconds between two times the window events are handled.
+		"""
+
+		if frame_interval < 1 or agent_interval < 1:
+			raise ValueError("The frame and agent intervals must be at least 1")
+
+		self.frame_interval = frame_interval
+		self.agent_interval = agent_interval
+		self.min_seconds = min_seconds
+		self.event_seconds = event_seconds
+		self.frames = 0
+		self.last_render = None
+		self.last_events = None
+
+	def draws_every_frame(self):
+		"""Function to check if the policy draws every frame, as the window did before there was a policy."""
+
+		return self.frame_interval == 1 and self.agent_interval == 1 and self.min_seconds is None
+
+	def should_render(self, agent_index):
+		"""Function to check if the current frame should be drawn, called once per frame.
+
+		Arguments:
+			agent_index: The index in the population of the agent playing the frame.
+
+		Returns:
+			True if the frame should be drawn.
+		"""
+
+		self.frames += 1
+		if self.frames%self.frame_interval != 0 or agent_index%self.agent_interval != 0:
+			return False
+
+		if self.min_seconds is not None:
+			now = time.monotonic()
+			if self.last_render is not None and now - self.last_render < self.min_seconds:
+				return False
+			self.last_render = now
+
+		return True
+
+	def should_handle_events(self, rendered):
+		"""Function to check if the window events should be handled after the current frame.
+
+		The events are always handled after a drawn frame, and otherwise once every
+		event_seconds, so the window stays responsive however few frames are drawn.
+
+		Arguments:
+			rendered: Whether the current frame was drawn.
+
+		Returns:
+			True if the events should be handled.
+		"""
+
+		now = time.monotonic()
+		if rendered or self.last_events is None or now - self.last_events >= self.event_seconds:
+			self.last_events = now
+			return True
+
+		return False
@@ -0,0 +1,45 @@
+#*********************************************************************************
+#seeds.py
+#This module contains functions to derive independent random seeds from the
+#seed of a training run, so that every game and the genetic algorithm each get
+#their own reproducible stream of random numbers.
+#With a run seed, the fitness of a chromosome only depends on the chromosome,
+#no matter the order or the process it is played in.
+#*********************************************************************************
+
+import hashlib
+from helpers.lruCache import chromosomeDigest
+
+def deriveSeed(runSeed, *keys):
+	"""Function to derive a seed from the seed of a run and any number of keys.
+
+	Arguments:
+		runSeed: The seed of the training run.
+		keys: Values that identify what the seed is for, such as "ga" or an island number.
+
+	Returns:
+		A 64 bit integer seed.
+	"""
+
+	hasher = hashlib.blake2b(digest_size=8)
+	for value in (runSeed,) + keys:
+		hasher.update(repr(value).encode("utf-8"))
+		hasher.update(b"\0")
+
+	return int.from_bytes(hasher.digest(), "big")
+
+def episodeSeed(runSeed, chrom):
+	"""Function to get the seed of the game a chromosome is played in.
+
+	Arguments:
+		runSeed: The seed of the training run, or None for unseeded games.
+		chrom: A chromosome bit string.
+
+	Returns:
+		A 64 bit integer seed, or None if runSeed is None.
+	"""
+
+	if runSeed is None:
+		return None
+
+	return deriveSeed(runSeed, "episode", chromosomeDigest(chrom))
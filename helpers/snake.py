@@ -6,6 +6,19 @@
 #*********************************************************************************
 
 import collections
+from helpers.bitboard import get_bitboard
+
+#Integer codes for the directions the snake can move in, in the order of the neural network outputs
+LEFT = 0
+UP = 1
+RIGHT = 2
+DOWN = 3
+
+#The name of each direction, indexed by direction code
+DIRECTION_NAMES = ("left", "up", "right", "down")
+
+#The (row, column) offset of moving one square in each direction, indexed by direction code
+DIRECTION_OFFSETS = ((0, -1), (-1, 0), (0, 1), (1, 0))
 
 class Snake():
 
@@ -13,22 +26,48 @@ class Snake():
 
 	It is instatiated from within the SnakeGame class
 
+	Every body part follows the path of the head, so the body is kept as a ring buffer
+	of the last positions of the head: moving pushes the new head and pops the tail,
+	which costs the same no matter how long the snake is.
+
 	Attributes:
 		self.rows: The number of rows in the grid of the game
 		self.cols: The number of columns in the grid of the game
-		self.body: A list of poisitions in the grid of the Snake's body
-		self.directions: A double-ended queue corresponding to self.body,
-		representing each direction each body part will move next.
+		self.body: A double-ended queue of poisitions in the grid of the Snake's body,
+		from the head to the tail.
+		self.direction: The direction code the head moved in last, or None before the first move.
+		self.last_tail: The position of the tail that was dropped by the last move, or None.
+		self.occupancy: A flat list with the number of body parts in each cell of the grid,
+		where the cell (row, column) is at index row*cols + column.
+		self.free_cells: A list of all the cells (as flat indices) that are not part of the body, in no particular order.
+		self.free_cell_index: A flat list with the index of each cell in self.free_cells, or -1 if the cell is occupied.
+		self.bitboard: The Bitboard of the grid (see bitboard.py) if the body is also kept as a bitboard, or None.
+		self.body_bits: A bitboard of the cells of the body behind the head, kept up to date when self.bitboard
+		is not None. The head ran into the body when its cell is set.
 	"""
 
-	def __init__(self,rows,cols):
-		"""Initializes Snake class"""
+	def __init__(self,rows,cols,bitboard=False):
+		"""Initializes Snake class
+
+		The only argument that is not a documented class attribute is:
+			bitboard: Whether to also keep the body as a bitboard.
+		"""
 
 		self.rows = rows
 		self.cols = cols
-		self.body = []
+		self.body = collections.deque()
 		self.body.append(self.initialize_snake())
-		self.directions = collections.deque()
+		self.direction = None
+		self.last_tail = None
+
+		#The occupancy and free cells are updated incrementally as the snake moves,
+		#so checking or sampling a cell never needs to search the body
+		self.occupancy = [0]*(rows*cols)
+		self.free_cells = list(range(rows*cols))
+		self.free_cell_index = list(range(rows*cols))
+		self.bitboard = get_bitboard(rows, cols) if bitboard else None
+		self.body_bits = 0
+		self.occupy(self.body[0])
 
 	def initialize_snake(self):
 		"""Initializes the first position for the snake.
@@ -43,52 +82,148 @@ class Snake():
 
 		return (snake_row,snake_col)
 
-	def update_body_positions(self):
-		"""Updates the snake's body positions.
+	def move(self, direction):
+		"""Moves the snake one square in a direction.
 
-		The snake's body positions are updated based on the directions in
-		self.directions. This update occurs each frame, and is called directly
+		This update occurs each frame, and is called directly
 		from all the classes that run the Snake Game.
+
+		Arguments:
+			direction: The direction code (LEFT, UP, RIGHT or DOWN) to move the head in.
 		"""
-		#Iterate through each square that is part of the snake's body
-		for i,pos in enumerate(self.body):
-			#Get the direction to move next that corresponds to the body position
-			direct = self.directions[i]
-			#Update the body position after moving in the direction
-			if direct == "left":
-				#Move left
-				self.body[i] = (pos[0],pos[1]-1)		
-			elif direct == "up":
-				#Move up
-				self.body[i] = (pos[0]-1,pos[1])
-			
-			elif direct == "right":
-				#Move right
-				self.body[i] = (pos[0],pos[1]+1)		
-			else:
-				#Move down
-				self.body[i] = (pos[0]+1, pos[1])
 
+		head = self.body[0]
+		offset = DIRECTION_OFFSETS[direction]
+		new_head = (head[0] + offset[0], head[1] + offset[1])
+
+		#Push the new head and pop the tail
+		self.body.appendleft(new_head)
+		self.occupy(new_head)
+		self.last_tail = self.body.pop()
+		self.vacate(self.last_tail)
+		self.direction = direction
+
+		if self.bitboard is not None:
+			#The old head joins the body behind the head, and the tail leaves it
+			self.body_bits |= self.bitboard.bit(head)
+			self.body_bits &= ~self.bitboard.bit(self.last_tail)
+
+	def head_direction_name(self):
+		"""Function to get the name of the direction the head is facing.
+
+		Returns:
+			"left", "up", "right" or "down". The snake faces right before its first move.
+		"""
+
+		if self.direction is None:
+			return DIRECTION_NAMES[RIGHT]
+		return DIRECTION_NAMES[self.direction]
 
 	def extend_snake(self):
 		"""Adds one extra block to the end of the snake's body.
 
+		The new block is the tail that was dropped by the last move.
+
 		This function is called directly from the
 		SankeGame class whenever the snake eats a fruit."""
 
-		snake_tail = self.body[-1]
-		#Get the direction of the tail of the body
-		tail_dir = self.directions[-1]
-
-		if tail_dir == "left":
-			#If tail is going left, add new tail to right of old tail
-			self.body.append((snake_tail[0], snake_tail[1]+1))
-		elif tail_dir == "up":
-			#If tail is going up, add new tail below old tail
-			self.body.append((snake_tail[0]+1, snake_tail[1]))
-		elif tail_dir == "right":
-			#If tail is going right, add new tail to the left of old tail
-			self.body.append((snake_tail[0], snake_tail[1]-1))
-		else:
-			#If tail is going down, add new tail above old tail
-			self.body.append((snake_tail[0]-1, snake_tail[1]))
+		self.body.append(self.last_tail)
+		self.occupy(self.last_tail)
+		if self.bitboard is not None:
+			self.body_bits |= self.bitboard.bit(self.last_tail)
+		self.last_tail = None
+
+	def cell_index(self, pos):
+		"""Function to get the flat index of a position in the grid.
+
+		Arguments:
+			pos: A tuple in (row,column) format.
+
+		Returns:
+			The index of the cell in self.occupancy, or None if the position is out of bounds.
+		"""
+
+		row = pos[0]
+		col = pos[1]
+		if row < 0 or row >= self.rows or col < 0 or col >= self.cols:
+			return None
+		return row*self.cols + col
+
+	def count_at(self, pos):
+		"""Function to get the number of body parts at a position.
+
+		Arguments:
+			pos: A tuple in (row,column) format.
+
+		Returns:
+			The number of body parts at pos, which is 0 if pos is out of bounds.
+		"""
+
+		cell = self.cell_index(pos)
+		if cell is None:
+			return 0
+		return self.occupancy[cell]
+
+	def is_occupied(self, pos):
+		"""Function to check if a position is part of the snake's body.
+
+		This is equivalent to pos in self.body, without searching the body.
+
+		Arguments:
+			pos: A tuple in (row,column) format.
+
+		Returns:
+			True if a body part is at pos.
+		"""
+
+		return self.count_at(pos) > 0
+
+	def random_free_cell(self, rng):
+		"""Function to pick a position that is not part of the body, uniformly at random.
+
+		Arguments:
+			rng: The random number generator to use, such as a random.Random object.
+
+		Returns:
+			A tuple in (row,column) format, or None if the body fills the whole grid.
+		"""
+
+		if len(self.free_cells) == 0:
+			return None
+		cell = self.free_cells[rng.randrange(len(self.free_cells))]
+		return (cell//self.cols, cell%self.cols)
+
+	def occupy(self, pos):
+		"""Function to record that a body part moved into a position.
+
+		Arguments:
+			pos: A tuple in (row,column) format. Positions out of bounds are ignored.
+		"""
+
+		cell = self.cell_index(pos)
+		if cell is None:
+			return
+		self.occupancy[cell] += 1
+		if self.occupancy[cell] == 1:
+			#Remove the cell from the free cells by swapping it with the last one
+			index = self.free_cell_index[cell]
+			last_cell = self.free_cells[-1]
+			self.free_cells[index] = last_cell
+			self.free_cell_index[last_cell] = index
+			self.free_cells.pop()
+			self.free_cell_index[cell] = -1
+
+	def vacate(self, pos):
+		"""Function to record that a body part moved out of a position.
+
+		Arguments:
+			pos: A tuple in (row,column) format. Positions out of bounds are ignored.
+		"""
+
+		cell = self.cell_index(pos)
+		if cell is None:
+			return
+		self.occupancy[cell] -= 1
+		if self.occupancy[cell] == 0:
+			self.free_cell_index[cell] = len(self.free_cells)
+			self.free_cells.append(cell)
@@ -4,14 +4,20 @@
 #5/9/2020
 #Module with the SnakeGame class that is instantiated in playSnakeGame.py to play
 #the game, and is a super class for the SnakeGameGATest and SnakeGameGATrain classes.
+#pygame is only needed to render the game, so a headless game can run without it.
 #*************************************************************************************
 
-import pygame
+try:
+	import pygame
+except ImportError:
+	pygame = None
 import random
 import collections
 from helpers import neuralNetwork  as nn
 from helpers import geneticAlgorithm as ga 
-from helpers.snake import Snake
+from helpers.snake import Snake, LEFT, UP, RIGHT, DOWN
+from helpers.gridIndex import get_grid_index
+from helpers.gameRenderer import GameRenderer
 
 
 class SnakeGame():
@@ -31,80 +37,84 @@ class SnakeGame():
 		self.fruit_pos = The position of the frit in the grid, in (row,column) format.
 		self.score = The current score in the game based on how much fruit has been eaten.
 		self.high_score = The highest score achieved since the module was opened.
+		self.headless = Whether the game runs without a pygame window and clock.
+		self.rng = The random.Random object used to place the fruit.
+		self.bitboard = Whether the snake's body is also kept as a bitboard (see bitboard.py).
+		self.grid = The GridIndex with the precomputed neighbors of every cell, shared by all games of this size (see gridIndex.py).
+		self.renderer = The GameRenderer that draws the game in the pygame window (see gameRenderer.py), or None until the first frame.
 	"""
 
-	def __init__(self, fps):
-		"""Initializes the SnakeGame class."""
+	def __init__(self, fps, headless=False, seed=None, bitboard=False, grid_size=10):
+		"""Initializes the SnakeGame class.
+
+		A headless game never touches pygame, so it can be stepped as fast as the CPU allows
+		and run on machines without a display (or without pygame installed).
+		The fruit positions are reproducible when a seed is given.
+		The grid has grid_size rows and columns.
+		"""
 
 		self.width = 500
 		self.height = 600
 		self.grid_start_y = 100
-		self.win = pygame.display.set_mode((self.width, self.height))
+		self.headless = headless
+		if self.headless:
+			self.win = None
+			self.clock = None
+		else:
+			self.win = pygame.display.set_mode((self.width, self.height))
+			self.clock = pygame.time.Clock()
 		self.play = True
 		self.restart = False
-		self.clock = pygame.time.Clock()
 		self.fps = fps
-		self.rows = 10
+		self.rows = grid_size
 		self.cols = self.rows
-		self.snake = Snake(self.rows,self.cols)
+		self.grid = get_grid_index(self.rows, self.cols)
+		self.rng = random.Random(seed)
+		self.bitboard = bitboard
+		self.snake = self.new_snake()
 		self.fruit_pos = (0,0)
 		self.generate_fruit()
 		self.score = 0
 		self.high_score = 0
+		self.renderer = None
 		
-	def redraw_window(self):
-		"""Function to update the pygame window every frame, called from playSnakeGame.py."""
+	def new_snake(self):
+		"""Function to create the snake for a new game.
 
-		self.win.fill(pygame.Color(10, 49, 245))
-		self.draw_data_window()
-		self.draw_grid()
-		self.draw_grid_updates()
-		pygame.display.update()
+		Returns:
+			A Snake object at its starting position.
+		"""
 
-	def draw_data_window(self):
-		"""Function to draw the segment of the pygame window with the score and high score."""
+		return Snake(self.rows, self.cols, self.bitboard)
 
-		pygame.draw.rect(self.win, pygame.Color(20, 20, 20), (0,0,self.width, self.grid_start_y))
-
-		#Add the score and high score
-		font = pygame.font.SysFont('calibri', 20)
-		score_text = font.render('Score: ' + str(self.score),1, (255,255,255))
-		high_score_text = font.render('High Score: ' + str(self.high_score), 1, (255,255,255))
-		self.win.blit(score_text, (30, 50))
-		self.win.blit(high_score_text, (self.width - 140, 50))
+	def redraw_window(self):
+		"""Function to update the pygame window every frame, called from playSnakeGame.py.
 
-	def draw_grid(self):
-		"""Function to draw the grid in the pygame window where the game is played."""
+		Only the parts of the window that changed since the last frame are drawn (see gameRenderer.py).
+		"""
 
-		space_col = self.width//self.cols
-		space_row = (self.height - self.grid_start_y)//self.rows
+		if self.renderer is None:
+			self.renderer = GameRenderer(self.win, self.width, self.height, self.grid_start_y)
+		self.renderer.draw(self)
 
-		for i in range(self.rows):
-			#draw horizontal line
-			pygame.draw.line(self.win, pygame.Color(100,100,100), (0, space_row*i + self.grid_start_y),  (self.width, space_row*i + self.grid_start_y))
+	def data_texts(self):
+		"""Function to get the texts in the segment of the pygame window with the score and high score.
 
-		for i in range(self.cols):
-			#draw vertical line
-			pygame.draw.line(self.win, pygame.Color(100,100,100), (space_col*i, self.grid_start_y), (space_col*i, self.height))
+		Returns:
+			A list of (text, position) tuples.
+		"""
 
-		#draw last lines so they are not cut off
-		pygame.draw.line(self.win, pygame.Color(100,100,100), (space_col*self.rows-2, self.grid_start_y), (space_col*self.rows-2, self.height))
-		pygame.draw.line(self.win, pygame.Color(100,100,100), (0, self.height -2),  (self.width, self.height -2))
+		return [('Score: ' + str(self.score), (30, 50)), ('High Score: ' + str(self.high_score), (self.width - 140, 50))]
 
 	def generate_fruit(self):
 		"""Function to generate a new random position for the fruit."""
 
-		fruit_row = random.randrange(0,self.rows)
-		fruit_col = random.randrange(0,self.cols)
-
-		#Continually generate a location for the fruit until it is not in the snake's body
-		while (fruit_row, fruit_col) in self.snake.body:
+		#Pick any cell that is not in the snake's body
+		fruit_pos = self.snake.random_free_cell(self.rng)
 
-			fruit_row = random.randrange(0,self.rows)
-			fruit_col = random.randrange(0,self.cols)
-
-
-		self.fruit_pos = (fruit_row,fruit_col)
+		#If the snake fills the whole grid there is nowhere left for the fruit
+		if fruit_pos is not None:
+			self.fruit_pos = fruit_pos
 
 	def move_snake(self):
 		"""Function to allow the user to move the snake with the arrow keys."""
@@ -113,78 +123,22 @@ class SnakeGame():
 
 		#Determine which arrow key the user selected
 		if keys[pygame.K_LEFT]:
-			direct = "left"
+			direct = LEFT
 		elif keys[pygame.K_UP]:
-			direct = "up"
+			direct = UP
 		elif keys[pygame.K_RIGHT]:
-			direct = "right"
+			direct = RIGHT
 		elif keys[pygame.K_DOWN]:
-			direct = "down"
+			direct = DOWN
 		else:
-			if len(self.snake.directions) == 0:
+			if self.snake.direction is None:
 				#Move right at beginning of game
-				direct = "right"
+				direct = RIGHT
 			else:
 				#Otherwise continue with previous direction if no key pressed
-				direct = self.snake.directions[0]
-
-		self.snake.directions.appendleft(direct)
-		if len(self.snake.directions) > len(self.snake.body):
-			self.snake.directions.pop()
-
-		self.snake.update_body_positions()
-
+				direct = self.snake.direction
 
-	def draw_grid_updates(self):
-		"""Function called from redraw_window() to update the grid area of the window."""
-
-		space_col = self.width//self.cols
-		space_row = (self.height - self.grid_start_y)//self.rows
-
-		#Draw the fruit
-		fruit_y = self.fruit_pos[0]
-		fruit_x = self.fruit_pos[1]
-		pygame.draw.rect(self.win, pygame.Color(250,30,30), (space_col*fruit_x+1, self.grid_start_y + space_row*fruit_y+1, space_col-1, space_row-1))
-
-		#Draw the updated snake since last movement
-		for pos in self.snake.body:
-			pos_y = pos[0]
-			pos_x = pos[1]
-			
-			pygame.draw.rect(self.win, pygame.Color(31,240,12), (space_col*pos_x+1, self.grid_start_y + space_row*pos_y+1, space_col-1, space_row-1))
-
-		
-		head = self.snake.body[0]
-		head_y = head[0]
-		head_x = head[1]
-		head_dir = self.snake.directions[0]
-
-		#Draw eyes on the head of the snake, determining which direction they should face
-
-		#if head facing left
-		if head_dir == "left":
-			#draw left eye
-			pygame.draw.circle(self.win, pygame.Color(100,100,100), (space_col*head_x+space_col//10, self.grid_start_y + space_row*head_y + (space_row*4)//5), 2)
-			#draw right eye
-			pygame.draw.circle(self.win, pygame.Color(100,100,100), (space_col*head_x+space_col//10, self.grid_start_y + space_row*head_y + space_row//5), 2)
-		#if head facing up
-		elif head_dir == "up":
-			#draw left eye
-			pygame.draw.circle(self.win, pygame.Color(100,100,100), (space_col*head_x+space_col//5, self.grid_start_y + space_row*head_y + space_row//10), 2)
-			#draw right eye
-			pygame.draw.circle(self.win, pygame.Color(100,100,100), (space_col*head_x+(space_col*4)//5, self.grid_start_y + space_row*head_y + space_row//10), 2)
-		#if head facing right
-		elif head_dir == "right":
-			#draw left eye
-			pygame.draw.circle(self.win, pygame.Color(100,100,100), (space_col*head_x+(space_col*9)//10, self.grid_start_y + space_row*head_y + space_row//5), 2)
-			#draw right eye
-			pygame.draw.circle(self.win, pygame.Color(100,100,100), (space_col*head_x+(space_col*9)//10, self.grid_start_y + space_row*head_y + (space_row*4)//5), 2)
-		#if head is facing down
-		else:
-			#draw left eye
-			pygame.draw.circle(self.win, pygame.Color(100,100,100), (space_col*head_x+space_col//5, self.grid_start_y + space_row*head_y + (space_row*9)//10), 2)
-			#draw right eye
-			pygame.draw.circle(self.win, pygame.Color(100,100,100), (space_col*head_x+(space_col*4)//5, self.grid_start_y + space_row*head_y + (space_row*9)//10), 2)
+		self.snake.move(direct)
 
 
 	def check_collisions(self):
@@ -224,9 +178,13 @@ class SnakeGame():
 		if len(self.snake.body) > 1:
 			#Only need to check the colisions of the head of the snake
 			head = self.snake.body[0]
-			body_without_head = self.snake.body[1:]
 
-			if head in body_without_head:
+			#The head collided if another body part is in the same cell
+			if self.snake.bitboard is not None:
+				collided = self.snake.bitboard.contains(self.snake.body_bits, head)
+			else:
+				collided = self.snake.count_at(head) > 1
+			if collided:
 				self.game_over()
 
 	def event_handler(self):
@@ -242,7 +200,7 @@ class SnakeGame():
 	def game_over(self):
 		"""Function that restarts the game upon game over."""
 
-		self.snake = Snake(self.rows,self.cols)
+		self.snake = self.new_snake()
 		self.generate_fruit()
 		self.restart = True
 		if self.score > self.high_score:
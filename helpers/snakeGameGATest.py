@@ -6,12 +6,13 @@
 #to observe the best agents that were trained with the genetic algorithm.
 #*************************************************************************************
 
-import pygame
 import random
 import collections
 from helpers.snakeGame import SnakeGame
-from helpers.snake import Snake
+from helpers.snake import Snake, LEFT, UP, RIGHT, DOWN, DIRECTION_OFFSETS
 from helpers import neuralNetwork as nn
+from helpers.bitboard import popcount
+from helpers.gridIndex import WALL
 
 class SnakeGameGATest(SnakeGame):
 	"""Class framework to observe agents who were trained with the genetic algortihm to play the Snake Game.
@@ -25,84 +26,126 @@ class SnakeGameGATest(SnakeGame):
 		self.num_hidden_layer_nodes: The number of nodes per each of the 2 hidden layers in the neural network.
 		self.num_ouputs: The number of outputs in the neural network.
 		self.weights: The weights for the neural network converted from the chromosome bit sequence of the agent.
+		self.fruit_distances: A list with the manhattan distance from the fruit to every cell of the grid.
+		self.fruit_distances_pos: The fruit position that self.fruit_distances was built for.
+		self.profiler: A PhaseProfiler (see profiler.py) that times the features and inference of every move, or None.
 	"""
 
-	def __init__(self, fps, chromosome, bits_per_weight, num_inputs, num_hidden_layer_nodes, num_outputs):
+	def __init__(self, fps, chromosome, bits_per_weight, num_inputs, num_hidden_layer_nodes, num_outputs, headless=False, seed=None, bitboard=False, grid_size=10):
 		"""Initializes the SnakeGameGATest class.
 		
-		The only agrument that is not a documented class attribute is:
+		The only agruments that are not documented class attributes are:
 			chromosome: A string of bits representing all of the weights for the neural network.
+			headless: Whether to run the game without a pygame window (see SnakeGame).
+			seed: The seed for placing the fruit, or None for unpredictable games (see SnakeGame).
+			bitboard: Whether to keep the snake's body as a bitboard and calculate the open spaces with it (see SnakeGame).
+			grid_size: The number of rows and columns in the grid (see SnakeGame).
 		"""
 
-		super().__init__(fps)
+		super().__init__(fps, headless, seed, bitboard, grid_size)
 		self.frames_since_last_fruit = 0
 		self.bits_per_weight = bits_per_weight
 		self.num_inputs = num_inputs
 		self.num_hidden_layer_nodes = num_hidden_layer_nodes
 		self.num_outputs = num_outputs
+		self.fruit_distances = None
+		self.fruit_distances_pos = None
+		self.profiler = None
 		#chromsome will be an empty string if this class was inhereted from the class SnakeGameGATrain
 		#This is because there will be a population of chromosomes, and not just one chromosome to test
 		if chromosome != "":
-			self.weights = nn.mapChrom2Weights(chromosome, self.bits_per_weight, self.num_inputs, self.num_hidden_layer_nodes, self.num_outputs)
+			self.weights = nn.compileChromosome(chromosome, self.bits_per_weight, self.num_inputs, self.num_hidden_layer_nodes, self.num_outputs)
 	
 	
+	def step(self):
+		"""Function that advances the game by one frame without rendering it.
+
+		This is the whole simulation for a frame: the agent moves, collisions are handled,
+		and the snake is killed if it has not eaten a fruit in a while.
+		If the frame ended in a game over, the starvation counter of the new game is left untouched.
+		"""
+
+		self.move_snake()
+		self.check_collisions()
+		if not self.restart:
+			#check if snake is killed for not eating a fruit in a while
+			self.update_frames_since_last_fruit()
+		if self.profiler is not None:
+			self.profiler.count("steps")
+
 	def move_snake(self):
 		"""Function that determines where snake should move next based on the nueral network.
 
 		This overrides the method in the SnakeGame superclass.
 		"""
 		
+		profiler = self.profiler
+		if profiler is not None:
+			profiler.start("features")
+
 		head = self.snake.body[0]
+		head_cell = head[0]*self.cols + head[1]
 
 		#Get the manhattan ditance of the fruit from the head if it moves in each direction
-		dist_left_fruit = self.manhattan_distance(head[0],head[1]-1)
-		dist_up_fruit = self.manhattan_distance(head[0]-1,head[1])
-		dist_right_fruit = self.manhattan_distance(head[0],head[1]+1)
-		dist_down_fruit = self.manhattan_distance(head[0]+1, head[1])
+		#A move into a wall is always one step further from the fruit than the head
+		fruit_distances = self.get_fruit_distances()
+		head_dist = fruit_distances[head_cell]
+		dists = [head_dist + 1 if cell == WALL else fruit_distances[cell] for cell in self.grid.neighbor_cells[head_cell]]
+		dist_left_fruit = dists[LEFT]
+		dist_up_fruit = dists[UP]
+		dist_right_fruit = dists[RIGHT]
+		dist_down_fruit = dists[DOWN]
 
 		#Calculate the space available for turning in each of the four directions, reduced by a constant factor
 		constant = 20
-		open_spaces_left = self.calc_open_spaces((head[0], head[1]-1))/constant
-		open_spaces_up = self.calc_open_spaces((head[0]-1, head[1]))/constant
-		open_spaces_right = self.calc_open_spaces((head[0], head[1]+1))/constant
-		open_spaces_down = self.calc_open_spaces((head[0]+1, head[1]))/constant
+		open_spaces = self.calc_all_open_spaces(head)
+		open_spaces_left = open_spaces[LEFT]/constant
+		open_spaces_up = open_spaces[UP]/constant
+		open_spaces_right = open_spaces[RIGHT]/constant
+		open_spaces_down = open_spaces[DOWN]/constant
 
 		#Get the length of the snake
 		length = self.score + 1
 	
 		network_inputs = [dist_left_fruit, dist_up_fruit, dist_right_fruit, dist_down_fruit,  open_spaces_left, open_spaces_up, open_spaces_down, open_spaces_right, length]
 
+		if profiler is not None:
+			profiler.stop("features")
+			profiler.start("inference")
+
 		#Get all of the outputs from the neural network indicating a value of "goodness" for turning in each direction
 		outputs = nn.testNetwork(network_inputs, self.weights, self.num_hidden_layer_nodes, self.num_outputs)
+
+		if profiler is not None:
+			profiler.stop("inference")
+			profiler.count("forward_passes")
 		#Get the maximum of all the ouputs, and this is the direction to turn
 		max_output = max(outputs)
 		#Systematically decide which direction to turn based on the max output
 		if max_output == outputs[0]:
-			direct = "left"
+			direct = LEFT
 		elif max_output == outputs[1]:
-			direct = "up"
+			direct = UP
 		elif max_output == outputs[2]:
-			direct = "right"
+			direct = RIGHT
 		else:
-			direct = "down"
+			direct = DOWN
 
-		self.snake.directions.appendleft(direct)
-		if len(self.snake.directions) > len(self.snake.body):
-			self.snake.directions.pop()
+		self.snake.move(direct)
 
-		self.snake.update_body_positions()
+	def get_fruit_distances(self):
+		"""Function to get the table of manhattan distances from the fruit to every cell.
 
-	def manhattan_distance(self, y_head, x_head):
-		"""Function to calculate the manhattan distance between the fruit and the snake's head
-
-		Arguments:
-			y_head: The row in the grid of the snake's head.
-			x_head: The column in the grid of the snake's head.
+		The table is only rebuilt when the fruit has moved since the last call.
 
 		Returns:
-			The manhattan distance between the fruit and the snake's head.
+			A list with the manhattan distance from the fruit to each cell, indexed by row*cols + column.
 		"""
-		return abs(self.fruit_pos[0] - y_head) + abs(self.fruit_pos[1] - x_head)
+
+		if self.fruit_distances_pos != self.fruit_pos:
+			self.fruit_distances = self.grid.distances_from(self.fruit_pos)
+			self.fruit_distances_pos = self.fruit_pos
+		return self.fruit_distances
 
 	def calc_open_spaces(self,start_pos):
 		"""Function to calculate the number of open spaces around the snake 
@@ -122,7 +165,7 @@ class SnakeGameGATest(SnakeGame):
 		start_x = start_pos[0]
 
 		#If the start position is in the snake's body or out of bounds
-		if start_pos in self.snake.body or (start_x < 0 or start_x >= self.cols or start_y < 0 or start_y >= self.rows):
+		if self.snake.is_occupied(start_pos) or (start_x < 0 or start_x >= self.cols or start_y < 0 or start_y >= self.rows):
 				#no open spaces
 				return 0
 
@@ -146,11 +189,113 @@ class SnakeGameGATest(SnakeGame):
 					visited.add(move)
 
 					#if the move is an open space
-					if move not in self.snake.body:
+					if not self.snake.is_occupied(move):
 						open_spaces +=1
 						#add the open space to the queue for further searching
 						queue.append(move)
 
+		if self.profiler is not None:
+			self.profiler.count("bfs_nodes", len(visited))
+
+		return open_spaces
+
+	def calc_all_open_spaces(self, head):
+		"""Function to calculate the number of open spaces around the snake for all four directions at once.
+
+		This gives the same counts as calling calc_open_spaces() for each position next to the head,
+		but the free cells are labeled by connected component with a single flood fill over the grid.
+		Two directions that lead into the same component share one fill, and no cell is filled twice.
+
+		Arguments:
+			head: A tuple in (row,column) format representing the position of the snake's head
+
+		Returns:
+			A list with how many open spaces are available when moving left, up, right and down,
+			indexed by direction code.
+		"""
+
+		if self.snake.bitboard is not None:
+			return self.calc_all_open_spaces_bitboard(head)
+
+		occupancy = self.snake.occupancy
+		neighbors = self.grid.neighbors
+
+		#The component label of each cell (0 when not yet reached), and the size of each component
+		labels = [0]*(self.rows*self.cols)
+		component_sizes = [0]
+
+		open_spaces = []
+		for start in self.grid.neighbor_cells[head[0]*self.cols + head[1]]:
+
+			#If the start position is out of bounds or in the snake's body
+			if start == WALL or occupancy[start]:
+				#no open spaces
+				open_spaces.append(0)
+				continue
+
+			if labels[start] == 0:
+				#Fill the whole component of the start position with a new label
+				label = len(component_sizes)
+				labels[start] = label
+				stack = [start]
+				size = 1
+				while stack:
+					for cell in neighbors[stack.pop()]:
+						if not labels[cell] and not occupancy[cell]:
+							labels[cell] = label
+							stack.append(cell)
+							size += 1
+				component_sizes.append(size)
+
+			#The start position itself is not counted as an open space
+			open_spaces.append(component_sizes[labels[start]] - 1)
+
+		if self.profiler is not None:
+			self.profiler.count("bfs_nodes", sum(component_sizes))
+
+		return open_spaces
+
+	def calc_all_open_spaces_bitboard(self, head):
+		"""Function to calculate the number of open spaces around the snake for all four directions with bitboards.
+
+		Each component is grown by shifting the whole board at once, and its size is a count of the set bits.
+		This gives the same counts as calc_all_open_spaces().
+
+		Arguments:
+			head: A tuple in (row,column) format representing the position of the snake's head
+
+		Returns:
+			A list with how many open spaces are available when moving left, up, right and down,
+			indexed by direction code.
+		"""
+
+		bitboard = self.snake.bitboard
+		free = bitboard.free_cells(self.snake.body_bits | bitboard.bit(head))
+		#The components that were already filled, with their number of open spaces
+		regions = []
+
+		open_spaces = []
+		for offset in DIRECTION_OFFSETS:
+			start = bitboard.bit((head[0] + offset[0], head[1] + offset[1]))
+
+			#If the start position is out of bounds or in the snake's body
+			if start & free == 0:
+				open_spaces.append(0)
+				continue
+
+			for region, region_open_spaces in regions:
+				if start & region:
+					open_spaces.append(region_open_spaces)
+					break
+			else:
+				region = bitboard.flood_fill(start, free)
+				#The start position itself is not counted as an open space
+				regions.append((region, popcount(region) - 1))
+				open_spaces.append(regions[-1][1])
+
+		if self.profiler is not None:
+			self.profiler.count("bfs_nodes", sum(region_open_spaces + 1 for _, region_open_spaces in regions))
+
 		return open_spaces
 
 	def get_possible_moves(self,cur):
@@ -163,18 +308,11 @@ class SnakeGameGATest(SnakeGame):
 			to get the next possible moves from.
 
 		Returns:
-			A list containing (row,column) tuples of all the possible adjacent moves.
+			A tuple containing (row,column) tuples of all the possible adjacent moves.
 		"""
 
-		adjacent_spaces = [(cur[0], cur[1]-1), (cur[0]-1,cur[1]), (cur[0], cur[1]+1), (cur[0]+1, cur[1])]
-		possible_moves = []
-		for move in adjacent_spaces:
-			move_y = move[1]
-			move_x = move[0]
-			#If the move is not out of bounds
-			if move_x >= 0 and move_x < self.cols and move_y >= 0 and move_y < self.rows:
-					possible_moves.append(move)
-		return possible_moves
+		#The in-bounds neighbors of every cell are precomputed in the grid index
+		return self.grid.neighbor_positions[cur[0]*self.cols + cur[1]]
 
 
 	def check_fruit_collision(self):
@@ -206,7 +344,7 @@ class SnakeGameGATest(SnakeGame):
 
 		This overrides the method in the SnakeGame superclass."""
 
-		self.snake = Snake(self.rows,self.cols)
+		self.snake = self.new_snake()
 		self.generate_fruit()
 		self.restart = True
 		if self.score > self.high_score:
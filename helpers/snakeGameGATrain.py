@@ -6,14 +6,22 @@
 #to train a population of intelligent Sanke Game agents.
 #*************************************************************************************
 
-import pygame
 import random
+import time
 import collections
 from helpers.snakeGameGATest import SnakeGameGATest
-from helpers.snake import Snake
 from helpers import neuralNetwork as nn
 from helpers import geneticAlgorithm as ga 
-import os
+from helpers.seeds import deriveSeed, episodeSeed
+from helpers.checkpoint import encodeRngState
+from helpers.profiler import SamplingProfiler
+try:
+	import numpy as np
+	from helpers import packedChromosomes as pc
+except ImportError:
+	#Without numpy, the genetic algorithm works on the chromosome bit strings of geneticAlgorithm.py
+	np = None
+	pc = None
 
 
 class SnakeGameGATrain(SnakeGameGATest):
@@ -32,9 +40,26 @@ class SnakeGameGATrain(SnakeGameGATest):
 		self.fitness_scores: A list of all the fitness scores, each index corresponding to a chromosome in self.population.
 		self.game_scores: A list of all the in-game scores, each index corresponding to a chromosome in self.population.
 		self.num_generation: The number of generations that have passed.
+		self.fitness_cache: A FitnessCache (see fitnessCache.py) used to skip chromosomes that were already played,
+		or None to play every chromosome.
+		self.run_seed: The seed of the training run, or None for an unpredictable run.
+		With a run seed, each chromosome is played in a game seeded from the chromosome itself (see seeds.py).
+		self.ga_rng: The random number generator used by the genetic algorithm (see new_ga_rng()).
+		self.selection_method: How the genetic algorithm selects parents, one of geneticAlgorithm.SELECTION_METHODS.
+		self.elite_mode: How the genetic algorithm keeps the best parents, one of geneticAlgorithm.ELITE_MODES.
+		self.telemetry: A TelemetryWriter (see telemetry.py) that records every generation, or None.
+		self.verbose: Whether to print a line of stats for every generation.
+		self.generation_start: The time the current generation started, from time.perf_counter().
+		self.checkpoints: A CheckpointWriter (see checkpoint.py) that saves the population every few generations, or None.
+		self.profiler: A PhaseProfiler (see profiler.py) with the timers and counters of the current generation, or None.
+		self.profile_generation: The number of the generation whose call stacks are sampled, or None.
+		self.sampler: The SamplingProfiler of that generation while it is being played, or None.
+		self.vectorized: Whether the generations are played by a VectorGenerationEvaluator (see vectorSnakeEnv.py).
+		Its games place the fruit with the random numbers of numpy, so with the same run seed they differ from
+		the games played in every other mode.
 	"""
 
-	def __init__(self, fps, population, chroms_per_gen, bits_per_weight, num_inputs, num_hidden_layer_nodes, num_outputs):
+	def __init__(self, fps, population, chroms_per_gen, bits_per_weight, num_inputs, num_hidden_layer_nodes, num_outputs, headless=False, fitness_cache=None, run_seed=None, bitboard=False, selection_method="roulette", elite_mode="above_median", telemetry=None, verbose=True, checkpoints=None, profiler=None, profile_generation=None, vectorized=False):
 		"""Initializes the SnakeGameGATrain class
 
 		Arguments:
@@ -45,17 +70,44 @@ class SnakeGameGATrain(SnakeGameGATest):
 			num_inputs: The number of inputs in the neural network.
 			num_hidden_layer_nodes: The number of nodes per each of the 2 hidden layers in the neural network.
 			num_ouputs: The number of outputs in the neural network.
+			headless: Whether to train without a pygame window (see SnakeGame).
+			fitness_cache: A FitnessCache to skip chromosomes that were already played, or None.
+			run_seed: The seed of the training run, or None for an unpredictable run.
+			bitboard: Whether to calculate the open spaces with bitboards (see SnakeGameGATest).
+			selection_method: How the genetic algorithm selects parents (see geneticAlgorithm.selectPairs()).
+			elite_mode: How the genetic algorithm keeps the best parents (see geneticAlgorithm.extractBestParents()).
+			telemetry: A TelemetryWriter that records every generation, or None.
+			verbose: Whether to print a line of stats for every generation.
+			checkpoints: A CheckpointWriter that saves the population every few generations, or None.
+			profiler: A PhaseProfiler for the timers and counters that are recorded with every generation, or None.
+			profile_generation: The number of a generation to sample the call stacks of, or None.
+			vectorized: Whether the generations are played by a VectorGenerationEvaluator.
 		"""
 		
-		super().__init__(fps, "", bits_per_weight, num_inputs, num_hidden_layer_nodes, num_outputs)
+		super().__init__(fps, "", bits_per_weight, num_inputs, num_hidden_layer_nodes, num_outputs, headless, bitboard=bitboard)
 		self.cur_chrom = 0
 		self.frames_alive = 0
 		self.chroms_per_gen = chroms_per_gen
 		self.population = population
-		self.weights = nn.mapChrom2Weights(self.population[self.cur_chrom], self.bits_per_weight, self.num_inputs, self.num_hidden_layer_nodes, self.num_outputs)
 		self.fitness_scores = []
 		self.game_scores = []
 		self.num_generations = 0
+		self.fitness_cache = fitness_cache
+		self.run_seed = run_seed
+		self.ga_rng = new_ga_rng(deriveSeed(run_seed, "ga") if run_seed is not None else None)
+		self.selection_method = selection_method
+		self.elite_mode = elite_mode
+		self.telemetry = telemetry
+		self.verbose = verbose
+		self.generation_start = time.perf_counter()
+		self.checkpoints = checkpoints
+		self.profiler = profiler
+		self.profile_generation = profile_generation
+		self.vectorized = vectorized
+		self.compile_weights()
+		self.sampler = None
+		self.start_sampling()
+		self.start_game()
 
 
 	def game_over(self):
@@ -64,52 +116,20 @@ class SnakeGameGATrain(SnakeGameGATest):
 		This overrides the method in the SnakeGameGATest superclass."""
 
 		#Make necessary updates to move onto the next chromosome.
-		self.fitness_scores.append(self.calc_fitness())
+		fitness = self.calc_fitness()
+		self.fitness_scores.append(fitness)
+		if self.fitness_cache is not None:
+			self.fitness_cache.store(self.population[self.cur_chrom], fitness, self.score, episodeSeed(self.run_seed, self.population[self.cur_chrom]))
 		self.cur_chrom +=1
 		self.game_scores.append(self.score)
 
-		#If we are done testing all the chromsomes in the population.
-		if self.cur_chrom == self.chroms_per_gen:
-			#Move onto next generation
-			self.num_generations +=1
-			next_generation, best_individual, best_fitness, average_fitness = ga.createNextGeneration(self.population, self.fitness_scores)
-			
-			self.population = next_generation
-			self.cur_chrom  = 0
-			self.fitness_scores = []
+		self.skip_cached_chromosomes()
 
-			average_game_score = sum(self.game_scores)/len(self.game_scores)
-
-			high_score_per_cur_gen = max(self.game_scores)
-
-			print(self.num_generations, self.high_score, average_game_score, high_score_per_cur_gen, average_fitness)
-
-			self.game_scores = []
-
-			#Write data about this generation to ga_data.txt
-			file = open("GAdata.txt", "a+")
-			file.write("Generation " + str(self.num_generations) + "\n")
-			file.write("Best Individual: " + str(best_individual) + "\n")
-			file.write("Best Fitness: " + str(best_fitness) + "\n")
-			file.write("Average Fitness:" + str(average_fitness) + "\n")
-			file.write("Average Game Score:" + str(average_game_score) + "\n\n")
-			file.write("\n")
-			file.close()
-
-			#Every 10 generations save the population to a file in the populations folder
-			if self.num_generations%10 == 0:
-				#Get the path of the directory with all the populations
-				abs_file_path = os.path.join(os.getcwd(), "populations/population_" + str(self.num_generations) + ".txt")
-				file = open(abs_file_path, "a+")
-				file.write(str(self.population))
-				file.write("\n")
-				file.close()
-
-		self.weights = nn.mapChrom2Weights(self.population[self.cur_chrom], self.bits_per_weight, self.num_inputs, self.num_hidden_layer_nodes, self.num_outputs)
+		self.compile_weights()
 
 		#Reset the game itself
-		self.snake = Snake(self.rows,self.cols)
-		self.generate_fruit()
+		self.snake = self.new_snake()
+		self.start_game()
 		self.restart = True
 		if self.score > self.high_score:
 			self.high_score = self.score
@@ -117,20 +137,376 @@ class SnakeGameGATrain(SnakeGameGATest):
 		self.frames_alive = 0
 		self.frames_since_last_fruit = 0
 
+	def compile_weights(self):
+		"""Function that gets the weights of the neural network for the current chromosome.
+
+		In windowed training the games are played by this object, so the profiler counts whether the
+		chromosome had to be decoded or was found in the weight cache. In headless training the games
+		are played by an evaluator, which counts them instead.
+		"""
+
+		decodes = nn.weightCache.misses
+		self.weights = nn.compileChromosome(self.population[self.cur_chrom], self.bits_per_weight, self.num_inputs, self.num_hidden_layer_nodes, self.num_outputs)
+		if self.profiler is not None and not self.headless:
+			self.profiler.count("decodes" if nn.weightCache.misses > decodes else "weight_cache_hits")
+
+	def start_game(self):
+		"""Function that seeds the game of the current chromosome and places the first fruit."""
+
+		if self.run_seed is not None:
+			self.rng.seed(episodeSeed(self.run_seed, self.population[self.cur_chrom]))
+		self.generate_fruit()
+
+	def skip_cached_chromosomes(self):
+		"""Function that moves past every chromosome whose fitness is already cached.
+
+		This also moves onto the next generation whenever all the chromosomes in the population are done.
+		"""
+
+		while True:
+			#If we are done testing all the chromsomes in the population.
+			if self.cur_chrom == self.chroms_per_gen:
+				self.next_generation()
+
+			if self.fitness_cache is None:
+				return
+			cached = self.fitness_cache.lookup(self.population[self.cur_chrom])
+			if cached is None:
+				return
+			self.fitness_scores.append(cached.fitness)
+			self.game_scores.append(cached.game_score)
+			self.cur_chrom += 1
+
+	def next_generation(self):
+		"""Function that evolves the population once every chromosome has a fitness score.
+
+		self.fitness_scores and self.game_scores must hold one entry per chromosome in self.population.
+		"""
+
+		self.num_generations +=1
+		sampling_profile_path = self.stop_sampling()
+		profiler = self.profiler
+		ga_start = time.perf_counter()
+
+		#Every few generations save the scored population, before the genetic algorithm draws any random numbers
+		checkpoint_path = None
+		if self.checkpoints is not None and self.checkpoints.is_due(self.num_generations):
+			if profiler is not None:
+				profiler.start("checkpoint")
+			checkpoint_path = self.save_checkpoint()
+			if profiler is not None:
+				profiler.stop("checkpoint")
+
+		if profiler is not None:
+			profiler.start("ga")
+		fitness_stats = ga.fitnessStats(self.fitness_scores)
+		next_generation, best_individual, best_fitness, average_fitness = create_next_generation(self.population, self.fitness_scores, self.ga_rng, self.selection_method, self.elite_mode, fitness_stats)
+		if profiler is not None:
+			profiler.stop("ga")
+		ga_end = time.perf_counter()
+		
+		self.population = next_generation
+		self.cur_chrom  = 0
+		self.fitness_scores = []
+
+		average_game_score = sum(self.game_scores)/len(self.game_scores)
+
+		high_score_per_cur_gen = max(self.game_scores)
+
+		if self.verbose:
+			print(self.num_generations, self.high_score, average_game_score, high_score_per_cur_gen, average_fitness)
+
+		#Record data about this generation
+		if self.telemetry is not None:
+			record = {
+				"generation": self.num_generations,
+				"time": time.time(),
+				"play_seconds": ga_start - self.generation_start,
+				"ga_seconds": ga_end - ga_start,
+				"best_fitness": best_fitness,
+				"average_fitness": average_fitness,
+				"fitness_quartiles": list(fitness_stats.quantiles),
+				"average_score": average_game_score,
+				"max_score": high_score_per_cur_gen,
+				"high_score": self.high_score,
+				"best_chromosome": self.telemetry.chromosome_ref(best_individual),
+			}
+			if self.fitness_cache is not None:
+				record["cache_hit_rate"] = self.fitness_cache.hit_rate()
+				record["cache_duplicates"] = self.fitness_cache.duplicates
+			if checkpoint_path is not None:
+				record["checkpoint"] = checkpoint_path
+			if sampling_profile_path is not None:
+				record["sampling_profile"] = sampling_profile_path
+			if profiler is not None:
+				if self.fitness_cache is not None:
+					profiler.count("fitness_cache_hits", self.fitness_cache.hits)
+				record["profile"] = profiler.end_generation()
+			self.telemetry.write(record)
+		elif profiler is not None:
+			profiler.end_generation()
+		if self.fitness_cache is not None:
+			self.fitness_cache.reset_stats()
+
+		self.game_scores = []
+		self.generation_start = time.perf_counter()
+		self.start_sampling()
+
+	def start_sampling(self):
+		"""Function that starts sampling the call stacks if the generation about to be played is self.profile_generation."""
+
+		if self.profile_generation is not None and self.profile_generation == self.num_generations + 1:
+			self.sampler = SamplingProfiler()
+			self.sampler.start()
+
+	def stop_sampling(self):
+		"""Function that stops sampling the call stacks of a generation and saves them.
+
+		Returns:
+			The path of the file with the sampled stacks, or None if the generation was not sampled.
+		"""
+
+		if self.sampler is None:
+			return None
+
+		self.sampler.stop()
+		path = "profile_generation_" + str(self.num_generations) + ".txt"
+		self.sampler.dump(path)
+		self.sampler = None
+
+		return path
+
+	def save_checkpoint(self):
+		"""Function that starts saving the current population with its scores as a checkpoint.
+
+		The checkpoint also holds the state of the random number generator of the genetic algorithm,
+		so the next generation can be created from it exactly as if training had not stopped.
+
+		Returns:
+			The path of the checkpoint.
+		"""
+
+		metadata = {
+			"bits_per_weight": self.bits_per_weight,
+			"num_inputs": self.num_inputs,
+			"num_hidden_layer_nodes": self.num_hidden_layer_nodes,
+			"num_outputs": self.num_outputs,
+			#The score of the last game played may not be counted in self.high_score yet
+			"high_score": max(self.high_score, max(self.game_scores)),
+			"run_seed": self.run_seed,
+			"selection_method": self.selection_method,
+			"elite_mode": self.elite_mode,
+			"rng_state": encodeRngState(get_rng_state(self.ga_rng)),
+			#The games of a seeded run depend on whether they were played vectorized
+			"vectorized": self.vectorized,
+		}
+
+		return self.checkpoints.save(self.num_generations, self.population, self.fitness_scores, self.game_scores, metadata)
+
+	def restore_checkpoint(self, checkpoint):
+		"""Function that continues training from a checkpoint saved by save_checkpoint().
+
+		The next generation is created from the scored population of the checkpoint with the saved
+		state of the random number generator, so with a run seed the training goes on exactly as if it had
+		not stopped. The network shape, run seed, selection method and elite mode should match the checkpoint,
+		and so should whether numpy is installed, or the genetic algorithm starts from a new random state.
+
+		Arguments:
+			checkpoint: A Checkpoint (see checkpoint.py).
+		"""
+
+		self.num_generations = checkpoint.header["generation"]
+		self.high_score = max(self.high_score, checkpoint.header["high_score"])
+		rng_state = checkpoint.rng_state()
+		if rng_state is not None:
+			set_rng_state(self.ga_rng, rng_state)
+
+		parents = checkpoint.population()
+		fitness_scores = checkpoint.fitness_scores()
+		game_scores = checkpoint.game_scores()
+
+		#The best parents survive, so remember their scores instead of playing them again
+		if self.fitness_cache is not None:
+			for chrom, fitness, game_score in zip(parents, fitness_scores, game_scores):
+				self.fitness_cache.store(chrom, fitness, game_score, episodeSeed(self.run_seed, chrom))
+
+		self.population, _, _, _ = create_next_generation(parents, fitness_scores, self.ga_rng, self.selection_method, self.elite_mode)
+		self.chroms_per_gen = len(self.population)
+
+		#Start over with the first chromosome of the new population
+		self.cur_chrom = 0
+		self.fitness_scores = []
+		self.game_scores = []
+		self.compile_weights()
+		self.snake = self.new_snake()
+		self.start_game()
+		self.score = 0
+		self.frames_alive = 0
+		self.frames_since_last_fruit = 0
+		self.generation_start = time.perf_counter()
+
+	def step(self):
+		"""Function that advances the game by one frame without rendering it.
+
+		This overrides the method in the SnakeGameGATest superclass to also count the
+		frames the current agent has been alive.
+		"""
+
+		super().step()
+		if not self.restart:
+			self.frames_alive += 1
+
 	def calc_fitness(self):
 		"""Function to calculate the fitness score for a chromosome.
 		
 		Returns: A fitness score.
 		"""
 
-		frame_score = self.frames_alive
-		#If the frames since the last fruit was eaten is at least 50
-		if self.frames_since_last_fruit >= 50:
-			#Subtract the number of frames since the last fruit was eaten from the fitness
-			#This is to discourage snakes from trying to gain fitness by avoiding fruit
-			frame_score = self.frames_alive - self.frames_since_last_fruit
-			#Ensure we do not multiply fitness by a factor of 0
-			if frame_score <= 0:
-					frame_score = 1
-
-		return ((self.score*2)**2)*(frame_score**1.5)
\ No newline at end of file
+		return calc_fitness(self.score, self.frames_alive, self.frames_since_last_fruit)
+
+	def evaluate_generation(self, evaluator):
+		"""Function that scores the whole population at once and then moves onto the next generation.
+
+		This replaces playing the population one chromosome after another through game_over().
+
+		Arguments:
+			evaluator: A GenerationEvaluator (see generationEvaluator.py) used to play every chromosome.
+		"""
+
+		#The generation is sent with the snapshots of a spectated run
+		evaluator.generation = self.num_generations + 1
+		if self.profiler is not None:
+			self.profiler.start("evaluate")
+		if self.fitness_cache is None:
+			self.fitness_scores, self.game_scores = evaluator.evaluate(self.population)
+		else:
+			self.fitness_scores, self.game_scores = self.fitness_cache.evaluate(self.population, evaluator)
+		if self.profiler is not None:
+			self.profiler.stop("evaluate")
+		if max(self.game_scores) > self.high_score:
+			self.high_score = max(self.game_scores)
+		self.next_generation()
+		self.compile_weights()
+
+
+def calc_fitness(score, frames_alive, frames_since_last_fruit):
+	"""Function to calculate the fitness score for a chromosome from the end state of its game.
+
+	Arguments:
+		score: The in-game score when the agent died.
+		frames_alive: The number of frames the agent was alive.
+		frames_since_last_fruit: The number of frames since the agent last ate a fruit.
+
+	Returns: A fitness score.
+	"""
+
+	frame_score = frames_alive
+	#If the frames since the last fruit was eaten is at least 50
+	if frames_since_last_fruit >= 50:
+		#Subtract the number of frames since the last fruit was eaten from the fitness
+		#This is to discourage snakes from trying to gain fitness by avoiding fruit
+		frame_score = frames_alive - frames_since_last_fruit
+		#Ensure we do not multiply fitness by a factor of 0
+		if frame_score <= 0:
+				frame_score = 1
+
+	return ((score*2)**2)*(frame_score**1.5)
+
+
+def new_ga_rng(seed=None):
+	"""Function to create a random number generator for the genetic algorithm.
+
+	Arguments:
+		seed: The seed of the generator, or None for an unpredictable one.
+
+	Returns:
+		A numpy random Generator for the packed genetic algorithm (see packedChromosomes.py),
+		or a random.Random object for geneticAlgorithm.py if numpy is not installed.
+	"""
+
+	if pc is None:
+		return random.Random(seed)
+
+	return np.random.default_rng(seed)
+
+def get_rng_state(rng):
+	"""Function to get the state of a random number generator from new_ga_rng(), for encodeRngState() in checkpoint.py."""
+
+	if isinstance(rng, random.Random):
+		return rng.getstate()
+
+	return rng.bit_generator.state
+
+def set_rng_state(rng, state):
+	"""Function to restore the state of a random number generator from new_ga_rng().
+
+	Arguments:
+		rng: The random number generator.
+		state: A state from get_rng_state(). It is ignored if it was saved from the other kind of generator.
+	"""
+
+	if isinstance(rng, random.Random):
+		if not isinstance(state, dict):
+			rng.setstate(state)
+	elif isinstance(state, dict):
+		rng.bit_generator.state = state
+
+def gen_population(pop_size, num_bits, rng, seed_chromosomes=None, warm_start_fraction=.25):
+	"""Function that randomly generates the first population, seeded from chosen chromosomes if there are any.
+
+	With numpy, the population is generated packed (see packedChromosomes.py) and only converted to
+	bit strings at the end.
+
+	Arguments:
+		pop_size: The number of chromosomes in the population.
+		num_bits: The number of bits per each chromosome.
+		rng: A random number generator from new_ga_rng().
+		seed_chromosomes: A list of chromosome bit strings to seed the population with, or None.
+		warm_start_fraction: The share of the population to fill with the seed chromosomes and their mutated copies.
+
+	Returns:
+		population: A list of all the chromosome bit strings in the population.
+	"""
+
+	if pc is None:
+		if seed_chromosomes is not None:
+			return ga.warmStartPopulation(seed_chromosomes, pop_size, num_bits, warm_start_fraction, rng)
+		return ga.genPopulation(pop_size, num_bits, rng)
+
+	if seed_chromosomes is not None:
+		packed_pop = pc.warmStartPopulation(seed_chromosomes, pop_size, num_bits, warm_start_fraction, rng)
+	else:
+		packed_pop = pc.genPopulation(pop_size, num_bits, rng)
+
+	return pc.unpackChromosomes(packed_pop, num_bits)
+
+def create_next_generation(parent_pop, fitness_scores, rng, selection_method="roulette", elite_mode="above_median", stats=None):
+	"""Function that moves onto the next generation of a population of chromosome bit strings.
+
+	With numpy, the population is packed, evolved with the vectorized operators of packedChromosomes.py
+	and unpacked again, which is much faster than geneticAlgorithm.createNextGeneration() drawing a random
+	value for every bit. The games, the fitness cache and the seeds of the games all work on the bit strings,
+	so they are only converted here.
+
+	Arguments:
+		parent_pop: A list of chromosome bit strings representing the parent population.
+		fitness_scores: A list of fitness scores that corresponds to each chromosome in parent_pop by index.
+		rng: A random number generator from new_ga_rng().
+		selection_method: One of geneticAlgorithm.SELECTION_METHODS.
+		elite_mode: One of geneticAlgorithm.ELITE_MODES.
+		stats: The FitnessStats of fitness_scores if they were already calculated, or None.
+
+	Returns:
+		child_pop: The new population of chromosome bit strings.
+		best_individual: The chromsome with the highest fitness from the parent population.
+		best_fitness: The highest fitness from the parent population.
+		average_fitness: The average fitness score of the parent population.
+	"""
+
+	if pc is None:
+		return ga.createNextGeneration(parent_pop, fitness_scores, rng, selection_method, eliteMode=elite_mode, stats=stats)
+
+	num_bits = len(parent_pop[0])
+	child_pop, best_individual, best_fitness, average_fitness = pc.createNextGeneration(pc.packChromosomes(parent_pop), fitness_scores, num_bits, rng, selection_method, eliteMode=elite_mode)
+
+	return pc.unpackChromosomes(child_pop, num_bits), pc.unpackChromosomes(best_individual, num_bits)[0], float(best_fitness), float(average_fitness)
@@ -0,0 +1,62 @@
+#**************************************************************************************
+#snakeGameSpectator.py
+#Module with the SnakeGameSpectator class that is instantiated in spectateTraining.py
+#to draw the games of a training run from the snapshots it sends (see spectator.py).
+#*************************************************************************************
+
+import collections
+from helpers.snakeGame import SnakeGame
+from helpers.snake import Snake
+from helpers.gridIndex import get_grid_index
+
+
+class SnakeGameSpectator(SnakeGame):
+	"""Class framework to draw the games of a training run that is played in another process.
+
+	Inherits the SnakeGame class to draw the game, but never simulates it: the snake, the fruit
+	and the scores are all taken from the last snapshot.
+
+	Attributes:
+		self.snapshot: The last Snapshot shown (see spectator.py), or None before the first one.
+	"""
+
+	def __init__(self, fps):
+		"""Initializes the SnakeGameSpectator class."""
+
+		super().__init__(fps)
+		self.snapshot = None
+
+	def show(self, snapshot):
+		"""Function to show the game in a snapshot the next time the window is drawn.
+
+		Arguments:
+			snapshot: A Snapshot received from the training run.
+		"""
+
+		if snapshot.rows != self.rows or snapshot.cols != self.cols:
+			self.rows = snapshot.rows
+			self.cols = snapshot.cols
+			self.grid = get_grid_index(self.rows, self.cols)
+
+		#Only the body and direction of the snake are drawn, so the rest of it is left as it was created
+		self.snake = Snake(self.rows, self.cols)
+		self.snake.body = collections.deque(snapshot.body)
+		self.snake.direction = snapshot.direction
+		self.fruit_pos = snapshot.fruit_pos
+		self.score = snapshot.score
+		self.high_score = snapshot.high_score
+		self.snapshot = snapshot
+
+	def data_texts(self):
+		"""Function to get the texts in the segment of the pygame window with the score, high score, generation and agent.
+
+		This overrides the method in the SnakeGame superclass."""
+
+		texts = super().data_texts()
+		if self.snapshot is None:
+			texts.append(('Waiting for a training run...', (30, 15)))
+		else:
+			texts.append(('Generation: ' + str(self.snapshot.generation), (30, 15)))
+			texts.append(('Agent: ' + self.snapshot.chromosome_id, (self.width - 220, 15)))
+
+		return texts
@@ -0,0 +1,215 @@
+#*********************************************************************************
+#spectator.py
+#This module lets a training run be watched from a separate process.
+#The trainer sends a small snapshot of the game being played (the snake's body,
+#the fruit, the score, the generation and the chromosome) over UDP on this
+#machine a limited number of times per second, with the SpectatorPublisher class.
+#The viewer in spectateTraining.py receives them with the SpectatorReceiver class
+#and only draws the newest one, dropping the rest when it falls behind.
+#Sending never waits, and a snapshot that nobody receives is simply lost, so the
+#speed of training does not depend on whether anyone is watching, and a viewer
+#can be started and closed at any time during a run.
+#A snapshot is laid out as the little endian fields of SNAPSHOT_HEADER followed
+#by one unsigned 16 bit flat cell index (row*cols + column) per body part, from
+#the head to the tail.
+#*********************************************************************************
+
+import os
+import time
+import socket
+import struct
+import collections
+from helpers.lruCache import chromosomeDigest
+
+MAGIC = b"SN"
+VERSION = 1
+DEFAULT_PORT = 47474
+#The magic bytes, the version, the sending process, the sequence number, the generation,
+#the first bytes of the chromosome digest, the score, the high score, the rows, the columns,
+#the flat cell of the fruit, the direction code of the head (255 before the first move)
+#and the number of body parts
+SNAPSHOT_HEADER = struct.Struct("<2sBIII8sHHHHHBH")
+NO_DIRECTION = 255
+
+Snapshot = collections.namedtuple("Snapshot", ["source", "sequence", "generation", "chromosome_id", "score", "high_score", "rows", "cols", "fruit_pos", "direction", "body"])
+
+def encodeSnapshot(source, sequence, generation, chromosomeId, game):
+	"""Function to build the bytes of a snapshot of a game.
+
+	Arguments:
+		source: A number that identifies the sending process.
+		sequence: The number of snapshots the process sent before this one.
+		generation: The number of the generation being played.
+		chromosomeId: The first 8 bytes of the digest of the chromosome being played.
+		game: The SnakeGame being played.
+
+	Returns:
+		The bytes of the snapshot.
+	"""
+
+	cols = game.cols
+	body = [pos[0]*cols + pos[1] for pos in game.snake.body]
+	fruit = game.fruit_pos[0]*cols + game.fruit_pos[1]
+	direction = game.snake.direction if game.snake.direction is not None else NO_DIRECTION
+	header = SNAPSHOT_HEADER.pack(MAGIC, VERSION, source, sequence, generation, chromosomeId, game.score, game.high_score, game.rows, cols, fruit, direction, len(body))
+
+	return header + struct.pack("<" + str(len(body)) + "H", *body)
+
+def decodeSnapshot(data):
+	"""Function to read the bytes of a snapshot built by encodeSnapshot().
+
+	Arguments:
+		data: The bytes of the snapshot.
+
+	Returns:
+		A Snapshot, with the fruit and the body as (row, column) positions and the
+		direction as a direction code or None, or None if data is not a snapshot.
+	"""
+
+	if len(data) < SNAPSHOT_HEADER.size:
+		return None
+	magic, version, source, sequence, generation, chromosomeId, score, highScore, rows, cols, fruit, direction, length = SNAPSHOT_HEADER.unpack_from(data)
+	if magic != MAGIC or version != VERSION or len(data) != SNAPSHOT_HEADER.size + 2*length:
+		return None
+
+	cells = struct.unpack_from("<" + str(length) + "H", data, SNAPSHOT_HEADER.size)
+	body = [divmod(cell, cols) for cell in cells]
+
+	return Snapshot(source, sequence, generation, chromosomeId.hex(), score, highScore, rows, cols, divmod(fruit, cols), direction if direction != NO_DIRECTION else None, body)
+
+
+class SpectatorPublisher():
+	"""Class that sends snapshots of the games played during training to a viewer.
+
+	At most fps snapshots are sent per second, and every other call to publish() returns at once.
+
+	Attributes:
+		self.address: The (host, port) the snapshots are sent to.
+		self.interval: The least number of seconds between two snapshots.
+		self.socket: The non-blocking UDP socket the snapshots are sent from.
+		self.source: A number that identifies this process to the viewer.
+		self.sequence: The number of snapshots sent so far.
+		self.next_send: The time the next snapshot can be sent, from time.monotonic().
+		self.chromosome: The chromosome of the last published game.
+		self.chromosome_id: The first 8 bytes of the digest of self.chromosome, or None until it is needed.
+	"""
+
+	def __init__(self, port=DEFAULT_PORT, fps=30, host="127.0.0.1"):
+		"""Initializes the SpectatorPublisher class.
+
+		Arguments:
+			port: The port the viewer listens on.
+			fps: The most snapshots sent per second.
+			host: The address the viewer listens on.
+		"""
+
+		self.address = (host, port)
+		self.interval = 1/fps
+		self.socket = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+		self.socket.setblocking(False)
+		self.source = os.getpid()
+		self.sequence = 0
+		self.next_send = 0.0
+		self.chromosome = None
+		self.chromosome_id = None
+
+	def publish(self, game, generation, chromosome):
+		"""Function to send a snapshot of a game, if enough time has passed since the last one.
+
+		Arguments:
+			game: The SnakeGame being played.
+			generation: The number of the generation being played.
+			chromosome: The chromosome bit string of the agent playing the game.
+		"""
+
+		now = time.monotonic()
+		if now < self.next_send:
+			return
+		self.next_send = now + self.interval
+
+		#The digest is only calculated for chromosomes that are actually shown
+		if chromosome is not self.chromosome:
+			self.chromosome = chromosome
+			self.chromosome_id = None
+		if self.chromosome_id is None:
+			self.chromosome_id = chromosomeDigest(chromosome)[:8]
+
+		data = encodeSnapshot(self.source, self.sequence, generation, self.chromosome_id, game)
+		self.sequence += 1
+		try:
+			self.socket.sendto(data, self.address)
+		except OSError:
+			#A full buffer or an unreachable viewer loses the snapshot instead of slowing down training
+			pass
+
+	def close(self):
+		"""Function to close the socket."""
+
+		self.socket.close()
+
+
+class SpectatorReceiver():
+	"""Class that receives the snapshots of a training run and keeps only the newest.
+
+	With several worker processes every process sends its own games, so the receiver follows
+	one process at a time, and switches to another when it has been silent for switch_seconds.
+
+	Attributes:
+		self.socket: The non-blocking UDP socket the snapshots are received on.
+		self.switch_seconds: The number of seconds without a snapshot before following another process.
+		self.source: The process being followed, or None before the first snapshot.
+		self.last_sequence: The sequence number of the newest snapshot of self.source.
+		self.last_received: The time the last snapshot of self.source arrived, from time.monotonic().
+		self.dropped: The number of snapshots that were received but never returned.
+	"""
+
+	def __init__(self, port=DEFAULT_PORT, host="127.0.0.1", switch_seconds=1.0):
+		"""Initializes the SpectatorReceiver class, listening on host and port."""
+
+		self.socket = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+		self.socket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+		self.socket.bind((host, port))
+		self.socket.setblocking(False)
+		self.switch_seconds = switch_seconds
+		self.source = None
+		self.last_sequence = -1
+		self.last_received = 0.0
+		self.dropped = 0
+
+	def latest(self):
+		"""Function to read every snapshot that arrived since the last call.
+
+		Returns:
+			The newest Snapshot of the followed process, or None if none arrived.
+		"""
+
+		newest = None
+		received = 0
+		while True:
+			try:
+				data = self.socket.recv(65535)
+			except (BlockingIOError, InterruptedError):
+				break
+			snapshot = decodeSnapshot(data)
+			if snapshot is None:
+				continue
+			received += 1
+
+			now = time.monotonic()
+			if snapshot.source != self.source and (self.source is None or now - self.last_received > self.switch_seconds):
+				self.source = snapshot.source
+				self.last_sequence = -1
+			#Snapshots can arrive out of order, and an older one is never shown after a newer one
+			if snapshot.source == self.source and snapshot.sequence > self.last_sequence:
+				self.last_sequence = snapshot.sequence
+				self.last_received = now
+				newest = snapshot
+
+		self.dropped += received - (newest is not None)
+
+		return newest
+
+	def close(self):
+		"""Function to close the socket."""
+
+		self.socket.close()
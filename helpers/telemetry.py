@@ -0,0 +1,119 @@
+#*********************************************************************************
+#telemetry.py
+#This module contains the TelemetryWriter class, which streams one JSON record
+#per generation of training to a JSON Lines file through a single buffered writer
+#that stays open for the whole run.
+#Chromosomes are not written inline: each record refers to a chromosome by its
+#digest, and the bits of every distinct chromosome are written once to a
+#separate chromosome file.
+#It is used by SnakeGameGATrain in snakeGameGATrain.py.
+#*********************************************************************************
+
+import json
+import time
+from helpers.lruCache import chromosomeDigest
+
+class TelemetryWriter():
+	"""Class that writes the per generation records of a training run.
+
+	Records are buffered in memory and only written to disk on a schedule,
+	so writing a record costs next to nothing in the training loop.
+
+	Attributes:
+		self.path: The path of the JSON Lines file with one record per generation.
+		self.chromosome_path: The path of the JSON Lines file with the bits of each referenced chromosome.
+		self.flush_interval: The number of seconds between writes to disk.
+		self.file: The open file of records.
+		self.chromosome_file: The open file of chromosomes.
+		self.known_digests: A set of the digests of the chromosomes already in the chromosome file.
+		self.last_flush: The time of the last write to disk, from time.monotonic().
+	"""
+
+	def __init__(self, path="GAdata.jsonl", chromosome_path="GAchromosomes.jsonl", flush_interval=30.0):
+		"""Initializes the TelemetryWriter class.
+
+		Both files are opened in append mode, so a resumed run adds to the records of the previous one.
+		"""
+
+		self.path = path
+		self.chromosome_path = chromosome_path
+		self.flush_interval = flush_interval
+		self.file = open(path, "a", buffering=1 << 16)
+		self.chromosome_file = open(chromosome_path, "a", buffering=1 << 16)
+		self.known_digests = set()
+		self.last_flush = time.monotonic()
+
+	def chromosome_ref(self, chrom):
+		"""Function to get the reference to a chromosome that is used in records.
+
+		The chromosome is added to the chromosome file the first time it is referenced.
+
+		Arguments:
+			chrom: A chromosome bit string.
+
+		Returns:
+			The hex digest of the chromosome.
+		"""
+
+		digest = chromosomeDigest(chrom).hex()
+		if digest not in self.known_digests:
+			self.known_digests.add(digest)
+			self.chromosome_file.write(json.dumps({"digest": digest, "chromosome": chrom}) + "\n")
+
+		return digest
+
+	def write(self, record):
+		"""Function to add a record, which is written to disk at the next scheduled flush.
+
+		Arguments:
+			record: A dictionary of JSON serializable values.
+		"""
+
+		self.file.write(json.dumps(record) + "\n")
+		if time.monotonic() - self.last_flush >= self.flush_interval:
+			self.flush()
+
+	def flush(self):
+		"""Function to write every buffered record to disk."""
+
+		#The chromosomes go first, so every reference in the records can be looked up
+		self.chromosome_file.flush()
+		self.file.flush()
+		self.last_flush = time.monotonic()
+
+	def close(self):
+		"""Function to write the remaining records and close the files."""
+
+		if not self.file.closed:
+			self.flush()
+			self.file.close()
+			self.chromosome_file.close()
+
+
+def read_records(path="GAdata.jsonl"):
+	"""Function to read the records written by a TelemetryWriter.
+
+	Arguments:
+		path: The path of the JSON Lines file of records.
+
+	Returns:
+		A list of record dictionaries, in the order they were written.
+	"""
+
+	with open(path) as file:
+		return [json.loads(line) for line in file if line.strip()]
+
+def read_chromosomes(chromosome_path="GAchromosomes.jsonl"):
+	"""Function to read the chromosomes referenced by the records of a TelemetryWriter.
+
+	Arguments:
+		chromosome_path: The path of the JSON Lines file of chromosomes.
+
+	Returns:
+		A dictionary that maps the hex digest of each chromosome to its bit string.
+	"""
+
+	with open(chromosome_path) as file:
+		entries = [json.loads(line) for line in file if line.strip()]
+
+	return {entry["digest"]: entry["chromosome"] for entry in entries}
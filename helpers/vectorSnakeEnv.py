@@ -0,0 +1,392 @@
+#**************************************************************************************
+#vectorSnakeEnv.py
+#Module with the VectorSnakeEnv class, which steps many independent Snake Games at once
+#with numpy arrays instead of one Snake object per game, and the VectorGenerationEvaluator
+#class, which uses it with batchNeuralNetwork.py to play a whole generation in lockstep.
+#The rules are the same as in the SnakeGameGATest and SnakeGameGATrain classes.
+#It requires the module numpy.
+#*************************************************************************************
+
+import numpy as np
+from helpers import batchNeuralNetwork as bnn
+from helpers import packedChromosomes as pc
+from helpers.seeds import episodeSeed
+
+#Row and column offsets for moving left, up, right and down, in the order of the network outputs
+DIRECTION_OFFSETS = np.array([(0, -1), (-1, 0), (0, 1), (1, 0)])
+
+
+class VectorSnakeEnv():
+	"""Class that runs many independent Snake Games at once, stored as a structure of numpy arrays.
+
+	Every position is stored as a flat cell index (row*cols + column). The body of each snake is a
+	ring buffer, so a move only writes the new head and drops the tail.
+
+	Attributes:
+		self.num_envs: The number of games.
+		self.rows: The number of rows in the grid of each game.
+		self.cols: The number of columns in the grid of each game.
+		self.auto_reset: Whether a game starts over after a game over. Otherwise it stops being stepped.
+		self.rng: The numpy random Generator used to place the fruit, when the envs do not have their own.
+		self.env_rngs: A list with a numpy random Generator per env used to place its fruit, or None.
+		With one Generator per env, the games of an env do not depend on the other envs.
+		self.body: An array of shape (num_envs, rows*cols + 1) with the ring buffer of body cells of each snake.
+		self.head_ptr: The index in self.body of the head of each snake.
+		self.length: The length of each snake.
+		self.occupancy: An array of shape (num_envs, rows*cols) counting the body parts in each cell.
+		self.fruit: The cell of the fruit in each game.
+		self.score: The in-game score of each game.
+		self.frames_alive: The number of frames each agent has been alive.
+		self.frames_since_last_fruit: The number of frames since each snake last ate a fruit.
+		self.active: A boolean array of the games that are still being stepped.
+		self.episode_fitness: The fitness of the last finished game of each env (NaN before it finishes).
+		self.episode_score: The in-game score of the last finished game of each env (-1 before it finishes).
+		self.episodes_done: The number of finished games of each env.
+	"""
+
+	def __init__(self, num_envs, rows=10, cols=10, auto_reset=True, seed=None, env_seeds=None):
+		"""Initializes the VectorSnakeEnv class.
+
+		The only arguments that are not documented class attributes are:
+			seed: The seed for self.rng, or None for an unpredictable seed.
+			env_seeds: A list with a seed per env for self.env_rngs, or None to share self.rng.
+		"""
+
+		self.num_envs = num_envs
+		self.rows = rows
+		self.cols = cols
+		self.auto_reset = auto_reset
+		self.rng = np.random.default_rng(seed)
+		self.env_rngs = None
+		if env_seeds is not None:
+			self.env_rngs = [np.random.default_rng(env_seed) for env_seed in env_seeds]
+
+		num_cells = rows*cols
+		self.body = np.zeros((num_envs, num_cells + 1), dtype=np.int64)
+		self.head_ptr = np.zeros(num_envs, dtype=np.int64)
+		self.length = np.zeros(num_envs, dtype=np.int64)
+		self.occupancy = np.zeros((num_envs, num_cells), dtype=np.int8)
+		self.fruit = np.zeros(num_envs, dtype=np.int64)
+		self.score = np.zeros(num_envs, dtype=np.int64)
+		self.frames_alive = np.zeros(num_envs, dtype=np.int64)
+		self.frames_since_last_fruit = np.zeros(num_envs, dtype=np.int64)
+		self.active = np.ones(num_envs, dtype=bool)
+		self.episode_fitness = np.full(num_envs, np.nan)
+		self.episode_score = np.full(num_envs, -1, dtype=np.int64)
+		self.episodes_done = np.zeros(num_envs, dtype=np.int64)
+
+		self.reset_envs(np.arange(num_envs))
+
+	def reset_envs(self, envs):
+		"""Function that starts new games in the given envs.
+
+		Arguments:
+			envs: An array of the indices of the envs to reset.
+		"""
+
+		self.occupancy[envs] = 0
+		start_cell = (self.rows//2)*self.cols + 1
+		self.head_ptr[envs] = 0
+		self.body[envs, 0] = start_cell
+		self.length[envs] = 1
+		self.occupancy[envs, start_cell] = 1
+		self.score[envs] = 0
+		self.frames_alive[envs] = 0
+		self.frames_since_last_fruit[envs] = 0
+		self.generate_fruit(envs)
+
+	def generate_fruit(self, envs):
+		"""Function to place the fruit of the given envs in a random cell outside the snake's body.
+
+		Arguments:
+			envs: An array of the indices of the envs that need a new fruit.
+		"""
+
+		if len(envs) == 0:
+			return
+		free = self.occupancy[envs] == 0
+		num_free = free.sum(axis=1)
+		#Pick the k-th free cell of each board uniformly at random
+		if self.env_rngs is None:
+			rand_vals = self.rng.random(len(envs))
+		else:
+			rand_vals = np.array([self.env_rngs[env].random() for env in envs])
+		k = (rand_vals*num_free).astype(np.int64)
+		free_rank = np.cumsum(free, axis=1)
+		self.fruit[envs] = np.argmax(free_rank > k[:, np.newaxis], axis=1)
+
+	def heads(self, envs):
+		"""Function to get the head positions of the given envs.
+
+		Arguments:
+			envs: An array of env indices.
+
+		Returns:
+			head_rows: The row of the head of each env.
+			head_cols: The column of the head of each env.
+		"""
+
+		head_cells = self.body[envs, self.head_ptr[envs]]
+		return head_cells//self.cols, head_cells%self.cols
+
+	def observe(self, envs):
+		"""Function that calculates the neural network inputs of the given envs.
+
+		The inputs are the same as in SnakeGameGATest.move_snake(), in the same order.
+
+		Arguments:
+			envs: An array of env indices.
+
+		Returns:
+			An array of shape (len(envs), 9) with one row of network inputs per env.
+		"""
+
+		head_rows, head_cols = self.heads(envs)
+		neighbor_rows = head_rows[:, np.newaxis] + DIRECTION_OFFSETS[:, 0]
+		neighbor_cols = head_cols[:, np.newaxis] + DIRECTION_OFFSETS[:, 1]
+
+		#Get the manhattan ditance of the fruit from the head if it moves in each direction
+		fruit_rows = (self.fruit[envs]//self.cols)[:, np.newaxis]
+		fruit_cols = (self.fruit[envs]%self.cols)[:, np.newaxis]
+		fruit_dists = np.abs(fruit_rows - neighbor_rows) + np.abs(fruit_cols - neighbor_cols)
+
+		#Calculate the space available for turning in each of the four directions, reduced by a constant factor
+		constant = 20
+		open_spaces = self.calc_open_spaces(envs, neighbor_rows, neighbor_cols)/constant
+
+		length = self.score[envs] + 1
+
+		#The open spaces for down and right are swapped, exactly as in SnakeGameGATest.move_snake()
+		return np.column_stack((fruit_dists, open_spaces[:, [0, 1, 3, 2]], length))
+
+	def calc_open_spaces(self, envs, start_rows, start_cols):
+		"""Function to calculate the number of open spaces reachable from start positions in each env.
+
+		This gives the same counts as SnakeGameGATest.calc_open_spaces(). Instead of a breadth first search
+		per start position, the free cells of every board are labeled by connected component at once,
+		by repeatedly spreading the smallest label to neighboring free cells.
+
+		Arguments:
+			envs: An array of env indices.
+			start_rows: An array of shape (len(envs), k) with the rows of the start positions.
+			start_cols: An array of shape (len(envs), k) with the columns of the start positions.
+
+		Returns:
+			An array of shape (len(envs), k) with how many open spaces are reachable from each start position.
+		"""
+
+		num_envs = len(envs)
+		num_cells = self.rows*self.cols
+		free = (self.occupancy[envs] == 0).reshape(num_envs, self.rows, self.cols)
+
+		#Pad the boards with blocked cells so the walls need no special handling
+		blocked = num_cells
+		labels = np.full((num_envs, self.rows + 2, self.cols + 2), blocked, dtype=np.int64)
+		inner = labels[:, 1:-1, 1:-1]
+		inner[...] = np.where(free, np.arange(num_cells).reshape(self.rows, self.cols), blocked)
+
+		while True:
+			smallest = np.minimum.reduce([inner, labels[:, :-2, 1:-1], labels[:, 2:, 1:-1], labels[:, 1:-1, :-2], labels[:, 1:-1, 2:]])
+			smallest = np.where(free, smallest, blocked)
+			if np.array_equal(smallest, inner):
+				break
+			inner[...] = smallest
+
+		#Count the size of every component of every board
+		env_offsets = (np.arange(num_envs)*(num_cells + 1))[:, np.newaxis]
+		sizes = np.bincount((inner.reshape(num_envs, num_cells) + env_offsets).ravel(), minlength=num_envs*(num_cells + 1))
+
+		in_bounds = (start_rows >= 0) & (start_rows < self.rows) & (start_cols >= 0) & (start_cols < self.cols)
+		start_labels = labels[np.arange(num_envs)[:, np.newaxis], start_rows + 1, start_cols + 1]
+		reachable = in_bounds & (start_labels != blocked)
+		#The start position itself is not counted as an open space
+		return np.where(reachable, sizes[start_labels + env_offsets] - 1, 0)
+
+	def step(self, actions):
+		"""Function that advances every active game by one frame.
+
+		The order of the rules is the same as a frame of SnakeGameGATrain: move, eat a fruit, wall collision,
+		body collision, and then death by starvation.
+
+		Arguments:
+			actions: An array with a direction (0 left, 1 up, 2 right, 3 down) for every active env,
+			in the order of self.active_envs().
+
+		Returns:
+			An array of the indices of the envs that got a game over during this frame.
+		"""
+
+		envs = self.active_envs()
+		head_rows, head_cols = self.heads(envs)
+		new_rows = head_rows + DIRECTION_OFFSETS[actions, 0]
+		new_cols = head_cols + DIRECTION_OFFSETS[actions, 1]
+
+		#A head that leaves the grid is a wall collision, so its body does not need to be updated
+		hit_wall = (new_rows < 0) | (new_rows >= self.rows) | (new_cols < 0) | (new_cols >= self.cols)
+		moving = envs[~hit_wall]
+		new_heads = (new_rows*self.cols + new_cols)[~hit_wall]
+
+		capacity = self.body.shape[1]
+		old_tails = self.body[moving, (self.head_ptr[moving] - self.length[moving] + 1)%capacity]
+		self.head_ptr[moving] = (self.head_ptr[moving] + 1)%capacity
+		self.body[moving, self.head_ptr[moving]] = new_heads
+		self.occupancy[moving, new_heads] += 1
+
+		#The tail stays where it was if the snake ate a fruit
+		ate = new_heads == self.fruit[moving]
+		not_ate = moving[~ate]
+		self.occupancy[not_ate, old_tails[~ate]] -= 1
+		eaters = moving[ate]
+		self.length[eaters] += 1
+		self.score[eaters] += 1
+		self.frames_since_last_fruit[eaters] = 0
+		self.generate_fruit(eaters)
+
+		hit_body = self.occupancy[moving, new_heads] > 1
+		dead = np.zeros(self.num_envs, dtype=bool)
+		dead[envs[hit_wall]] = True
+		dead[moving[hit_body]] = True
+
+		#Kill the snakes that have not eaten a fruit in a while
+		alive = envs[~dead[envs]]
+		self.frames_since_last_fruit[alive] += 1
+		starving = self.frames_since_last_fruit[alive]
+		dead[alive[((starving == 50) & (self.score[alive] < 6)) | (starving == 250)]] = True
+
+		survivors = envs[~dead[envs]]
+		self.frames_alive[survivors] += 1
+
+		finished = np.flatnonzero(dead)
+		self.game_over(finished)
+		return finished
+
+	def game_over(self, envs):
+		"""Function that records the results of the finished games, and resets or deactivates their envs.
+
+		Arguments:
+			envs: An array of the indices of the envs that got a game over.
+		"""
+
+		if len(envs) == 0:
+			return
+		self.episode_fitness[envs] = calc_fitness(self.score[envs], self.frames_alive[envs], self.frames_since_last_fruit[envs])
+		self.episode_score[envs] = self.score[envs]
+		self.episodes_done[envs] += 1
+		if self.auto_reset:
+			self.reset_envs(envs)
+		else:
+			self.active[envs] = False
+
+	def active_envs(self):
+		"""Function to get the indices of the envs that are still being stepped."""
+
+		return np.flatnonzero(self.active)
+
+
+def calc_fitness(score, frames_alive, frames_since_last_fruit):
+	"""Function to calculate the fitness scores of many games at once.
+
+	This is the same fitness function as calc_fitness() in snakeGameGATrain.py.
+
+	Arguments:
+		score: An array of in-game scores.
+		frames_alive: An array of the number of frames each agent was alive.
+		frames_since_last_fruit: An array of the number of frames since each agent last ate a fruit.
+
+	Returns: An array of fitness scores.
+	"""
+
+	frame_score = np.where(frames_since_last_fruit >= 50, frames_alive - frames_since_last_fruit, frames_alive)
+	frame_score = np.where(frame_score <= 0, 1, frame_score)
+
+	return ((score*2)**2)*(frame_score**1.5)
+
+
+def evaluate_population(population, bits_per_weight, num_inputs, num_hidden_layer_nodes, num_outputs, rows=10, cols=10, seeds=None, profiler=None):
+	"""Function that plays one game with every chromosome of a population in lockstep.
+
+	Arguments:
+		population: A list of chromosome bit strings, or a packed population (see packedChromosomes.py).
+		bits_per_weight: The number of bits per each weight in the nueral network.
+		num_inputs: The number of inputs in the neural network.
+		num_hidden_layer_nodes: The number of nodes per each of the 2 hidden layers in the neural network.
+		num_ouputs: The number of outputs in the neural network.
+		rows: The number of rows in the grid of each game.
+		cols: The number of columns in the grid of each game.
+		seeds: A list with the seed of the game of each chromosome, or None for unpredictable games.
+		profiler: A PhaseProfiler (see profiler.py) to count the steps, forward passes and decodes with, or None.
+		The open spaces are not found with a search and the weights are not cached, so there are no
+		counters of open space cells searched or of weight cache hits.
+
+	Returns:
+		fitness_scores: A list of fitness scores, each index corresponding to a chromosome in population.
+		game_scores: A list of in-game scores, each index corresponding to a chromosome in population.
+	"""
+
+	if not isinstance(population, np.ndarray):
+		population = pc.packChromosomes(population)
+	stacked_weights = pc.mapPacked2StackedWeights(population, bits_per_weight, num_inputs, num_hidden_layer_nodes, num_outputs)
+	env = VectorSnakeEnv(len(population), rows, cols, auto_reset=False, env_seeds=seeds)
+	if profiler is not None:
+		profiler.count("decodes", len(population))
+
+	while env.active.any():
+		envs = env.active_envs()
+		if profiler is not None:
+			#Every active game takes one step with one forward pass in each lockstep frame
+			profiler.count("steps", len(envs))
+			profiler.count("forward_passes", len(envs))
+		outputs = bnn.testNetworkBatch(env.observe(envs), [layer[envs] for layer in stacked_weights])
+		#The direction to turn is the first of the maximum outputs
+		env.step(np.argmax(outputs, axis=1))
+
+	return env.episode_fitness.tolist(), env.episode_score.tolist()
+
+
+class VectorGenerationEvaluator():
+	"""Class that measures the fitness of every chromosome in a generation with a VectorSnakeEnv.
+
+	It can be used in place of a GenerationEvaluator (see generationEvaluator.py), and plays the
+	whole generation in lockstep on a single core.
+
+	Attributes:
+		self.network_shape: A tuple of (bits_per_weight, num_inputs, num_hidden_layer_nodes, num_outputs).
+		self.rows: The number of rows in the grid of each game.
+		self.cols: The number of columns in the grid of each game.
+		self.run_seed: The seed of the training run, or None for unpredictable games.
+		With a run seed, each chromosome is played in a game seeded from the chromosome itself.
+		self.profiler: A PhaseProfiler (see profiler.py) to count the games with (see evaluate_population()), or None.
+		self.generation: The number of the generation being evaluated, kept for the same interface as GenerationEvaluator.
+	"""
+
+	def __init__(self, bits_per_weight, num_inputs, num_hidden_layer_nodes, num_outputs, rows=10, cols=10, run_seed=None, profiler=None):
+		"""Initializes the VectorGenerationEvaluator class."""
+
+		self.network_shape = (bits_per_weight, num_inputs, num_hidden_layer_nodes, num_outputs)
+		self.rows = rows
+		self.cols = cols
+		self.run_seed = run_seed
+		self.profiler = profiler
+		self.generation = 0
+
+	def evaluate(self, population):
+		"""Function that plays every chromosome in a population.
+
+		Arguments:
+			population: A list of chromosome bit strings.
+
+		Returns:
+			fitness_scores: A list of fitness scores, each index corresponding to a chromosome in population.
+			game_scores: A list of in-game scores, each index corresponding to a chromosome in population.
+		"""
+
+		seeds = None
+		if self.run_seed is not None:
+			seeds = [episodeSeed(self.run_seed, chrom) for chrom in population]
+
+		return evaluate_population(population, *self.network_shape, self.rows, self.cols, seeds, self.profiler)
+
+	def close(self):
+		"""Function kept for the same interface as GenerationEvaluator, there is nothing to shut down."""
+
+		pass
@@ -0,0 +1,60 @@
+#*********************************************************************************
+#spectateTraining.py
+#This program lets you watch a training run of trainGeneticAlgorithm.py from a
+#separate window, including a headless run on the same machine.
+#For more detailed information about the project, check out:
+#https://craighaber.github.io/AI-for-Snake-Game/
+#*********************************************************************************
+#Instructions:
+#Start the training run with --spectate, for example:
+#	python trainGeneticAlgorithm.py --headless --spectate
+#and then run this program to watch the games it plays. The program can be started
+#and closed at any time, and the training run goes on at the same speed either way.
+#When a headless run plays on several worker processes, the games of one of them
+#are shown at a time.
+#Use --port if the training run was started with --spectate PORT.
+#*********************************************************************************
+#Dependecies:
+#
+#To run this module, you must have the module pygame installed.
+#Type pip install pygame in the command prompt or terminal to install it.
+#If necessary, more specific instructions for installing pygame are here:
+#https://www.pygame.org/wiki/GettingStarted
+#
+#Also, a Python version of 3.7 or higher is required.
+#*********************************************************************************
+
+import argparse
+import pygame
+from helpers.snakeGameSpectator import SnakeGameSpectator
+from helpers.spectator import SpectatorReceiver, DEFAULT_PORT
+
+def main(argv=None):
+	"""Function to watch the games of a training run."""
+
+	parser = argparse.ArgumentParser(description="Watch a training run started with trainGeneticAlgorithm.py --spectate.")
+	parser.add_argument("--port", type=int, default=DEFAULT_PORT, help="the port given to --spectate")
+	parser.add_argument("--fps", type=int, default=30, help="the frame rate of the window")
+	args = parser.parse_args(argv)
+
+	receiver = SpectatorReceiver(args.port)
+	game = SnakeGameSpectator(args.fps)
+	pygame.font.init()
+
+	try:
+		while game.play:
+
+			game.clock.tick(game.fps)
+
+			#Only the newest snapshot is drawn, the ones that arrived before it are dropped
+			snapshot = receiver.latest()
+			if snapshot is not None:
+				game.show(snapshot)
+
+			game.redraw_window()
+			game.event_handler()
+	finally:
+		receiver.close()
+
+if __name__ == "__main__":
+	main()
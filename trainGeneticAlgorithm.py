@@ -10,11 +10,36 @@
 #Instructions: 
 #Simply run the module to observe how the genetic algorithm was trained in action,
 #starting from randomized chromosomes. 
-#Specific information about each population is saved in Gadata.txt in the same 
-#folder as this program, and the file will be created if it does not already exist
-#after the first generation.
-#Also, for every 10 populations, the population is saved in a file 
-#in the populations directory.
+#Specific information about each population is saved as one JSON record per line
+#in GAdata.jsonl in the same folder as this program, and the best chromosome of each
+#generation is saved in GAchromosomes.jsonl, referred to by its digest.
+#The files will be created if they do not already exist.
+#Also, for every 10 populations, the population is saved with its fitness scores
+#in a binary checkpoint file in the populations directory (see helpers/checkpoint.py).
+#Run with --headless to train as fast as possible without a window,
+#for example on a server without a display. Headless training plays each generation
+#in parallel on --workers processes (every CPU core by default), or with --vectorized,
+#in lockstep on one core with numpy.
+#Run with --bitboard to keep the snake's body as a bitboard, which calculates the
+#open spaces around the head faster.
+#Run with --resume to continue from the latest checkpoint in the populations
+#directory (or --resume PATH for a specific checkpoint), and with --warm-start to
+#seed part of the first population from chosen chromosomes, for example
+#--warm-start 1 3 for the first and third agents of testTrainedAgents.py, or
+#--warm-start populations/population_50.ckpt for the best agent of a checkpoint.
+#When training in a window, drawing every frame takes most of the time: run with
+#--render-every N to draw only every Nth frame, --render-agent-every K to only draw
+#one agent in K, or --render-interval SECONDS to draw at most one frame per interval.
+#Run with --headless --islands K to split the population into K islands that are
+#each evolved on their own process, with the best chromosomes migrating between
+#them every --migration-interval generations (no checkpoints are saved then).
+#Run with --dashboard 8x8 to watch 64 agents of each generation play at once in a
+#grid of small boards, while training goes on as fast as the CPU allows.
+#Run with --spectate to send the games being played to spectateTraining.py, which
+#can watch the run from a separate window, even when it is headless.
+#Run with --profile to record where the time of each generation goes, and with
+#--profile-generation N to save the sampled call stacks of generation N.
+#Run with --help to see every option.
 #*********************************************************************************
 #Dependecies: 
 #
@@ -23,43 +48,302 @@
 #If necessary, more specific instructions for installing pygame are here:
 #https://www.pygame.org/wiki/GettingStarted 
 #
+#pygame is not needed when training headless.
+#
 #Also, a Python version of 3.7 or higher is required.
 #*********************************************************************************
-import pygame
-from helpers.snakeGameGATrain import SnakeGameGATrain
+import argparse
+from helpers.snakeGameGATrain import SnakeGameGATrain, new_ga_rng, gen_population
 from helpers import geneticAlgorithm as ga 
+from helpers import neuralNetwork as nn
+from helpers.generationEvaluator import GenerationEvaluator
+from helpers.fitnessCache import FitnessCache
+from helpers.seeds import deriveSeed
+from helpers.telemetry import TelemetryWriter
+from helpers.checkpoint import CheckpointWriter, Checkpoint, latestCheckpoint
+from helpers.trainedAgents import TRAINED_AGENTS
+from helpers.profiler import PhaseProfiler
+from helpers.renderPolicy import RenderPolicy
+from helpers.spectator import SpectatorPublisher, DEFAULT_PORT
+from helpers.islandModel import IslandModel, TOPOLOGIES
+
+
+def parse_dashboard_shape(text):
+	"""Function to read the number of rows and columns of boards given to --dashboard, such as 8x8."""
+
+	rows, _, cols = text.lower().partition("x")
+	if not rows.isdigit() or not cols.isdigit() or int(rows) < 1 or int(cols) < 1:
+		raise argparse.ArgumentTypeError("expected ROWSxCOLS, such as 8x8, not " + text)
+
+	return int(rows), int(cols)
+
+def parse_args(argv=None):
+	"""Function to read the training settings from the command line.
+
+	Arguments:
+		argv: The list of command line arguments, or None to use sys.argv.
+
+	Returns:
+		An argparse.Namespace with the settings.
+	"""
+
+	parser = argparse.ArgumentParser(description="Train intelligent Snake Game agents with a genetic algorithm.")
+	parser.add_argument("--fps", type=int, default=3000, help="the frame rate of the window when not headless")
+	parser.add_argument("--headless", action="store_true", help="train without a window as fast as the CPU allows")
+	parser.add_argument("--render-every", type=int, default=1, metavar="N", help="only draw every Nth frame in the window")
+	parser.add_argument("--render-agent-every", type=int, default=1, metavar="K", help="only draw one agent in K in the window")
+	parser.add_argument("--render-interval", type=float, default=None, metavar="SECONDS", help="draw at most one frame per interval in the window")
+	parser.add_argument("--dashboard", type=parse_dashboard_shape, default=None, metavar="ROWSxCOLS",
+		help="play ROWS*COLS agents at once and show them as a grid of small boards, such as 8x8")
+	parser.add_argument("--dashboard-fps", type=int, default=30, help="the most times per second the dashboard is drawn")
+	parser.add_argument("--event-interval", type=float, default=.05, metavar="SECONDS", help="how often the window events are handled between drawn frames")
+	parser.add_argument("--workers", type=int, default=None, help="the number of processes for headless training (default: one per CPU core)")
+	parser.add_argument("--vectorized", action="store_true", help="play each headless generation in lockstep on one core with numpy")
+	parser.add_argument("--bitboard", action="store_true", help="keep the snake's body as a bitboard and calculate the open spaces with it")
+	parser.add_argument("--seed", type=int, default=None, help="the seed of the run, so it can be reproduced exactly (default: unpredictable)")
+	parser.add_argument("--generations", type=int, default=None, help="stop once this many generations have passed (default: train until the window is closed)")
+	parser.add_argument("--population-size", type=int, default=200, help="the number of chromosomes in a generation")
+	parser.add_argument("--selection", choices=ga.SELECTION_METHODS, default=None, help="how parents are selected (default: roulette)")
+	parser.add_argument("--elite-mode", choices=ga.ELITE_MODES, default=None, help="which parents survive (default: above_median)")
+	parser.add_argument("--islands", type=int, default=None, metavar="K",
+		help="split the population into K islands, each evolved on its own process with migration between them (headless only, no checkpoints)")
+	parser.add_argument("--migration-interval", type=int, default=10, help="the number of generations between migrations of the islands")
+	parser.add_argument("--migrants", type=int, default=2, help="the number of the best chromosomes an island sends to each of its neighbors")
+	parser.add_argument("--topology", choices=TOPOLOGIES, default="ring", help="which islands exchange migrants: the next one in a ring, or all of them")
+	parser.add_argument("--cache-size", type=int, default=10000, help="the number of played chromosomes to remember (0 to disable)")
+	parser.add_argument("--checkpoint-dir", default="populations", help="the directory of the checkpoints")
+	parser.add_argument("--checkpoint-every", type=int, default=10, help="the number of generations between checkpoints")
+	parser.add_argument("--telemetry-flush-seconds", type=float, default=30.0, help="how often to write the records to GAdata.jsonl")
+	parser.add_argument("--spectate", nargs="?", type=int, const=DEFAULT_PORT, default=None, metavar="PORT",
+		help="send snapshots of the games to spectateTraining.py on this port (default: " + str(DEFAULT_PORT) + ")")
+	parser.add_argument("--spectate-fps", type=int, default=30, help="the most snapshots sent per second by each process")
+	parser.add_argument("--profile", action="store_true",
+		help="record phase timers and counters (steps, open space cells searched, forward passes, decodes, fitness and weight cache hits) with every generation in GAdata.jsonl; with --vectorized there are no open space or weight cache counters")
+	parser.add_argument("--profile-generation", type=int, default=None, metavar="N",
+		help="sample the call stacks of generation N and save them to profile_generation_N.txt")
+	parser.add_argument("--quiet", action="store_true", help="do not print a line of stats for every generation")
+	parser.add_argument("--resume", nargs="?", const="latest", default=None, metavar="CHECKPOINT",
+		help="continue from a checkpoint (default: the latest one in the checkpoint directory)")
+	parser.add_argument("--warm-start", nargs="+", default=None, metavar="AGENT",
+		help="seed the first population with chromosomes: a number from 1-" + str(len(TRAINED_AGENTS)) + " for an agent of testTrainedAgents.py, "
+		"a checkpoint path for its best agent, or PATH:INDEX for one agent of a checkpoint")
+	parser.add_argument("--warm-start-fraction", type=float, default=.25,
+		help="the share of the first population filled with the warm start chromosomes and their mutated copies")
+
+	args = parser.parse_args(argv)
+	if args.resume is not None and args.warm_start is not None:
+		parser.error("--resume and --warm-start cannot be used together")
+	if args.render_every < 1 or args.render_agent_every < 1:
+		parser.error("--render-every and --render-agent-every must be at least 1")
+	if args.spectate is not None and args.headless and args.vectorized:
+		parser.error("--spectate cannot be used with --vectorized")
+	if args.bitboard and args.headless and args.vectorized:
+		parser.error("--bitboard cannot be used with --vectorized")
+	if args.dashboard is not None and args.headless:
+		parser.error("--dashboard cannot be used with --headless")
+	if args.islands is not None:
+		if not args.headless or args.vectorized or args.resume is not None:
+			parser.error("--islands requires --headless, and cannot be used with --vectorized or --resume")
+		if args.islands < 1 or args.population_size//args.islands < 2:
+			parser.error("--islands must be at least 1, with at least 2 chromosomes per island")
+		if args.migration_interval < 1:
+			parser.error("--migration-interval must be at least 1")
 
+	return args
 
-def main():
+def load_warm_start_chromosomes(specs):
+	"""Function to get the chromosomes named on the command line with --warm-start.
+
+	Arguments:
+		specs: A list of strings, each either the number of a trained agent, the path of a checkpoint
+		for its best agent, or PATH:INDEX for the agent at an index of a checkpoint.
+
+	Returns:
+		chromosomes: A list of chromosome bit strings.
+	"""
+
+	chromosomes = []
+	for spec in specs:
+		if spec.isdigit():
+			if int(spec) < 1 or int(spec) > len(TRAINED_AGENTS):
+				raise ValueError("There is no trained agent " + spec + ", expected a number from 1-" + str(len(TRAINED_AGENTS)))
+			chromosomes.append(TRAINED_AGENTS[int(spec) - 1])
+			continue
+
+		path, _, index = spec.rpartition(":")
+		if not index.isdigit():
+			path = spec
+			index = None
+		with Checkpoint(path) as checkpoint:
+			if index is None:
+				index = checkpoint.best_index()
+			chromosomes.append(checkpoint.chromosome(int(index)))
+
+	return chromosomes
+
+def main(argv=None):
 	"""Function to train the genetic algorithm for creating intelligent Snake Game agents."""
-	game_fps = 3000
-	chroms_per_gen = 200
+	args = parse_args(argv)
 	num_inputs = 9
 	num_hidden_layer_nodes = 10
 	bits_per_weight = 8
 	num_outputs = 4
 	total_bits = ((num_inputs+1)*num_hidden_layer_nodes + num_hidden_layer_nodes*(num_hidden_layer_nodes+1) + num_outputs*(num_hidden_layer_nodes + 1))*bits_per_weight
-	population = ga.genPopulation(chroms_per_gen, total_bits)
-	game = SnakeGameGATrain(game_fps, population, chroms_per_gen, bits_per_weight, num_inputs, num_hidden_layer_nodes, num_outputs)
-	
+
+	run_seed = args.seed
+	#Only headless training without a dashboard plays the generations vectorized
+	vectorized = args.vectorized and args.headless and args.dashboard is None
+	selection_method = args.selection
+	elite_mode = args.elite_mode
+	checkpoint = None
+	if args.resume is not None:
+		checkpoint_path = latestCheckpoint(args.checkpoint_dir) if args.resume == "latest" else args.resume
+		if checkpoint_path is None:
+			raise SystemExit("There is no checkpoint to resume from in " + args.checkpoint_dir)
+		checkpoint = Checkpoint(checkpoint_path)
+		shape = (checkpoint.header["bits_per_weight"], checkpoint.header["num_inputs"], checkpoint.header["num_hidden_layer_nodes"], checkpoint.header["num_outputs"])
+		if shape != (bits_per_weight, num_inputs, num_hidden_layer_nodes, num_outputs):
+			raise SystemExit(checkpoint_path + " is for a neural network of shape " + str(shape))
+		#Settings that are not given again are taken from the run that is resumed
+		if run_seed is None:
+			run_seed = checkpoint.header.get("run_seed")
+		if selection_method is None:
+			selection_method = checkpoint.header.get("selection_method")
+		if elite_mode is None:
+			elite_mode = checkpoint.header.get("elite_mode")
+		#The vectorized games place the fruit differently, so a seeded run only continues exactly in the same mode
+		saved_vectorized = checkpoint.header.get("vectorized")
+		if run_seed is not None and saved_vectorized is not None and saved_vectorized != vectorized:
+			raise SystemExit(checkpoint_path + " was saved by a seeded run " + ("with" if saved_vectorized else "without") + " --headless --vectorized, so it must be resumed " + ("with" if saved_vectorized else "without") + " it")
+		print("Resuming from generation " + str(checkpoint.header["generation"]) + " of " + checkpoint_path)
+	if selection_method is None:
+		selection_method = "roulette"
+	if elite_mode is None:
+		elite_mode = "above_median"
+
+	if args.islands is not None:
+		train_islands(args, run_seed, selection_method, elite_mode, bits_per_weight, num_inputs, num_hidden_layer_nodes, num_outputs)
+		return
+
+	chroms_per_gen = args.population_size
+	population_rng = new_ga_rng(deriveSeed(run_seed, "population") if run_seed is not None else None)
+	seed_chromosomes = load_warm_start_chromosomes(args.warm_start) if args.warm_start is not None else None
+	population = gen_population(chroms_per_gen, total_bits, population_rng, seed_chromosomes, args.warm_start_fraction)
+	fitness_cache = FitnessCache(args.cache_size) if args.cache_size > 0 else None
+	telemetry = TelemetryWriter(flush_interval=args.telemetry_flush_seconds)
+	checkpoints = CheckpointWriter(args.checkpoint_dir, args.checkpoint_every)
+	game = SnakeGameGATrain(args.fps, population, chroms_per_gen, bits_per_weight, num_inputs, num_hidden_layer_nodes, num_outputs, args.headless or args.dashboard is not None, fitness_cache, run_seed, args.bitboard, selection_method=selection_method, elite_mode=elite_mode, telemetry=telemetry, verbose=not args.quiet, checkpoints=checkpoints, profiler=PhaseProfiler() if args.profile else None, profile_generation=args.profile_generation, vectorized=vectorized)
+	if checkpoint is not None:
+		game.restore_checkpoint(checkpoint)
+		checkpoint.close()
+
+	render_policy = RenderPolicy(args.render_every, args.render_agent_every, args.render_interval, args.event_interval)
+
+	try:
+		train(game, args.headless, vectorized, args.workers, run_seed, args.generations, render_policy, args.spectate, args.spectate_fps, args.dashboard, args.dashboard_fps)
+	finally:
+		#Write the records that are still buffered and the last checkpoint, even if training was stopped
+		telemetry.close()
+		checkpoints.close()
+
+def train_islands(args, run_seed, selection_method, elite_mode, bits_per_weight, num_inputs, num_hidden_layer_nodes, num_outputs):
+	"""Function to train the genetic algorithm as an island model (see islandModel.py) until enough generations have passed.
+
+	Arguments:
+		args: The argparse.Namespace with the settings from the command line.
+		run_seed: The seed of the training run, or None for an unpredictable run.
+		selection_method: How the genetic algorithm selects parents.
+		elite_mode: How the genetic algorithm keeps the best parents.
+		bits_per_weight: The number of bits per each weight in the nueral network.
+		num_inputs: The number of inputs in the neural network.
+		num_hidden_layer_nodes: The number of nodes per each of the 2 hidden layers in the neural network.
+		num_ouputs: The number of outputs in the neural network.
+	"""
+
+	seed_chromosomes = load_warm_start_chromosomes(args.warm_start) if args.warm_start is not None else None
+	telemetry = TelemetryWriter(flush_interval=args.telemetry_flush_seconds)
+	islands = IslandModel(args.islands, args.population_size//args.islands, bits_per_weight, num_inputs, num_hidden_layer_nodes, num_outputs, run_seed,
+		selection_method, elite_mode, args.cache_size, args.migration_interval, args.migrants, args.topology, args.generations,
+		seed_chromosomes, args.warm_start_fraction, telemetry, not args.quiet, args.spectate, args.spectate_fps, args.bitboard)
+
+	try:
+		islands.run()
+	finally:
+		telemetry.close()
+
+def train(game, headless, vectorized, num_workers, run_seed, max_generations=None, render_policy=None, spectator_port=None, spectator_fps=30, dashboard_shape=None, dashboard_fps=30):
+	"""Function to run the training loop until the window is closed or enough generations have passed.
+
+	Arguments:
+		game: The SnakeGameGATrain object with the population to train.
+		headless: Whether to train without a window.
+		vectorized: Whether headless training plays each generation in lockstep with numpy.
+		num_workers: The number of processes that play each generation in headless training, or None for one per CPU core.
+		run_seed: The seed of the training run, or None for an unpredictable run.
+		max_generations: The number of generations to stop at, or None to never stop.
+		render_policy: The RenderPolicy that decides which frames are drawn in the window, or None to draw every frame.
+		spectator_port: The port of spectateTraining.py to send snapshots of the games to, or None to not send any.
+		spectator_fps: The most snapshots sent per second by each process.
+		dashboard_shape: The (rows, columns) of boards to play each generation on at once, or None.
+		dashboard_fps: The most times per second the dashboard is drawn.
+	"""
+
+	def keep_training():
+		return game.play and (max_generations is None or game.num_generations < max_generations)
+
+	#Keep the compiled weights of a whole generation, so the best parents are not decoded again
+	weight_cache_size = max(nn.WEIGHT_CACHE_SIZE, game.chroms_per_gen)
+	nn.setWeightCacheSize(weight_cache_size)
+
+	if headless or dashboard_shape is not None:
+		#No clock, so play whole generations as fast as possible
+		if dashboard_shape is not None:
+			import pygame
+			from helpers.dashboard import DashboardEvaluator
+			pygame.font.init()
+			evaluator = DashboardEvaluator(game.bits_per_weight, game.num_inputs, game.num_hidden_layer_nodes, game.num_outputs, dashboard_shape[0], dashboard_shape[1], game.rows, run_seed, dashboard_fps, game.bitboard, game.profiler)
+		elif vectorized:
+			from helpers.vectorSnakeEnv import VectorGenerationEvaluator
+			evaluator = VectorGenerationEvaluator(game.bits_per_weight, game.num_inputs, game.num_hidden_layer_nodes, game.num_outputs, game.rows, game.cols, run_seed, game.profiler)
+		else:
+			evaluator = GenerationEvaluator(game.bits_per_weight, game.num_inputs, game.num_hidden_layer_nodes, game.num_outputs, num_workers, run_seed=run_seed, profiler=game.profiler, spectator_port=spectator_port, spectator_fps=spectator_fps, weight_cache_size=weight_cache_size, bitboard=game.bitboard)
+		try:
+			while keep_training():
+				game.evaluate_generation(evaluator)
+		finally:
+			evaluator.close()
+		return
+
+	import pygame
 	pygame.font.init()
 
-	while game.play:
+	if render_policy is None:
+		render_policy = RenderPolicy()
+	spectator = SpectatorPublisher(spectator_port, spectator_fps) if spectator_port is not None else None
 
-		game.clock.tick(game.fps)
-		
-		game.move_snake()
-		game.check_collisions()
-		#check if snake is killed for not eating a fruit in a while
-		game.update_frames_since_last_fruit()
-		game.frames_alive += 1
+	while keep_training():
+
+		game.step()
 
 		if game.restart == True:
 			game.restart = False
-			continue
-		
-		game.redraw_window()
-		
-		game.event_handler()
+			rendered = False
+		else:
+			rendered = render_policy.should_render(game.cur_chrom)
+			if spectator is not None:
+				spectator.publish(game, game.num_generations + 1, game.population[game.cur_chrom])
+
+		#The frame rate only limits the drawn frames, the skipped frames are simulated as fast as possible
+		if rendered:
+			game.clock.tick(game.fps)
+			if game.profiler is not None:
+				game.profiler.start("render")
+			game.redraw_window()
+			if game.profiler is not None:
+				game.profiler.stop("render")
+
+		if render_policy.should_handle_events(rendered):
+			game.event_handler()
 		
-main()
\ No newline at end of file
+if __name__ == "__main__":
+	main()
\ No newline at end of file